@@ -7,8 +7,20 @@ Version: 1.0
 Description:
     Contains all the main functions for provisioning Guacamole
 """
+import json
 import time
+from typing import Iterator
+import requests
+from orchestration.guac_bulk import (create_conns_bulk, get_conn_levels,
+                                     check_transient, summarize_deletes)
+from orchestration.guac_index import (get_conn_index, index_conn, unindex_conn,
+                                      get_conn_type, get_conn_node, get_parent_node,
+                                      extract_connections, fingerprint)
 from orchestration.heat import get_ostack_instances
+from utils.concurrency import run_parallel
+from utils.metrics import phase
+from utils.connections import guacamole_items, guacamole_request
+from utils.models import ConnectionGroup
 from utils.msg_format import error_msg, info_msg, success_msg, general_msg
 
 
@@ -34,39 +46,211 @@ def provision(gconn: object,
     general_msg("Provisioning Guacamole",
                 endpoint)
 
-    conns_to_create, conns_to_delete, current_conns = create_conn_data(guac_params,
-                                                                       update,
-                                                                       debug)
+    with phase('Guacamole diff'):
+        conns_to_create, conns_to_delete, current_conns = create_conn_data(guac_params,
+                                                                           update,
+                                                                           debug)
 
-    conn_ids = create_conns(gconn,
-                            conns_to_create,
-                            current_conns,
-                            update,
-                            debug)
+    with phase('Guacamole apply'):
+        conn_ids = None
+        if not update and not guac_params['parent_group_id']:
+            conn_ids = create_conns_bulk(gconn,
+                                         conns_to_create,
+                                         debug)
 
-    if update:
-        delete_conns(gconn,
-                     conns_to_delete)
+        if conn_ids is None:
+            conn_ids = create_conns(gconn,
+                                    conns_to_create,
+                                    current_conns,
+                                    update,
+                                    debug,
+                                    guac_params.get('workers', 1))
+
+        if update:
+            delete_conns(gconn,
+                         conns_to_delete,
+                         current_conns,
+                         guac_params.get('workers', 1))
+
+    with phase('Guacamole diff'):
+        if guac_params.get('group_permissions'):
+            groups_to_create = create_group_data(guac_params,
+                                                 debug)
+
+        users_to_create, users_to_delete, current_users = create_user_data(guac_params,
+                                                                           conn_ids,
+                                                                           update,
+                                                                           debug)
+
+    with phase('Guacamole apply'):
+        create_users(gconn,
+                     users_to_create,
+                     current_users,
+                     update,
+                     debug)
 
-    users_to_create, users_to_delete, current_users = create_user_data(guac_params,
-                                                                       conn_ids,
-                                                                       update,
-                                                                       debug)
+        if update:
+            delete_users(gconn,
+                         users_to_delete,
+                         guac_params.get('workers', 1))
 
-    create_users(gconn,
-                 users_to_create,
-                 current_users,
-                 update,
-                 debug)
+        if guac_params.get('group_permissions'):
+            create_user_groups(gconn,
+                               groups_to_create,
+                               conn_ids,
+                               update,
+                               debug)
 
-    if update:
-        delete_users(gconn,
-                     users_to_delete)
+    success_msg("Provisioned Guacamole",
+                endpoint)
+
+
+def provision_ranges(gconn: object,
+                     guac_params: dict,
+                     range_conns: Iterator[tuple[str, ConnectionGroup]],
+                     debug: bool = False) -> None:
+    """
+    Provisions a new Guacamole organization one range at a time.
+
+    Each range is created as soon as it is generated, and each user is created
+    as soon as all of their mapped connection objects exist, so the API calls
+    start before the later ranges are generated and only one range of
+    connections is held at a time.
+
+    This only covers the creation of a new organization. Update and group
+    permission runs diff the whole generated tree in provision instead.
+
+    Args:
+        gconn (object): Connection to the Guacamole server.
+        guac_params (dict): Parameters for provisioning Guacamole.
+        range_conns (Iterator[tuple[str, ConnectionGroup]]): The parent name
+            and connection group of each range, see iter_range_conns.
+        debug (bool, optional): Whether to enable debug mode.
+
+    Returns:
+        None
+    """
+
+    endpoint = 'Guacamole'
+    workers = guac_params.get('workers', 1)
+    new_users = guac_params['new_users']
+
+    general_msg("Provisioning Guacamole one range at a time",
+                endpoint)
+
+    conn_ids = {'ROOT': 'ROOT'}
+    bulk = True
+
+    # Count the connection objects each user is waiting for
+    waiting = {}
+    missing = {}
+    ready = []
+    for username, data in new_users.items():
+        permissions = data['permissions']
+        names = (set(permissions['connectionPermissions']) |
+                 set(permissions['connectionGroupPermissions']) |
+                 set(permissions['sharingProfilePermissions']))
+        missing[username] = len(names)
+        for name in names:
+            waiting.setdefault(name, []).append(username)
+        if not names:
+            ready.append(username)
+
+    for parent, conn_group in range_conns:
+        conns = extract_connections(conn_group,
+                                    parent)
+        parent_ids = {parent: conn_ids[parent]}
+
+        range_ids = None
+        if bulk:
+            range_ids = create_conns_bulk(gconn,
+                                          conns,
+                                          debug,
+                                          parent_ids)
+            bulk = range_ids is not None
+        if range_ids is None:
+            range_ids = create_conns(gconn,
+                                     conns,
+                                     [],
+                                     False,
+                                     debug,
+                                     workers,
+                                     parent_ids)
+        conn_ids.update(range_ids)
+
+        for conn in conns:
+            if not conn_ids.get(conn['name']):
+                continue
+            for username in waiting.pop(conn['name'], []):
+                missing[username] -= 1
+                if not missing[username]:
+                    ready.append(username)
+
+        create_range_users(gconn,
+                           guac_params,
+                           ready,
+                           conn_ids,
+                           debug)
+        ready = []
+
+    # Users mapped to objects that were not created get the rest
+    create_range_users(gconn,
+                       guac_params,
+                       [
+                           username
+                           for username, count in missing.items()
+                           if count
+                       ],
+                       conn_ids,
+                       debug)
 
     success_msg("Provisioned Guacamole",
                 endpoint)
 
 
+def create_range_users(gconn: object,
+                       guac_params: dict,
+                       usernames: list,
+                       conn_ids: dict,
+                       debug: bool = False) -> None:
+    """
+    Creates some of the new users with the connection IDs created so far.
+
+    Args:
+        gconn (object): Connection to the Guacamole server.
+        guac_params (dict): Parameters for provisioning Guacamole.
+        usernames (list): The names of the new users to create.
+        conn_ids (dict): The connection IDs by name.
+        debug (bool, optional): Whether to enable debug mode.
+
+    Returns:
+        None
+    """
+
+    if not usernames:
+        return
+
+    new_users = guac_params['new_users']
+    users_to_create, _, current_users = create_user_data(
+        {
+            **guac_params,
+            'new_users': {
+                username: new_users[username]
+                for username in usernames
+            }
+        },
+        conn_ids,
+        False,
+        debug
+    )
+
+    create_users(gconn,
+                 users_to_create,
+                 current_users,
+                 False,
+                 debug)
+
+
 def deprovision(gconn: object,
                 guac_params: dict,
                 debug: bool = False) -> bool:
@@ -87,15 +271,28 @@ def deprovision(gconn: object,
     general_msg("Deprovisioning Guacamole",
                 endpoint)
 
-    conns_to_delete, users_to_delete = delete_data(gconn,
-                                                   guac_params,
-                                                   debug)
+    with phase('Guacamole read'):
+        if guac_params.get('fast_deprovision'):
+            conns_to_delete, users_to_delete = fast_delete_data(gconn,
+                                                                guac_params,
+                                                                debug)
+        else:
+            conns_to_delete, users_to_delete = delete_data(gconn,
+                                                           guac_params,
+                                                           debug)
+
+    with phase('Guacamole apply'):
+        delete_conns(gconn,
+                     conns_to_delete,
+                     workers=guac_params.get('workers', 1))
 
-    delete_conns(gconn,
-                 conns_to_delete)
+        delete_users(gconn,
+                     users_to_delete,
+                     guac_params.get('workers', 1))
 
-    delete_users(gconn,
-                 users_to_delete)
+        if guac_params.get('group_permissions'):
+            delete_user_groups(gconn,
+                               guac_params)
 
     success_msg("Deprovisioned Guacamole",
                 endpoint)
@@ -132,31 +329,38 @@ def create_conn_data(guac_params: dict,
     ] + [org_identifier]
 
     if update:
-        create_names = [
+        create_names = {
             conn['name']
             for conn in conns_to_create
-        ]
+        }
         for conn in current_conns:
             if (conn['name'] not in create_names and
-                conn['parentIdentifier'] in new_group_ids):
+                conn.get('parentIdentifier') in new_group_ids):
                 conns_to_delete.append(conn)
 
-        conns_to_create = remove_empty(conns_to_create)
-        compare_conns = remove_empty(current_conns)
-        for conn in compare_conns:
-            del conn['identifier']
-            if conn.get('parentIdentifier'):
-                del conn['parentIdentifier']
-            if conn.get('primaryConnectionIdentifier'):
-                del conn['primaryConnectionIdentifier']
-
-            if conn in conns_to_create:
-                conns_to_create.remove(conn)
+        # Fingerprint the current connections without their server side identifiers
+        current_fingerprints = {
+            fingerprint({
+                key: value
+                for key, value in conn.items()
+                if key not in ['identifier',
+                               'parentIdentifier',
+                               'primaryConnectionIdentifier']
+            })
+            for conn in current_conns
+        }
+
+        changed_conns = []
+        for conn in conns_to_create:
+            if fingerprint(conn) in current_fingerprints:
                 general_msg(f"No changes needed for connection '{conn['name']}'",
                             endpoint)
                 info_msg(conn,
                          endpoint,
                          debug)
+            else:
+                changed_conns.append(conn)
+        conns_to_create = changed_conns
 
     return conns_to_create, conns_to_delete, current_conns
 
@@ -221,28 +425,36 @@ def create_user_data(guac_params: dict,
     users_to_delete = []
 
     if update:
-        create_names = [
+        create_names = {
             user['username']
             for user in users_to_create
-        ]
+        }
         for user in current_users:
             if user['username'] not in create_names:
                 users_to_delete.append(user)
 
-        users_to_create = remove_empty(users_to_create)
         current_users = remove_empty(current_users)
 
         for user in current_users:
             if user['permissions'].get('activeConnectionPermissions'):
                 del user['permissions']['activeConnectionPermissions']
 
-            if user in users_to_create:
-                users_to_create.remove(user)
+        current_fingerprints = {
+            fingerprint(user)
+            for user in current_users
+        }
+
+        changed_users = []
+        for user in remove_empty(users_to_create):
+            if fingerprint(user) in current_fingerprints:
                 general_msg(f"No changes needed for user '{user['username']}'",
                             endpoint)
                 info_msg(user,
                          endpoint,
                          debug)
+            else:
+                changed_users.append(user)
+        users_to_create = changed_users
 
     for user in users_to_create:
         user['password'] = passwords[user['username']]
@@ -250,6 +462,81 @@ def create_user_data(guac_params: dict,
     return users_to_create, users_to_delete, current_users
 
 
+def create_group_data(guac_params: dict,
+                      debug: bool = False) -> list:
+    """
+    Create user group data for the group permissions mode.
+
+    Each range gets a user group holding the permissions to all of the range's
+    connections. Users mapped to every connection of a range become members
+    of its user group, and those permissions are dropped from their own
+    permissions in guac_params['new_users'].
+
+    Args:
+        guac_params (dict): Parameters for creating the data.
+        debug (bool, optional): Whether to enable debug mode.
+
+    Returns:
+        list: The user groups to create, with connection names and members.
+    """
+
+    endpoint = 'Guacamole'
+
+    org_name = guac_params['org_name']
+    new_users = guac_params['new_users']
+
+    # Map each range to the names of its connections
+    range_conns = {
+        group: set()
+        for group in guac_params['new_groups']
+    }
+    for conn in extract_connections(guac_params['new_conns']):
+        if conn.get('protocol') and conn['parent'] in range_conns:
+            range_conns[conn['parent']].add(conn['name'])
+
+    groups_to_create = []
+
+    for group, conn_names in range_conns.items():
+        if not conn_names:
+            continue
+
+        members = []
+        for username, data in new_users.items():
+            permissions = data['permissions']
+            if not conn_names.issubset(permissions['connectionPermissions']):
+                continue
+            members.append(username)
+            permissions['connectionPermissions'] = [
+                conn_name
+                for conn_name in permissions['connectionPermissions']
+                if conn_name not in conn_names
+            ]
+            permissions['connectionGroupPermissions'] = [
+                conn_name
+                for conn_name in permissions['connectionGroupPermissions']
+                if conn_name not in [group, org_name]
+            ]
+
+        if not members:
+            continue
+
+        groups_to_create.append({
+            'identifier': get_usergroup_name(org_name,
+                                             group),
+            'connectionPermissions': sorted(conn_names),
+            'connectionGroupPermissions': list(dict.fromkeys([group, org_name])),
+            'members': members
+        })
+
+    general_msg(f"Generated {len(groups_to_create)} user groups",
+                endpoint)
+    info_msg(groups_to_create,
+             endpoint,
+             debug)
+
+    return groups_to_create
+
+
 def delete_data(gconn: object,
                 guac_params: object,
                 debug: bool = False) -> dict:
@@ -285,20 +572,86 @@ def delete_data(gconn: object,
     return conns_to_delete, users_to_delete
 
 
+def fast_delete_data(gconn: object,
+                     guac_params: dict,
+                     debug: bool = False) -> tuple:
+    """
+    Create deletion data without reading the connection tree or permissions.
+
+    Guacamole deletes the whole subtree of a connection group, so only the
+    top-most groups of the ranges are returned. They are found through the
+    connection index, and the users through a single user listing.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        guac_params (dict): Parameters for deleting the data.
+        debug (bool, optional): Whether to enable debug mode.
+
+    Returns:
+        tuple: The connection groups and the users to be deleted.
+    """
+
+    org_name = guac_params['org_name']
+    org_id = guac_params['parent_group_id']
+    new_groups = guac_params['new_groups']
+    new_users = guac_params['new_users']
+
+    conns_to_delete = []
+
+    if org_id and org_name in new_groups:
+        conns_to_delete.append({
+            'identifier': org_id,
+            'name': org_name,
+            'type': 'ORGANIZATIONAL'
+        })
+    elif org_id:
+        for group in new_groups:
+            group_id = get_conn_id(gconn,
+                                   group,
+                                   org_id,
+                                   'group',
+                                   debug)
+            if group_id:
+                conns_to_delete.append({
+                    'identifier': group_id,
+                    'name': group,
+                    'type': 'ORGANIZATIONAL'
+                })
+
+    users_to_delete = [
+        user
+        for user in get_users(gconn,
+                              org_name,
+                              debug,
+                              False)
+        if user['username'] in new_users
+    ]
+
+    return conns_to_delete, users_to_delete
+
+
 def create_conns(gconn: object,
                  conns_to_make: dict,
                  current_conns: dict = None,
                  update: bool = False,
-                 debug: bool = False) -> dict:
+                 debug: bool = False,
+                 workers: int = 1,
+                 parent_ids: dict | None = None) -> dict:
     """
     Create Guacamole connections
 
+    The connections are created level by level, so every parent exists
+    before its children, and the siblings of each level are created
+    concurrently.
+
     Args:
         gconn (object): The Guacamole connection object.
         conns_to_make (dict): List of connections to create.
         current_conns (dict, optional): List of current connections.
         update (bool, optional): Whether to update connections.
         debug (bool, optional): Whether to enable debug mode.
+        workers (int, optional): The maximum number of concurrent requests.
+        parent_ids (dict, optional): The IDs of existing parents by name.
 
     Returns:
         dict: A dictionary containing the connection IDs.
@@ -306,11 +659,11 @@ def create_conns(gconn: object,
 
     endpoint = 'Guacamole'
     operation = "Updated" if update else "Created"
-    current_names = []
-    conn_ids = {'ROOT': 'ROOT'}
+    current_names = set()
+    conn_ids = {'ROOT': 'ROOT', **(parent_ids or {})}
 
     for conn in current_conns:
-        current_names.append(conn['name'])
+        current_names.add(conn['name'])
         conn_ids[conn['name']] = conn['identifier']
 
     if not conns_to_make:
@@ -318,22 +671,30 @@ def create_conns(gconn: object,
                     endpoint)
         return conn_ids
 
-    for conn in conns_to_make:
-        conn_id = None
-        if conn['name'] in current_names:
-            if update:
-                conn_id = conn_ids[conn['name']]
-                current_names.remove(conn['name'])
-            else:
-                general_msg(f"Connection '{conn['name']}' already exists",
-                            endpoint)
-                continue
-        parent_id = conn_ids[conn['parent']]
-        conn_ids[conn['name']] = create_conn(gconn,
-                                             parent_id,
-                                             conn,
-                                             conn_id,
-                                             debug)
+    for _, conns in get_conn_levels(conns_to_make):
+        tasks = []
+        for conn in conns:
+            conn_id = None
+            if conn['name'] in current_names:
+                if update:
+                    conn_id = conn_ids[conn['name']]
+                    current_names.discard(conn['name'])
+                else:
+                    general_msg(f"Connection '{conn['name']}' already exists",
+                                endpoint)
+                    continue
+            tasks.append((conn, conn_ids[conn['parent']], conn_id))
+
+        conn_ids.update(run_parallel(
+            lambda task: (task[0]['name'],
+                          create_conn(gconn,
+                                      task[1],
+                                      task[0],
+                                      task[2],
+                                      debug)),
+            tasks,
+            workers
+        ))
 
     success_msg(f"{operation} Connections",
                 endpoint)
@@ -363,12 +724,7 @@ def create_conn(gconn: object,
     endpoint = 'Guacamole'
     operation = "Updated" if conn_id else "Created"
 
-    if conn_data.get('type'):
-        conn_type = "group"
-    elif conn_data.get('protocol'):
-        conn_type = "connection"
-    else:
-        conn_type = "sharing profile"
+    conn_type = get_conn_type(conn_data)
 
     if conn_type == "group":
         if conn_id:
@@ -404,6 +760,12 @@ def create_conn(gconn: object,
     if not conn_id:
         conn_id = response.get('identifier')
 
+    index_conn(gconn,
+               conn_type,
+               parent_id,
+               conn_data['name'],
+               conn_id)
+
     if isinstance(response, dict) and response.get('message'):
         general_msg(response['message'],
                     endpoint)
@@ -421,17 +783,26 @@ def create_conn(gconn: object,
 
 
 def delete_conns(gconn: object,
-                 conns: list) -> None:
+                 conns: list,
+                 current_conns: list | None = None,
+                 workers: int = 1,
+                 retries: int = 2) -> dict:
     """
     Delete connection groups in Guacamole.
 
+    Each independent subtree is deleted concurrently, and deletes that fail
+    with a transient error are retried.
+
     Args:
         gconn (object): The connection object.
-        conn_ids (list): List of group IDs to delete.
-        debug (bool, optional): Flag to enable debug mode. Defaults to False.
+        conns (list): The connection objects or IDs to delete.
+        current_conns (list, optional): The current connection tree, used to
+            find the connections that are deleted along with an ancestor.
+        workers (int, optional): The maximum number of concurrent deletes.
+        retries (int, optional): The number of retries after a transient error.
 
     Returns:
-        None
+        dict: The summary of the deleted and failed connections.
     """
 
     endpoint = 'Guacamole'
@@ -440,53 +811,64 @@ def delete_conns(gconn: object,
     if not conns:
         general_msg("No Connections to Delete",
                     endpoint)
-        return
+        return {'deleted': [], 'failed': []}
 
     if len(conns) > 1:
-        conns = remove_children(conns)
-
-    print(conns)
-
-    # Iterate over the connections and delete each connection
-    for conn in conns:
-        delete_conn(gconn,
-                    conn)
+        conns = remove_children(conns,
+                                current_conns)
+
+    results = run_parallel(lambda conn: delete_conn(gconn,
+                                                    conn),
+                           conns,
+                           workers,
+                           retries)
+
+    summary = summarize_deletes([
+        conn.get('name', conn['identifier']) if isinstance(conn, dict) else conn
+        for conn in conns
+    ], results)
+
+    if summary['failed']:
+        error_msg(f"Deleted {len(summary['deleted'])} of {len(conns)} connection subtrees, "
+                  f"failed to delete {summary['failed']}",
+                  endpoint)
+    else:
+        success_msg(f"Deleted {len(summary['deleted'])} Connection Subtrees",
+                    endpoint)
 
-    success_msg("Deleted Connection Groups",
-                endpoint)
+    return summary
 
 
 def delete_conn(gconn: object,
                 conn: dict | str,
-                conn_type: str = 'group') -> None:
+                conn_type: str = 'group') -> bool:
     """
-    Deletes a connection group from Guacamole.
+    Deletes a connection group, connection or sharing profile from Guacamole.
 
     Args:
         gconn (object): The connection object for interacting with Guacamole.
         conn (dict | str): The object or ID of the connection to be deleted.
-        debug (bool, optional): Flag to enable debug mode. Defaults to False.
+        conn_type (str, optional): The type of the connection when conn is an
+            ID, read from the object otherwise. Defaults to 'group'.
 
     Returns:
-        None
+        bool: Whether the connection was deleted.
+
+    Raises:
+        TransientError: If Guacamole failed with an internal error.
     """
 
     endpoint = 'Guacamole'
 
     if isinstance(conn, dict):
         conn_id = conn['identifier']
-        if conn.get('type'):
-            conn_type = "group"
-        elif conn.get('protocol'):
-            conn_type = "connection"
-        else:
-            conn_type = "sharing profile"
+        conn_type = get_conn_type(conn)
     elif isinstance(conn, str):
         conn_id = conn
     else:
         error_msg(f"Invalid connection object: {type(conn)}",
                   endpoint)
-        return
+        return False
 
     # Delete the connection group
     if conn_type == "group":
@@ -498,39 +880,76 @@ def delete_conn(gconn: object,
     else:
         error_msg(f"Invalid connection type: {conn_type}",
                   endpoint)
-        return
+        return False
+    time.sleep(0.5)
 
     if isinstance(response, dict) and response.get('message'):
+        check_transient(response)
         general_msg(response['message'],
                     endpoint)
-    else:
-        general_msg(
-            f"Deleted {conn_type} ID '{conn_id}'",
-            endpoint
-        )
-    time.sleep(0.5)
+        return False
+
+    unindex_conn(gconn,
+                 conn_type,
+                 conn_id)
+    general_msg(
+        f"Deleted {conn_type} ID '{conn_id}'",
+        endpoint
+    )
 
+    return True
 
-def remove_children(connections: list) -> list:
+
+def remove_children(connections: list,
+                    all_connections: list | None = None) -> list:
     """
-    Remove connection groups that are children of other connections in the list.
+    Reduce connections to the top-most ones of each subtree.
+
+    Guacamole deletes everything below a connection group or connection, so
+    a connection is dropped when any of its ancestors, at any depth, is in the
+    list. Ancestors are resolved through a parent index built once from
+    all_connections, so intermediate levels don't need to be in the list.
 
     Parameters:
-        connections (list): A list of connection groups.
+        connections (list): A list of connection groups, connections
+            and sharing profiles.
+        all_connections (list, optional): The full connection tree the
+            connections belong to. Defaults to the connections themselves.
 
     Returns:
-        list: The reduced list of connection groups with children removed.
+        list: The reduced list with one connection per independent subtree.
     """
 
-    connections_to_delete = connections.copy()
-    parent_identifiers = {connection['identifier'] for connection in connections}
-
-    for connection in connections:
-        if (connection.get('parentIdentifier') in parent_identifiers or
-            connection.get('primaryConnectionIdentifier') in parent_identifiers):
-            connections_to_delete.remove(connection)
+    # Index each node's parent, keyed by type since identifiers are per type
+    parents = {}
+    for connection in (all_connections or []) + connections:
+        parents[get_conn_node(connection)] = get_parent_node(connection)
 
-    return connections_to_delete
+    delete_nodes = {
+        get_conn_node(connection)
+        for connection in connections
+    }
+    covered = {}
+
+    def is_covered(node: tuple) -> bool:
+        # Walk up to the first ancestor with a known answer
+        path = []
+        parent = parents.get(node)
+        while parent in parents and parent not in covered:
+            if parent in delete_nodes:
+                break
+            path.append(parent)
+            parent = parents.get(parent)
+        result = parent in delete_nodes or covered.get(parent, False)
+        for ancestor in path:
+            covered[ancestor] = result
+        return result
+
+    return [
+        connection
+        for connection in connections
+        if not is_covered(get_conn_node(connection))
+    ]
 
 
 def create_users(gconn: object,
@@ -900,16 +1319,23 @@ def update_user_perm(gconn: object,
 
 
 def delete_users(gconn: object,
-                 users_to_delete: list) -> None:
+                 users_to_delete: list,
+                 workers: int = 1,
+                 retries: int = 2) -> dict:
     """
     Delete user accounts
 
+    The users are deleted concurrently, and deletes that fail with a
+    transient error are retried.
+
     Args:
         gconn (object): The Guacamole connection object.
         users_to_delete (list): A list of user accounts to delete.
+        workers (int, optional): The maximum number of concurrent deletes.
+        retries (int, optional): The number of retries after a transient error.
 
     Returns:
-        None
+        dict: The summary of the deleted and failed user accounts.
     """
 
     endpoint = 'Guacamole'
@@ -918,19 +1344,33 @@ def delete_users(gconn: object,
     if not users_to_delete:
         general_msg("No User Accounts to Delete",
                     endpoint)
-        return
+        return {'deleted': [], 'failed': []}
 
     # Delete each user account in the list
-    for user in users_to_delete:
-        delete_user(gconn,
-                    user)
+    results = run_parallel(lambda user: delete_user(gconn,
+                                                    user),
+                           users_to_delete,
+                           workers,
+                           retries)
+
+    summary = summarize_deletes([
+        user['username'] if isinstance(user, dict) else user
+        for user in users_to_delete
+    ], results)
+
+    if summary['failed']:
+        error_msg(f"Deleted {len(summary['deleted'])} of {len(users_to_delete)} user accounts, "
+                  f"failed to delete {summary['failed']}",
+                  endpoint)
+    else:
+        success_msg(f"Deleted {len(summary['deleted'])} User Accounts",
+                    endpoint)
 
-    success_msg("Deleted User Accounts",
-                endpoint)
+    return summary
 
 
 def delete_user(gconn: object,
-                user: dict | str) -> None:
+                user: dict | str) -> bool:
     """
     Delete a user from the Guacamole system.
 
@@ -939,7 +1379,10 @@ def delete_user(gconn: object,
         user (str): The username of the user to be deleted.
 
     Returns:
-        None
+        bool: Whether the user was deleted.
+
+    Raises:
+        TransientError: If Guacamole failed with an internal error.
     """
 
     endpoint = 'Guacamole'
@@ -948,16 +1391,284 @@ def delete_user(gconn: object,
         user = user['username']
 
     response = gconn.delete_user(user)
+    time.sleep(0.5)
+
+    if isinstance(response, dict) and response.get('message'):
+        check_transient(response)
+        general_msg(response['message'],
+                    endpoint)
+        return False
+
+    general_msg(f"Deleted user account '{user}'",
+                endpoint)
+
+    return True
+
+
+def create_user_groups(gconn: object,
+                       groups_to_create: list,
+                       conn_ids: dict,
+                       update: bool = False,
+                       debug: bool = False) -> None:
+    """
+    Creates Guacamole user groups, grants them their connection permissions
+    and adds their members.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        groups_to_create (list): The user groups from create_group_data.
+        conn_ids (dict): A dictionary of connection names to IDs.
+        update (bool, optional): Whether to update existing user groups.
+        debug (bool, optional): Whether to enable debug mode.
+
+    Returns:
+        None
+    """
+
+    endpoint = 'Guacamole'
+    operation = "Updated" if update else "Created"
+
+    if not groups_to_create:
+        general_msg("There are no new user groups",
+                    endpoint)
+        return
+
+    current_groups = gconn.list_usergroups()
+    if not isinstance(current_groups, dict):
+        error_msg(current_groups,
+                  endpoint)
+        return
+
+    for group in groups_to_create:
+        identifier = group['identifier']
+        connection_ids = {
+            'group': [
+                conn_ids[conn_name]
+                for conn_name in group['connectionGroupPermissions']
+                if conn_ids.get(conn_name)
+            ],
+            'connection': [
+                conn_ids[conn_name]
+                for conn_name in group['connectionPermissions']
+                if conn_ids.get(conn_name)
+            ]
+        }
+        members = group['members']
+        remove_members = []
+
+        if identifier in current_groups:
+            permissions = gconn.detail_usergroup_permissions(identifier)
+            current_members = guacamole_request(gconn,
+                                                'GET',
+                                                f"/userGroups/{identifier}/memberUsers")
+            if not isinstance(permissions, dict) or not isinstance(current_members, list):
+                error_msg(f"Could not retrieve user group '{identifier}'",
+                          endpoint)
+                continue
+            current_connection_ids = {
+                'group': permissions.get('connectionGroupPermissions', {}).keys(),
+                'connection': permissions.get('connectionPermissions', {}).keys()
+            }
+            connection_ids, remove_ids = get_id_difference(connection_ids,
+                                                           current_connection_ids)
+            members = [
+                member
+                for member in members
+                if member not in current_members
+            ]
+            remove_members = [
+                member
+                for member in current_members
+                if member not in group['members']
+            ]
+
+            for conn_type, ids in remove_ids.items():
+                if ids:
+                    update_usergroup_conn(gconn,
+                                          identifier,
+                                          ids,
+                                          conn_type,
+                                          'remove')
+        else:
+            response = gconn.create_usergroup(identifier)
+            if isinstance(response, dict) and response.get('message'):
+                error_msg(response['message'],
+                          endpoint)
+                continue
+            general_msg(f"Created user group '{identifier}'",
+                        endpoint)
+            time.sleep(0.5)
+
+        for conn_type, ids in connection_ids.items():
+            if not ids:
+                info_msg(
+                    f"No {conn_type} permissions to add to user group '{identifier}'",
+                    endpoint,
+                    debug
+                )
+                continue
+            update_usergroup_conn(gconn,
+                                  identifier,
+                                  ids,
+                                  conn_type,
+                                  'add')
+
+        if remove_members:
+            update_usergroup_members(gconn,
+                                     identifier,
+                                     remove_members,
+                                     'remove')
+        if members:
+            update_usergroup_members(gconn,
+                                     identifier,
+                                     members,
+                                     'add')
+
+    success_msg(f"{operation} User Groups",
+                endpoint)
+
+
+def update_usergroup_conn(gconn: object,
+                          identifier: str,
+                          conn_ids: list,
+                          conn_type: str = 'connection',
+                          operation: str = 'add') -> None:
+    """
+    Updates a user group's connection permissions
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        identifier (str): The identifier of the user group.
+        conn_ids (list): A list of connection IDs.
+        conn_type (str, optional): The type of connection. Defaults to 'connection'.
+        operation (str, optional): The operation to perform. Defaults to 'add'.
+
+    Returns:
+        None
+    """
+
+    endpoint = 'Guacamole'
+
+    action = 'Added' if operation == 'add' else 'Removed'
+
+    response = gconn.update_usergroup_connections(identifier,
+                                                  list(conn_ids),
+                                                  operation,
+                                                  conn_type)
+
+    if isinstance(response, dict) and response.get('message'):
+        general_msg(response['message'],
+                    endpoint)
+    else:
+        general_msg(f"{action} user group '{identifier}' {conn_type} permissions",
+                    endpoint)
+    time.sleep(0.5)
+
+
+def update_usergroup_members(gconn: object,
+                             identifier: str,
+                             usernames: list,
+                             operation: str = 'add') -> None:
+    """
+    Updates the members of a user group
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        identifier (str): The identifier of the user group.
+        usernames (list): A list of usernames.
+        operation (str, optional): The operation to perform. Defaults to 'add'.
+
+    Returns:
+        None
+    """
+
+    endpoint = 'Guacamole'
+
+    action = 'Added' if operation == 'add' else 'Removed'
+
+    response = gconn.update_usergroup_member(usernames,
+                                             identifier,
+                                             operation)
 
     if isinstance(response, dict) and response.get('message'):
         general_msg(response['message'],
                     endpoint)
     else:
-        general_msg(f"Deleted user account '{user}'",
+        general_msg(f"{action} {len(usernames)} members of user group '{identifier}'",
                     endpoint)
     time.sleep(0.5)
 
 
+def delete_user_groups(gconn: object,
+                       guac_params: dict) -> None:
+    """
+    Delete the user groups of the ranges being deprovisioned
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        guac_params (dict): The parameters for Guacamole.
+
+    Returns:
+        None
+    """
+
+    endpoint = 'Guacamole'
+
+    current_groups = gconn.list_usergroups()
+    if not isinstance(current_groups, dict):
+        error_msg(current_groups,
+                  endpoint)
+        return
+
+    identifiers = [
+        get_usergroup_name(guac_params['org_name'],
+                           group)
+        for group in guac_params['new_groups']
+    ]
+    identifiers = [
+        identifier
+        for identifier in identifiers
+        if identifier in current_groups
+    ]
+
+    if not identifiers:
+        general_msg("No User Groups to Delete",
+                    endpoint)
+        return
+
+    for identifier in identifiers:
+        response = gconn.delete_usergroup(identifier)
+        if isinstance(response, dict) and response.get('message'):
+            general_msg(response['message'],
+                        endpoint)
+        else:
+            general_msg(f"Deleted user group '{identifier}'",
+                        endpoint)
+        time.sleep(0.5)
+
+    success_msg("Deleted User Groups",
+                endpoint)
+
+
+def get_usergroup_name(org_name: str,
+                       group: str) -> str:
+    """
+    Generate the user group identifier of a range.
+
+    Args:
+        org_name (str): The name of the organization.
+        group (str): The name of the range's connection group.
+
+    Returns:
+        str: The user group identifier.
+    """
+
+    if group == org_name:
+        return org_name
+
+    return f"{org_name}.{group}"
+
+
 def get_conn_id(gconn: object,
                 conn_name: str,
                 parent_id: str,
@@ -966,6 +1677,9 @@ def get_conn_id(gconn: object,
     """
     Retrieves the connection ID for a given connection name and group ID from Guacamole.
 
+    Lookups are served from the session's connection index, which is built
+    from a single listing of each connection type on first use.
+
     Args:
         gconn (object): The Guacamole connection object.
         conn_name (str): The name of the connection.
@@ -986,53 +1700,24 @@ def get_conn_id(gconn: object,
                   endpoint)
         return None
 
-    if conn_type in ['any', 'group']:
-        groups = gconn.list_connection_groups()
-        if not isinstance(groups, dict):
-            error_msg(groups,
-                      endpoint)
-            return None
-        for group in groups.values():
-            # Find the group with the given name and parent ID
-            if (group['parentIdentifier'] == parent_id and
-                    group['name'] == conn_name):
-                conn_id = group['identifier']
-                info_msg(f"Retrieved {conn_name}'s {conn_type} ID '{conn_id}'",
-                         endpoint,
-                         debug)
-                return conn_id
-
-    if conn_type in ['any', 'connection']:
-        conns = gconn.list_connections()
-        if not isinstance(conns, dict):
-            error_msg(conns,
-                      endpoint)
-            return None
-        for conn in conns.values():
-            # Find the connection with the given name and parent ID
-            if (conn['parentIdentifier'] == parent_id and
-                    conn['name'] == conn_name):
-                conn_id = conn['identifier']
-                info_msg(f"Retrieved {conn_name}'s {conn_type} ID '{conn_id}'",
-                         endpoint,
-                         debug)
-                return conn_id
-
-    if conn_type in ['any', 'sharing profile']:
-        sharings = gconn.list_sharing_profile()
-        if not isinstance(sharings, dict):
-            error_msg(sharings,
-                      endpoint)
-            return None
-        for sharing in sharings.values():
-            # Find the connection with the given name and parent ID
-            if (sharing['primaryConnectionIdentifier'] == parent_id and
-                    sharing['name'] == conn_name):
-                conn_id = sharing['identifier']
-                info_msg(f"Retrieved {conn_name}'s {conn_type} ID '{conn_id}'",
-                         endpoint,
-                         debug)
-                return conn_id
+    conn_index = get_conn_index(gconn,
+                                debug)
+    if conn_index is None:
+        return None
+
+    if conn_type == 'any':
+        conn_types = ['group', 'connection', 'sharing profile']
+    else:
+        conn_types = [conn_type]
+
+    for index_type in conn_types:
+        # Find the connection with the given type, name and parent ID
+        conn_id = conn_index['names'].get((index_type, parent_id, conn_name))
+        if conn_id:
+            info_msg(f"Retrieved {conn_name}'s {conn_type} ID '{conn_id}'",
+                     endpoint,
+                     debug)
+            return conn_id
 
     general_msg(
         f"{conn_name} has no connection ID under '{parent_id}'",
@@ -1081,7 +1766,8 @@ def get_conns(gconn: object,
 
 def get_users(gconn: object,
               org_name: str,
-              debug: bool = False) -> list[str]:
+              debug: bool = False,
+              permissions: bool = True) -> list[str]:
     """
     Retrieves a list of users from the Guacamole connection object that belong
     to a specific organization.
@@ -1090,6 +1776,8 @@ def get_users(gconn: object,
         gconn (object): The Guacamole connection object.
         org_name (str): The name of the organization.
         debug (bool, optional): Flag to enable debug mode. Defaults to False.
+        permissions (bool, optional): Whether to retrieve each user's
+            permissions. Defaults to True.
 
     Returns:
         list[str]: A list of usernames belonging to the specified organization.
@@ -1097,27 +1785,36 @@ def get_users(gconn: object,
 
     endpoint = 'Guacamole'
 
-    # Filter the users based on the organization name
-    users_list = gconn.list_users()
-    if not isinstance(users_list, dict):
+    # Filter the users based on the organization name while they are listed
+    users_list = guacamole_items(gconn,
+                                 '/users',
+                                 gconn.list_users)
+    if not isinstance(users_list, Iterator):
         error_msg(users_list,
                   endpoint)
         return []
 
-    users = [
-        user
-        for user in users_list.values()
-        if user['attributes']['guac-organization'] == org_name
-    ]
+    # A streamed listing can fail after its first users
+    try:
+        users = [
+            user
+            for _, user in users_list
+            if user['attributes']['guac-organization'] == org_name
+        ]
+    except (json.JSONDecodeError, requests.RequestException) as error:
+        error_msg(f"Failed to list the Guacamole users. {error}",
+                  endpoint)
+        return []
 
     if not users:
         general_msg("There are no current user accounts",
                     endpoint)
         return []
 
-    for user in users:
-        user['permissions'] = gconn.detail_user_permissions(user['username'])
-        time.sleep(0.5)
+    if permissions:
+        for user in users:
+            user['permissions'] = gconn.detail_user_permissions(user['username'])
+            time.sleep(0.5)
 
     general_msg("Retrieved current users accounts",
                 endpoint)
@@ -1223,50 +1920,6 @@ def detail_conns(gconn: object,
     return obj
 
 
-def extract_connections(obj: dict,
-                        parent='ROOT') -> object:
-    """
-    Recursively walks through an object and extracts connection groups,
-    connections, and sharing groups.
-
-    Parameters:
-    obj (dict): The object to extract groups and connections from.
-
-    Returns:
-    object: The extracted connection groups, connections, and sharing groups.
-    """
-
-    conns = []
-
-    if isinstance(obj, dict):
-        if obj.get('name'):
-            conn = obj.copy()
-            conn['parent'] = parent
-            if conn.get('childConnectionGroups'):
-                del conn['childConnectionGroups']
-            elif conn.get('childConnections'):
-                del conn['childConnections']
-            elif conn.get('sharingProfiles'):
-                del conn['sharingProfiles']
-            conns.append(conn)
-            parent = obj['name']
-
-        for value in obj.values():
-            if isinstance(value, (dict, list)):
-                child_conns = extract_connections(value,
-                                                  parent)
-                conns.extend(child_conns)
-
-    elif isinstance(obj, list):
-        for item in obj:
-            if isinstance(item, (dict, list)):
-                child_conns = extract_connections(item,
-                                                  parent)
-                conns.extend(child_conns)
-
-    return conns
-
-
 def get_id_difference(connection_ids: dict,
                       current_connection_ids: dict) -> object:
     """
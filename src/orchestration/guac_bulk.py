@@ -0,0 +1,226 @@
+"""
+Contains the batch creation and concurrent delete helpers for provisioning
+Guacamole
+"""
+import time
+from orchestration.guac_index import (CONN_DIRECTORIES, extract_connections,
+                                      get_conn_type, index_conn)
+from utils.concurrency import TransientError
+from utils.connections import guacamole_request
+from utils.msg_format import error_msg, info_msg, success_msg, general_msg
+
+# Maximum number of objects in one batch PATCH request, see create_conns_bulk
+BULK_BATCH_SIZE = 500
+
+
+def create_conns_bulk(gconn: object,
+                      conns_to_make: list,
+                      debug: bool = False,
+                      parent_ids: dict | None = None) -> dict | None:
+    """
+    Create a new Guacamole connection tree with batch PATCH requests
+
+    Each level of the tree is submitted as one batch per directory (connection
+    groups, connections and sharing profiles), so the number of requests
+    depends on the depth of the tree instead of the number of connections.
+    The identifiers are then resolved with a single read of the new tree.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        conns_to_make (list): List of connections to create, parents first.
+        debug (bool, optional): Whether to enable debug mode.
+        parent_ids (dict, optional): The IDs of existing parents by name.
+
+    Returns:
+        dict: A dictionary containing the connection IDs. If the server
+            doesn't support batch requests, None is returned.
+    """
+
+    endpoint = 'Guacamole'
+    conn_ids = {'ROOT': 'ROOT', **(parent_ids or {})}
+
+    if not conns_to_make:
+        general_msg("There Are No New Connections",
+                    endpoint)
+        return conn_ids
+
+    requests_made = 0
+    for conn_type, conns in get_conn_levels(conns_to_make):
+        for start in range(0, len(conns), BULK_BATCH_SIZE):
+            batch = conns[start:start + BULK_BATCH_SIZE]
+            response = guacamole_request(
+                gconn,
+                'PATCH',
+                CONN_DIRECTORIES[conn_type],
+                json=[
+                    {
+                        'op': 'add',
+                        'path': '/',
+                        'value': get_bulk_value(conn,
+                                                conn_type,
+                                                conn_ids[conn['parent']])
+                    }
+                    for conn in batch
+                ]
+            )
+            time.sleep(0.5)
+
+            patches = response.get('patches') if isinstance(response, dict) else None
+            if not patches or len(patches) != len(batch):
+                if not requests_made:
+                    general_msg("Batch requests are not supported, "
+                                "creating connections individually",
+                                endpoint)
+                    info_msg(response,
+                             endpoint,
+                             debug)
+                    return None
+                error_msg(response,
+                          endpoint)
+                error_msg(f"Failed to create a batch of {conn_type} objects",
+                          endpoint)
+                return conn_ids
+
+            requests_made += 1
+            for conn, patch in zip(batch, patches):
+                conn_ids[conn['name']] = patch.get('identifier')
+                index_conn(gconn,
+                           conn_type,
+                           conn_ids[conn['parent']],
+                           conn['name'],
+                           conn_ids[conn['name']])
+
+            general_msg(f"Created a batch of {len(batch)} {conn_type} objects",
+                        endpoint)
+
+    # Resolve every identifier with one read of the new tree
+    org_id = conn_ids.get(conns_to_make[0]['name'])
+    tree = gconn.detail_connection_group_connections(org_id)
+    if isinstance(tree, dict):
+        for conn in extract_connections(tree):
+            conn_ids[conn['name']] = conn['identifier']
+    else:
+        error_msg(tree,
+                  endpoint)
+
+    info_msg(conn_ids,
+             endpoint,
+             debug)
+    success_msg(f"Created Connections in {requests_made} batches",
+                endpoint)
+
+    return conn_ids
+
+
+def get_conn_levels(conns: list) -> list:
+    """
+    Split a flattened connection tree into levels that can be created in order
+
+    Each level holds connections of a single type at the same depth of the tree,
+    so all of their parents are in earlier levels or already exist.
+
+    Args:
+        conns (list): The connections, with each parent before its children.
+
+    Returns:
+        list: A list of (connection type, connections) tuples.
+    """
+
+    depths = {}
+    levels = {}
+
+    for conn in conns:
+        depth = depths.get(conn['parent'], -1) + 1
+        depths[conn['name']] = depth
+        levels.setdefault(
+            (depth, get_conn_type(conn)), []
+        ).append(conn)
+
+    type_order = ['group', 'connection', 'sharing profile']
+
+    return [
+        (conn_type, levels[(depth, conn_type)])
+        for depth, conn_type in sorted(levels,
+                                       key=lambda level: (level[0],
+                                                          type_order.index(level[1])))
+    ]
+
+
+def get_bulk_value(conn_data: dict,
+                   conn_type: str,
+                   parent_id: str) -> dict:
+    """
+    Format a connection for a batch PATCH request
+
+    Args:
+        conn_data (dict): The connection data.
+        conn_type (str): The type of connection.
+        parent_id (str): The parent identifier of the connection.
+
+    Returns:
+        dict: The connection in the Guacamole REST format.
+    """
+
+    if conn_type == "group":
+        return {
+            'parentIdentifier': parent_id,
+            'name': conn_data['name'],
+            'type': conn_data['type'],
+            'attributes': conn_data.get('attributes', {})
+        }
+    if conn_type == "connection":
+        return {
+            'parentIdentifier': parent_id,
+            'name': conn_data['name'],
+            'protocol': conn_data['protocol'],
+            'parameters': conn_data.get('parameters', {}),
+            'attributes': conn_data.get('attributes', {})
+        }
+    return {
+        'primaryConnectionIdentifier': parent_id,
+        'name': conn_data['name'],
+        'parameters': conn_data.get('parameters', {}),
+        'attributes': conn_data.get('attributes', {})
+    }
+
+
+def check_transient(response: dict) -> None:
+    """
+    Raise a TransientError for Guacamole errors that are worth retrying.
+
+    Args:
+        response (dict): The Guacamole error response.
+
+    Returns:
+        None
+
+    Raises:
+        TransientError: If Guacamole failed with an internal error.
+    """
+
+    if response.get('type') == 'INTERNAL_ERROR':
+        raise TransientError(response['message'])
+
+
+def summarize_deletes(names: list,
+                      results: list) -> dict:
+    """
+    Summarize the results of concurrent deletes.
+
+    Args:
+        names (list): The names of the deleted objects.
+        results (list): The results of the deletes, in the same order.
+
+    Returns:
+        dict: The names of the deleted and failed objects.
+    """
+
+    summary = {'deleted': [], 'failed': []}
+
+    for name, result in zip(names, results):
+        if result is True:
+            summary['deleted'].append(name)
+        else:
+            summary['failed'].append(name)
+
+    return summary
@@ -0,0 +1,357 @@
+"""
+Contains the connection index, connection tree and fingerprint helpers
+for provisioning Guacamole
+"""
+import json
+import threading
+from typing import Iterator
+import requests
+from utils.connections import guacamole_items
+from utils.models import ConnectionGroup
+from utils.msg_format import error_msg, info_msg
+
+# Connection indexes of the Guacamole sessions, see get_conn_index
+_conn_indexes = {}
+_conn_index_lock = threading.Lock()
+
+# REST directory of each connection type
+CONN_DIRECTORIES = {
+    'group': '/connectionGroups',
+    'connection': '/connections',
+    'sharing profile': '/sharingProfiles'
+}
+
+
+def get_conn_index(gconn: object,
+                   debug: bool = False) -> dict | None:
+    """
+    Retrieves the connection index for a Guacamole session, building it
+    from one listing of each connection type if it doesn't exist yet.
+
+    The index maps (type, parent identifier, name) to the identifier of every
+    connection group, connection and sharing profile in the data source.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        debug (bool, optional): Whether to enable debug mode. Defaults to False.
+
+    Returns:
+        dict: The connection index. If a listing fails, None is returned.
+    """
+
+    endpoint = 'Guacamole'
+
+    if gconn in _conn_indexes:
+        return _conn_indexes[gconn]
+
+    # Listings are streamed, only the fields of the index are retained
+    listings = [
+        ('group', 'parentIdentifier', gconn.list_connection_groups),
+        ('connection', 'parentIdentifier', gconn.list_connections),
+        ('sharing profile', 'primaryConnectionIdentifier', gconn.list_sharing_profiles)
+    ]
+
+    conn_index = {
+        'names': {},
+        'nodes': {},
+        'children': {}
+    }
+
+    for conn_type, parent_key, list_conns in listings:
+        conns = guacamole_items(gconn,
+                                CONN_DIRECTORIES[conn_type],
+                                list_conns)
+        if not isinstance(conns, Iterator):
+            error_msg(conns,
+                      endpoint)
+            return None
+        # A streamed listing can fail after its first objects
+        try:
+            for _, conn in conns:
+                add_index_entry(conn_index,
+                                conn_type,
+                                conn.get(parent_key),
+                                conn['name'],
+                                conn['identifier'])
+        except (json.JSONDecodeError, requests.RequestException) as error:
+            error_msg(f"Failed to list the Guacamole {conn_type} objects. {error}",
+                      endpoint)
+            return None
+
+    _conn_indexes[gconn] = conn_index
+
+    info_msg(f"Indexed {len(conn_index['nodes'])} connection objects",
+             endpoint,
+             debug)
+
+    return conn_index
+
+
+def index_conn(gconn: object,
+               conn_type: str,
+               parent_id: str,
+               conn_name: str,
+               conn_id: str) -> None:
+    """
+    Adds a created or updated connection to the session's connection index.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        conn_type (str): The type of connection.
+            Can be 'group', 'connection', or 'sharing profile'.
+        parent_id (str): The parent identifier of the connection.
+        conn_name (str): The name of the connection.
+        conn_id (str): The identifier of the connection.
+
+    Returns:
+        None
+    """
+
+    conn_index = _conn_indexes.get(gconn)
+    if conn_index is None or not conn_id:
+        return
+
+    with _conn_index_lock:
+        remove_index_entry(conn_index,
+                           conn_type,
+                           conn_id,
+                           False)
+        add_index_entry(conn_index,
+                        conn_type,
+                        parent_id,
+                        conn_name,
+                        conn_id)
+
+
+def unindex_conn(gconn: object,
+                 conn_type: str,
+                 conn_id: str) -> None:
+    """
+    Removes a deleted connection and its whole subtree from the session's
+    connection index, mirroring Guacamole's cascading delete.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        conn_type (str): The type of connection.
+            Can be 'group', 'connection', or 'sharing profile'.
+        conn_id (str): The identifier of the connection.
+
+    Returns:
+        None
+    """
+
+    conn_index = _conn_indexes.get(gconn)
+    if conn_index is None:
+        return
+
+    with _conn_index_lock:
+        remove_index_entry(conn_index,
+                           conn_type,
+                           conn_id,
+                           True)
+
+
+def clear_conn_index(gconn: object) -> None:
+    """
+    Drops the connection index of a Guacamole session so the next lookup
+    rebuilds it from the server.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+
+    Returns:
+        None
+    """
+
+    _conn_indexes.pop(gconn, None)
+
+
+def add_index_entry(conn_index: dict,
+                    conn_type: str,
+                    parent_id: str,
+                    conn_name: str,
+                    conn_id: str) -> None:
+    """
+    Adds a single connection to a connection index.
+
+    Args:
+        conn_index (dict): The connection index.
+        conn_type (str): The type of connection.
+        parent_id (str): The parent identifier of the connection.
+        conn_name (str): The name of the connection.
+        conn_id (str): The identifier of the connection.
+
+    Returns:
+        None
+    """
+
+    parent_type = 'connection' if conn_type == 'sharing profile' else 'group'
+
+    conn_index['names'][(conn_type, parent_id, conn_name)] = conn_id
+    conn_index['nodes'][(conn_type, conn_id)] = (parent_id, conn_name)
+    conn_index['children'].setdefault(
+        (parent_type, parent_id), set()
+    ).add((conn_type, conn_id))
+
+
+def remove_index_entry(conn_index: dict,
+                       conn_type: str,
+                       conn_id: str,
+                       cascade: bool = True) -> None:
+    """
+    Removes a connection from a connection index, optionally with its subtree.
+
+    Args:
+        conn_index (dict): The connection index.
+        conn_type (str): The type of connection.
+        conn_id (str): The identifier of the connection.
+        cascade (bool, optional): Whether to remove the children as well.
+            Defaults to True.
+
+    Returns:
+        None
+    """
+
+    pending = [(conn_type, conn_id)]
+
+    while pending:
+        node = pending.pop()
+        entry = conn_index['nodes'].pop(node, None)
+        if entry:
+            parent_id, conn_name = entry
+            parent_type = 'connection' if node[0] == 'sharing profile' else 'group'
+            conn_index['names'].pop((node[0], parent_id, conn_name), None)
+            conn_index['children'].get((parent_type, parent_id), set()).discard(node)
+        if cascade:
+            pending.extend(conn_index['children'].pop(node, ()))
+
+
+def get_conn_type(conn: dict) -> str:
+    """
+    Get the type of a connection object.
+
+    Parameters:
+        conn (dict): The connection group, connection or sharing profile.
+
+    Returns:
+        str: The type of connection, 'group', 'connection' or 'sharing profile'.
+    """
+
+    if conn.get('type'):
+        return "group"
+    if conn.get('protocol'):
+        return "connection"
+    return "sharing profile"
+
+
+def get_conn_node(conn: dict) -> tuple:
+    """
+    Get the typed identifier of a connection object.
+
+    Parameters:
+        conn (dict): The connection group, connection or sharing profile.
+
+    Returns:
+        tuple: The connection type and identifier.
+    """
+
+    return (get_conn_type(conn), conn.get('identifier'))
+
+
+def get_parent_node(conn: dict) -> tuple:
+    """
+    Get the typed identifier of a connection object's parent.
+
+    Parameters:
+        conn (dict): The connection group, connection or sharing profile.
+
+    Returns:
+        tuple: The parent's connection type and identifier.
+    """
+
+    if conn.get('primaryConnectionIdentifier'):
+        return ('connection', conn['primaryConnectionIdentifier'])
+
+    return ('group', conn.get('parentIdentifier'))
+
+
+def extract_connections(obj: dict,
+                        parent='ROOT') -> object:
+    """
+    Recursively walks through an object and extracts connection groups,
+    connections, and sharing groups.
+
+    Parameters:
+    obj (dict | ConnectionGroup): The object to extract groups and connections from.
+
+    Returns:
+    object: The extracted connection groups, connections, and sharing groups.
+    """
+
+    if isinstance(obj, ConnectionGroup):
+        return obj.flatten(parent)
+
+    conns = []
+
+    if isinstance(obj, dict):
+        if obj.get('name'):
+            conn = obj.copy()
+            conn['parent'] = parent
+            if conn.get('childConnectionGroups'):
+                del conn['childConnectionGroups']
+            elif conn.get('childConnections'):
+                del conn['childConnections']
+            elif conn.get('sharingProfiles'):
+                del conn['sharingProfiles']
+            conns.append(conn)
+            parent = obj['name']
+
+        for value in obj.values():
+            if isinstance(value, (dict, list)):
+                child_conns = extract_connections(value,
+                                                  parent)
+                conns.extend(child_conns)
+
+    elif isinstance(obj, list):
+        for item in obj:
+            if isinstance(item, (dict, list)):
+                child_conns = extract_connections(item,
+                                                  parent)
+                conns.extend(child_conns)
+
+    return conns
+
+
+def fingerprint(obj: object) -> object:
+    """
+    Recursively builds a hashable fingerprint of a dictionary or a list.
+
+    Empty values are dropped the same way as remove_empty, so two objects
+    have the same fingerprint when their remove_empty forms are equal.
+
+    obj:
+    dictionary (dict or list): The dictionary or list to fingerprint.
+
+    Returns:
+    object: The hashable fingerprint of the object.
+    """
+    if isinstance(obj, dict):
+        return frozenset(
+            (key, fingerprint(value))
+            for key, value in obj.items()
+            if value
+        )
+    if isinstance(obj, list):
+        return tuple(
+            fingerprint(item)
+            for item in obj
+            if item
+        )
+    if isinstance(obj, set):
+        return frozenset(
+            fingerprint(item)
+            for item in obj
+            if item
+        )
+
+    return obj
@@ -205,7 +205,7 @@ def upload_objs(conn: object,
     info_msg(f"Listing objects from '{container_name}'",
              endpoint,
              debug)
-    info_msg(json.dumps(objects, indent=4),
+    info_msg(lambda: json.dumps(objects, indent=4),
              endpoint,
              debug)
     for obj in objects:
@@ -227,7 +227,7 @@ def delete_objs(conn: object,
                   endpoint)
         return
 
-    info_msg(json.dumps(objects, indent=4),
+    info_msg(lambda: json.dumps(objects, indent=4),
              endpoint,
              debug)
     general_msg(f"Deleting objects from '{container_name}'",
@@ -8,7 +8,9 @@ Description:
     Handles the logic for provisioning Guacamole
 """
 from orchestration import guac
-from utils.generate import generate_groups, generate_users, format_users, format_groups, generate_conns
+from utils.generate import (generate_groups, generate_users, format_users, format_groups,
+                            generate_conns, iter_range_conns, index_instances)
+from utils.metrics import phase
 from utils.msg_format import error_msg, info_msg
 
 
@@ -76,11 +78,12 @@ def provision(conn: object,
 
     # Populate the guac_params
     guac_params['org_name'] = globals['org_name']
-    guac_params['parent_group_id'] = guac.get_conn_id(gconn,
-                                                      guac_params['org_name'],
-                                                      'ROOT',
-                                                      'group',
-                                                      debug)
+    with phase('Guacamole read'):
+        guac_params['parent_group_id'] = guac.get_conn_id(gconn,
+                                                          guac_params['org_name'],
+                                                          'ROOT',
+                                                          'group',
+                                                          debug)
     # Check if the group exists
     if update and not guac_params['parent_group_id']:
         error_msg(
@@ -104,41 +107,76 @@ def provision(conn: object,
     guac_params['delay'] = guacamole_globals.get(
         'delay', 0.5 # For backward compatibility
     )
+    guac_params['group_permissions'] = guacamole_globals.get(
+        'group_permissions', False # For backward compatibility
+    )
+    guac_params['workers'] = guacamole_globals.get(
+        'workers', 1 # For backward compatibility
+    )
+    guac_params['fast_deprovision'] = guacamole_globals.get(
+        'fast_deprovision', False # For backward compatibility
+    )
 
-    # Format the users.yaml data into groups and users data
+    # Format the users.yaml data into groups, or generate them if no users are specified
     if user_params:
         guac_params['new_groups'] = format_groups(user_params,
+                                                  debug)
+    else:
+        guac_params['new_groups'] = generate_groups(globals,
                                                     debug)
-        guac_params['instances'] = guac.get_heat_instances(conn,
-                                                            guac_params,
-                                                            debug) if create else []
+    guac_params['instances'] = guac.get_heat_instances(conn,
+                                                        guac_params,
+                                                        debug) if create else []
+
+    # Index the instance names once for expanding the users' instance mappings
+    instance_names = index_instances(guac_params['instances'])
+    if user_params:
         guac_params['new_users'] = format_users(user_params,
                                                 guac_params,
-                                                debug)
-    # If no users are specified, generate the groups and users data
+                                                debug,
+                                                instance_names)
     else:
-        guac_params['new_groups'] = generate_groups(globals,
-                                                    debug)
-        guac_params['instances'] = guac.get_heat_instances(conn,
-                                                            guac_params,
-                                                            debug) if create else []
         guac_params['new_users'] = generate_users(globals,
-                                                    guac_params,
-                                                    debug)
+                                                  guac_params,
+                                                  debug,
+                                                  instance_names)
     if create and guac_params['mapped_only']:
         guac_params['instances'] = guac.reduce_heat_instances(guac_params,
                                                                 debug)
+    # Deprovision by deleting the range groups without reading their contents
+    if not create and guac_params['fast_deprovision']:
+        guac.deprovision(gconn,
+                         guac_params,
+                         debug)
+        return
+
+    # Provision a new organization one range at a time while it is generated
+    if (create and not update and not guac_params['parent_group_id'] and
+            not guac_params['group_permissions']):
+        with phase('Guacamole read'):
+            guac_params['users'] = guac.get_users(gconn,
+                                                  guac_params['org_name'],
+                                                  debug)
+        with phase('Guacamole apply'):
+            guac.provision_ranges(gconn,
+                                  guac_params,
+                                  iter_range_conns(guac_params),
+                                  debug)
+        return
+
     # Populate the guac_params with current connection and user data
-    guac_params['new_conns'] = generate_conns(globals,
-                                               guac_params,
-                                               debug)
-    guac_params['conns'] = guac.get_conns(gconn,
-                                          guac_params['parent_group_id'],
-                                          debug)
-
-    guac_params['users'] = guac.get_users(gconn,
-                                          guac_params['org_name'],
-                                          debug)
+    with phase('Guacamole generate'):
+        guac_params['new_conns'] = generate_conns(globals,
+                                                   guac_params,
+                                                   debug)
+    with phase('Guacamole read'):
+        guac_params['conns'] = guac.get_conns(gconn,
+                                              guac_params['parent_group_id'],
+                                              debug)
+
+        guac_params['users'] = guac.get_users(gconn,
+                                              guac_params['org_name'],
+                                              debug)
 
     # Provision, deprovision, or reprovision
     if create:
@@ -3,6 +3,7 @@ Handles the logic for provisioning Heat
 """
 import time
 from orchestration import heat
+from utils.metrics import phase
 from utils.msg_format import error_msg, info_msg, general_msg
 from utils.generate import generate_names
 
@@ -93,32 +94,35 @@ def provision(conn: object,
     if create:
         if sec_params:
             name = heat_params['container_name']
-            heat.provision(conn,
-                           f"{name}-sec",
-                           f"{heat_globals['template_dir']}/sec.yaml",
-                           sec_params,
-                           True,
-                           update,
-                           debug)
+            with phase(f"Heat stack {name}-sec"):
+                heat.provision(conn,
+                               f"{name}-sec",
+                               f"{heat_globals['template_dir']}/sec.yaml",
+                               sec_params,
+                               True,
+                               update,
+                               debug)
             time.sleep(heat_globals.get('pause', 0) * 60)
         else:
             general_msg("No security group parameters were provided",
                         endpoint)
         for name in stack_names:
             last_stack = name == stack_names[-1]
-            heat.provision(conn,
-                           name,
-                           f"{heat_globals['template_dir']}/main.yaml",
-                           heat_params,
-                           last_stack,
-                           update,
-                           debug)
+            with phase(f"Heat stack {name}"):
+                heat.provision(conn,
+                               name,
+                               f"{heat_globals['template_dir']}/main.yaml",
+                               heat_params,
+                               last_stack,
+                               update,
+                               debug)
             time.sleep(heat_globals.get('pause', 0) * 60)
     else:
         for name in stack_names:
             last_stack = name == stack_names[-1]
-            heat.deprovision(conn,
-                             name,
-                             last_stack,
-                             debug)
+            with phase(f"Heat stack {name}"):
+                heat.deprovision(conn,
+                                 name,
+                                 last_stack,
+                                 debug)
             time.sleep(heat_globals.get('pause', 0) * 60)
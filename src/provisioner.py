@@ -12,8 +12,48 @@ import time
 import json
 import traceback
 from typing import Dict, Any
-from provision import swift, heat, guac
-from utils import connections, load_template, manage_ids, msg_format
+from utils import load_template, manage_ids, metrics, msg_format, profiling
+
+# Templates in the template directory used by each subcommand
+SUBCOMMAND_TEMPLATES = {
+    'swift': [],
+    'heat': ['heat', 'sec', 'env'],
+    'guacamole': ['heat', 'users'],
+    'full': ['heat', 'sec', 'env', 'users']
+}
+
+TEMPLATE_LOADERS = {
+    'heat': load_template.load_heat,
+    'sec': load_template.load_sec,
+    'env': load_template.load_env,
+    'users': load_template.load_users
+}
+
+
+def get_option(options: list,
+               flag: str,
+               default: str) -> str | None:
+    """
+    Returns the value of a flag given after the subcommand.
+
+    Parameters:
+    - options (list): The arguments after the subcommand.
+    - flag (str): The flag, e.g. '--metrics'.
+    - default (str): The value of the flag when it isn't followed by one.
+
+    Returns:
+    str | None: The value of the flag, or None when the flag isn't given.
+    """
+
+    if flag not in options:
+        return None
+
+    index = options.index(flag) + 1
+    if index < len(options) and not options[index].startswith('--'):
+        return options[index]
+
+    return default
+
 
 def main() -> None:
     """
@@ -37,43 +77,56 @@ def main() -> None:
                                    endpoint)
             return
 
-        if arg[0] not in ["swift", "heat", "guacamole", "full"]:
+        if arg[0] not in SUBCOMMAND_TEMPLATES:
             msg_format.error_msg(f"'{arg[0]}' is an invalid arguement.",
                                  endpoint)
             msg_format.general_msg("Valid arguments: 'swift', 'heat', 'guacamole', or 'full'",
                                    endpoint)
             return
 
+        # Optional flags after the subcommand
+        options = arg[1:]
+        metrics_path = get_option(options, '--metrics', 'metrics.json')
+        profile_dir = get_option(options, '--profile', 'profile')
+        # Memory profiling implies profiling into the default directory
+        if not profile_dir and '--profile-memory' in options:
+            profile_dir = 'profile'
+        if profile_dir:
+            profiling.enable(profile_dir,
+                             '--profile-memory' in options)
+
         start_time = time.time()
 
-        global_dict = load_template.load_global()
-        globals: Dict[str, Any] = global_dict['globals']
-        debug: bool = globals['debug']
-        swift_globals: Dict[str, Any] = global_dict['swift']
-        heat_globals: Dict[str, Any] = global_dict['heat']
-        guacamole_globals: Dict[str, Any] = global_dict['guacamole']
-        heat_params: Dict[str, Any] = load_template.load_heat(
-            heat_globals['template_dir'], debug
-        ).get('parameters')
-        sec_params: Dict[str, Any] = load_template.load_sec(
-            heat_globals['template_dir'], debug
-        ).get('parameters')
-        env_params: Dict[str, Any] = load_template.load_env(
-            heat_globals['template_dir'], debug
-        ).get('parameters')
-        user_params: Dict[str, Any] = load_template.load_users(
-            heat_globals['template_dir'], debug
-        ).get('parameters')
-
-        msg_format.info_msg(json.dumps(global_dict, indent=4), endpoint, debug)
-        msg_format.info_msg(json.dumps(heat_params, indent=4), endpoint, debug)
-        msg_format.info_msg(json.dumps(sec_params, indent=4), endpoint, debug)
-        msg_format.info_msg(json.dumps(env_params, indent=4), endpoint, debug)
-        msg_format.info_msg(json.dumps(user_params, indent=4), endpoint, debug)
-
-        clouds = load_template.load_template(
-            'clouds.yaml', debug
-        )['clouds']
+        with metrics.phase('Load templates'):
+            global_dict = load_template.load_global()
+            globals: Dict[str, Any] = global_dict['globals']
+            debug: bool = globals['debug']
+            msg_format.configure(globals.get('log_format', 'text'))
+            swift_globals: Dict[str, Any] = global_dict['swift']
+            heat_globals: Dict[str, Any] = global_dict['heat']
+            guacamole_globals: Dict[str, Any] = global_dict['guacamole']
+
+            # Only load the templates the subcommand uses
+            templates: Dict[str, Any] = {
+                name: TEMPLATE_LOADERS[name](
+                    heat_globals['template_dir'], debug
+                ).get('parameters')
+                for name in SUBCOMMAND_TEMPLATES[arg[0]]
+            }
+            heat_params: Dict[str, Any] = templates.get('heat')
+            sec_params: Dict[str, Any] = templates.get('sec')
+            env_params: Dict[str, Any] = templates.get('env')
+            user_params: Dict[str, Any] = templates.get('users')
+
+            # Only format the debug dumps when they are printed
+            if debug:
+                msg_format.info_msg(json.dumps(global_dict, indent=4), endpoint, debug)
+                for params in templates.values():
+                    msg_format.info_msg(json.dumps(params, indent=4), endpoint, debug)
+
+            clouds = load_template.load_template(
+                'clouds.yaml', debug
+            )['clouds']
 
         # Backwards compatibility
         if not heat_globals.get('cloud'):
@@ -88,89 +141,88 @@ def main() -> None:
                                  endpoint)
             sys.exit(1)
 
-        openstack_connect = connections.openstack_connection(heat_globals['cloud'],
-                                                             openstack_clouds,
-                                                             debug)
-
-        if arg[0] == "swift":
-            swift.provision(openstack_connect,
-                            globals,
-                            swift_globals,
-                            debug)
-        elif arg[0] == "heat":
-            if env_params:
-                manage_ids.update_env(openstack_connect,
-                                      global_dict,
-                                      True,
-                                      debug)
-                heat_params, sec_params, env_params = manage_ids.update_ids(openstack_connect,
-                                                                            [heat_params, sec_params, env_params],
-                                                                            [],
-                                                                            False,
-                                                                            debug)
-            heat.provision(openstack_connect,
-                           globals, heat_globals,
-                           heat_params,
-                           sec_params,
-                           debug)
-        elif arg[0] == "guacamole":
-            try:
-                guacamole_clouds: Dict[str, Any] = clouds[f"{guacamole_globals['cloud']}"]
-            except KeyError:
-                msg_format.error_msg(f"Cloud '{guacamole_globals['cloud']}' not found in clouds.yaml",
-                                    endpoint)
-                sys.exit(1)
-
-            guacamole_connect = connections.guacamole_connection(guacamole_globals['cloud'],
-                                                                 guacamole_clouds,
-                                                                 debug)
-            guac.provision(openstack_connect,
-                           guacamole_connect,
-                           globals,
-                           guacamole_globals,
-                           heat_params,
-                           user_params,
-                           debug)
-        elif arg[0] == "full":
-            try:
-                guacamole_clouds: Dict[str, Any] = clouds[f"{guacamole_globals['cloud']}"]
-            except KeyError:
-                msg_format.error_msg(f"Cloud '{guacamole_globals['cloud']}' not found in clouds.yaml",
-                                    endpoint)
-                sys.exit(1)
-
-            guacamole_connect = connections.guacamole_connection(guacamole_globals['cloud'],
-                                                                 guacamole_clouds,
-                                                                 debug)
-            swift.provision(openstack_connect,
-                            globals,
-                            swift_globals,
-                            debug)
-            if env_params:
-                manage_ids.update_env(openstack_connect,
-                                      global_dict,
-                                      True,
-                                      debug)
-                heat_params, sec_params, env_params = manage_ids.update_ids(openstack_connect,
-                                                                            [heat_params, sec_params, env_params],
-                                                                            [],
-                                                                            False,
-                                                                            debug)
-            heat.provision(openstack_connect,
-                           globals,
-                           heat_globals,
-                           heat_params,
-                           sec_params,
-                           debug)
-            guac.provision(openstack_connect,
-                           guacamole_connect,
-                           globals,
-                           guacamole_globals,
-                           heat_params,
-                           user_params,
-                           debug)
+        with metrics.phase('Connect'):
+            # The SDKs are only imported once the subcommand is known
+            from utils import connections
+
+            openstack_connect = connections.openstack_connection(
+                heat_globals['cloud'],
+                openstack_clouds,
+                debug,
+                heat_globals.get('token_cache', False)
+            )
+
+            guacamole_connect = None
+            if arg[0] in ["guacamole", "full"]:
+                try:
+                    guacamole_clouds: Dict[str, Any] = clouds[f"{guacamole_globals['cloud']}"]
+                except KeyError:
+                    msg_format.error_msg(
+                        f"Cloud '{guacamole_globals['cloud']}' not found in clouds.yaml",
+                        endpoint
+                    )
+                    sys.exit(1)
+
+                guacamole_connect = connections.guacamole_connection(
+                    guacamole_globals['cloud'],
+                    guacamole_clouds,
+                    debug,
+                    guacamole_globals.get('workers', 1),
+                    guacamole_globals.get('token_cache', False)
+                )
+
+        if arg[0] in ["swift", "full"]:
+            from provision import swift
+
+            with metrics.phase('Swift'):
+                swift.provision(openstack_connect,
+                                globals,
+                                swift_globals,
+                                debug)
+
+        if arg[0] in ["heat", "full"]:
+            from provision import heat
+
+            with metrics.phase('Heat'):
+                if env_params:
+                    manage_ids.update_env(openstack_connect,
+                                          global_dict,
+                                          True,
+                                          debug)
+                    heat_params, sec_params, env_params = manage_ids.update_ids(
+                        openstack_connect,
+                        [heat_params, sec_params, env_params],
+                        [],
+                        False,
+                        debug
+                    )
+                heat.provision(openstack_connect,
+                               globals,
+                               heat_globals,
+                               heat_params,
+                               sec_params,
+                               debug)
+
+        if arg[0] in ["guacamole", "full"]:
+            from provision import guac
+
+            with metrics.phase('Guacamole'):
+                guac.provision(openstack_connect,
+                               guacamole_connect,
+                               globals,
+                               guacamole_globals,
+                               heat_params,
+                               user_params,
+                               debug)
+            connections.guacamole_transport_stats(guacamole_connect,
+                                                  debug)
 
         end_time = time.time()
+        metrics.rename_endpoints(connections.openstack_endpoint_names(openstack_connect))
+        metrics.summary(end_time - start_time,
+                        metrics_path)
+        if profile_dir:
+            profiling.report()
         msg_format.general_msg(f"Total time: {end_time - start_time:.2f} seconds",
                                endpoint)
 
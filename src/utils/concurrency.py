@@ -0,0 +1,62 @@
+"""
+Contains the helpers for running independent API calls concurrently
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+
+
+class TransientError(Exception):
+    """
+    Raised by an API call that failed in a way that is worth retrying.
+    """
+
+
+# Errors that are retried by run_parallel
+TRANSIENT_ERRORS = (TransientError, RequestsConnectionError, Timeout)
+
+
+def run_parallel(func: callable,
+                 items: list,
+                 workers: int = 1,
+                 retries: int = 0,
+                 delay: float = 1.0) -> list:
+    """
+    Calls a function for every item with up to a number of worker threads.
+
+    Calls that raise a transient error are retried with exponential backoff.
+    If they still fail after the last retry, the error is returned as the
+    result of that item instead of stopping the other calls.
+
+    Args:
+        func (callable): The function to call with each item.
+        items (list): The items to process.
+        workers (int, optional): The maximum number of concurrent calls.
+            Defaults to 1, which calls the function sequentially.
+        retries (int, optional): The number of retries after a transient error.
+            Defaults to 0, which raises the error.
+        delay (float, optional): The delay before the first retry in seconds.
+
+    Returns:
+        list: The results of the calls, in the order of the items.
+    """
+
+    def call(item):
+        for attempt in range(retries):
+            try:
+                return func(item)
+            except TRANSIENT_ERRORS:
+                time.sleep(delay * 2 ** attempt)
+        try:
+            return func(item)
+        except TRANSIENT_ERRORS as error:
+            if not retries:
+                raise
+            return error
+
+    if workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(call, items))
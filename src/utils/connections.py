@@ -2,14 +2,48 @@
 OpenStack and Guacamole connections
 """
 
+import atexit
+import hashlib
+import json
 import logging
+import os
+import stat
+import time
+from functools import partial
+from typing import Iterator
+import requests
+from requests.adapters import HTTPAdapter
 from guacamole import session
 from openstack import connect, enable_logging
+from utils.json_stream import iter_json_items
+from utils.metrics import record_response
 from utils.msg_format import error_msg, info_msg, success_msg, general_msg
 
+# Default location of the Guacamole token cache, see CachedSession
+TOKEN_CACHE_PATH = os.path.join(os.path.expanduser('~'),
+                                '.cache',
+                                'range-provisioner',
+                                'guacamole_tokens.json')
+
+# Seconds a cached token is trusted without use, below Guacamole's
+# default api-session-timeout of 60 minutes
+TOKEN_CACHE_TTL = 50 * 60
+
+# Default location of the OpenStack token cache, see load_openstack_cache
+OPENSTACK_CACHE_PATH = os.path.join(os.path.dirname(TOKEN_CACHE_PATH),
+                                    'openstack_tokens.json')
+
+# Seconds a cached Keystone token must remain valid to be reused
+OPENSTACK_CACHE_MARGIN = 5 * 60
+
+# Bytes read at a time from a streamed Guacamole listing
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
 def openstack_connection(cloud: str,
                          openstack_clouds: dict,
-                         debug: bool = False):
+                         debug: bool = False,
+                         token_cache: bool | str = False):
     """
     A function to establish a connection to OpenStack.
 
@@ -17,6 +51,8 @@ def openstack_connection(cloud: str,
         cloud (str): The name of the OpenStack cloud to connect to.
         openstack_clouds (dict): A dictionary containing OpenStack cloud information.
         debug (bool): A flag to enable debug logging.
+        token_cache (bool | str, optional): Whether to reuse the Keystone token
+            and service catalog across runs, or the path of the token cache file.
 
     Returns:
         object: The connection object if successful, otherwise None.
@@ -40,6 +76,24 @@ def openstack_connection(cloud: str,
 
     openstack_connect = connect(cloud=cloud)
 
+    # Count the API calls of every OpenStack service for the run metrics
+    if openstack_connect:
+        openstack_connect.session.session.hooks['response'].append(record_response)
+
+    if openstack_connect and token_cache:
+        cache_path = (token_cache if isinstance(token_cache, str)
+                      else OPENSTACK_CACHE_PATH)
+        auth = json.dumps(openstack_clouds.get('auth', {}), sort_keys=True)
+        cache_key = hashlib.sha256(f"{cloud}|{auth}".encode('utf-8')).hexdigest()
+        if load_openstack_cache(openstack_connect, cache_path, cache_key):
+            info_msg("Reusing the cached Keystone token",
+                     endpoint,
+                     debug)
+        atexit.register(save_openstack_cache,
+                        openstack_connect,
+                        cache_path,
+                        cache_key)
+
     if openstack_connect:
         info_msg(f"Endpoint: {openstack_clouds['auth']['auth_url']}",
                     endpoint,
@@ -53,16 +107,817 @@ def openstack_connection(cloud: str,
     return openstack_connect
 
 
+def openstack_endpoint_names(openstack_connect) -> dict:
+    """
+    Returns the service type of each endpoint in the service catalog.
+
+    The catalog is only read when the connection already authenticated,
+    so no request is sent.
+
+    Args:
+        openstack_connect (object): The OpenStack connection object.
+
+    Returns:
+        dict: The service type of each endpoint URL, plus the identity URL.
+    """
+
+    auth = getattr(openstack_connect.session, 'auth', None)
+    auth_ref = getattr(auth, 'auth_ref', None)
+    if not auth_ref:
+        return {}
+
+    names = {}
+    if getattr(auth, 'auth_url', None):
+        names[auth.auth_url] = 'identity'
+    for service in auth_ref.service_catalog.catalog:
+        for service_endpoint in service.get('endpoints', []):
+            if service_endpoint.get('url'):
+                names[service_endpoint['url']] = service.get('type', service_endpoint['url'])
+
+    return names
+
+
+def load_openstack_cache(openstack_connect,
+                         cache_path: str,
+                         cache_key: str) -> bool:
+    """
+    Restores a cached Keystone token and its service catalog.
+
+    Tokens about to expire are not restored, Keystone then authenticates
+    as usual. Restored tokens that are revoked are renewed by keystoneauth
+    when a request is denied. Only the public auth state API of
+    keystoneauth is used, so service versions are discovered as usual.
+
+    Args:
+        openstack_connect (object): The OpenStack connection object.
+        cache_path (str): The path of the token cache file.
+        cache_key (str): The key of the connection.
+
+    Returns:
+        bool: Whether a token was restored.
+    """
+
+    entry = read_token_cache(cache_path).get(cache_key)
+    auth = getattr(openstack_connect.session, 'auth', None)
+    if not entry or not hasattr(auth, 'set_auth_state'):
+        return False
+
+    try:
+        auth.set_auth_state(entry['auth'])
+        if auth.auth_ref.will_expire_soon(OPENSTACK_CACHE_MARGIN):
+            auth.set_auth_state(None)
+            return False
+    except (KeyError, TypeError, ValueError):
+        auth.set_auth_state(None)
+        return False
+
+    return True
+
+
+def save_openstack_cache(openstack_connect,
+                         cache_path: str,
+                         cache_key: str) -> None:
+    """
+    Stores the Keystone token and service catalog of a connection.
+
+    Args:
+        openstack_connect (object): The OpenStack connection object.
+        cache_path (str): The path of the token cache file.
+        cache_key (str): The key of the connection.
+
+    Returns:
+        None
+    """
+
+    auth = getattr(openstack_connect.session, 'auth', None)
+    state = auth.get_auth_state() if hasattr(auth, 'get_auth_state') else None
+    if not state:
+        return
+
+    write_token_cache(cache_path,
+                      cache_key,
+                      {'auth': state})
+
+
+class PooledTransport:
+    """
+    A keep-alive connection pool that stands in for the requests module
+    inside the Guacamole API wrapper, which otherwise opens a new connection
+    (and TLS handshake) for every call.
+
+    Args:
+        pool_size (int): The maximum number of pooled connections per host,
+            which should match the number of concurrent requests.
+    """
+
+    def __init__(self,
+                 pool_size: int = 1):
+        self.refresh = None
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1,
+                                   pool_maxsize=max(pool_size, 1),
+                                   pool_block=True)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.hooks['response'].append(partial(record_response,
+                                                      endpoint='Guacamole'))
+
+    def request(self,
+                method: str,
+                url: str,
+                **kwargs) -> requests.Response:
+        """
+        Sends a request through the connection pool.
+
+        If a refresh callback is set and the request is denied, the callback
+        renews the token in the request parameters and the request is retried.
+        """
+        response = self.session.request(method, url, **kwargs)
+
+        params = kwargs.get('params')
+        if (response.status_code == 403 and self.refresh and
+                isinstance(params, dict) and 'token' in params):
+            refresh, self.refresh = self.refresh, None
+            if refresh():
+                response.close()
+                response = self.session.request(method, url, **kwargs)
+
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request through the connection pool.
+        """
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a POST request through the connection pool.
+        """
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a PUT request through the connection pool.
+        """
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a PATCH request through the connection pool.
+        """
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a DELETE request through the connection pool.
+        """
+        return self.request('DELETE', url, **kwargs)
+
+    def __getattr__(self, name: str) -> object:
+        # Anything else, e.g. requests.exceptions, comes from requests
+        return getattr(requests, name)
+
+    def stats(self) -> dict:
+        """
+        Counts the requests sent and the connections opened by the pool.
+
+        Returns:
+            dict: The number of requests, connections and the reuse ratio.
+        """
+        pools = self.adapter.poolmanager.pools
+        num_requests = 0
+        num_connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool:
+                num_requests += pool.num_requests
+                num_connections += pool.num_connections
+
+        return {
+            'requests': num_requests,
+            'connections': num_connections,
+            'reuse_ratio': 1 - num_connections / num_requests if num_requests else 0.0
+        }
+
+
+class PooledSession(session):
+    """
+    A Guacamole session that sends its API calls through its own keep-alive
+    connection pool.
+
+    The wrapper's methods call the requests module directly, so every
+    method the orchestration uses is overridden here to send the same
+    request through api_request, the session's transport hook. Other
+    sessions and the wrapper module are left untouched.
+
+    Args:
+        host (str): The hostname of the Guacamole server.
+        data_source (str): The name of the data source.
+        username (str): The username of the Guacamole user.
+        password (str): The password of the Guacamole user.
+        pool_size (int): The maximum number of pooled connections, which
+            should match the number of concurrent requests.
+    """
+
+    def __init__(self,
+                 host: str,
+                 data_source: str,
+                 username: str,
+                 password: str,
+                 pool_size: int = 1):
+        self.transport = PooledTransport(pool_size)
+        super().__init__(host,
+                         data_source,
+                         username,
+                         password)
+
+    def api_request(self,
+                    method: str,
+                    path: str,
+                    **kwargs) -> str | object:
+        """
+        Sends a request to the data source through the connection pool.
+
+        Args:
+            method (str): The HTTP method of the request.
+            path (str): The path of the endpoint relative to the data source.
+            **kwargs: Additional arguments for the request, e.g. json.
+
+        Returns:
+            str | object: The request response JSON string or object
+        """
+        response = self.transport.request(method,
+                                          f"{self.session_url}{path}",
+                                          params=self.params,
+                                          verify=False,
+                                          timeout=12,
+                                          **kwargs).text
+
+        try:
+            return json.loads(response)
+        except json.JSONDecodeError:
+            return response
+
+    def generate_token(self) -> str | object:
+        """
+        Generates a token with the username and password.
+        """
+        response = self.transport.post(
+            f"{self.host}/api/tokens",
+            data={"username": self.username, "password": self.password},
+            verify=False,
+            timeout=12,
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        ).text
+
+        try:
+            return json.loads(response)['authToken']
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return response
+
+    def list_connection_groups(self) -> str | object:
+        """
+        Lists the connection groups.
+        """
+        return self.api_request('GET', '/connectionGroups')
+
+    def list_connections(self) -> str | object:
+        """
+        Lists the connections.
+        """
+        return self.api_request('GET', '/connections')
+
+    def list_sharing_profiles(self) -> str | object:
+        """
+        Lists the sharing profiles.
+        """
+        return self.api_request('GET', '/sharingProfiles')
+
+    def list_users(self) -> str | object:
+        """
+        Lists the users.
+        """
+        return self.api_request('GET', '/users')
+
+    def list_usergroups(self) -> str | object:
+        """
+        Lists the user groups.
+        """
+        return self.api_request('GET', '/userGroups')
+
+    def detail_connection(self,
+                          identifier: str,
+                          option: str = None) -> str | object:
+        """
+        Details a connection, or one of its parameters, history or
+        sharing profiles.
+        """
+        options = {
+            None: '',
+            'parameters': '/parameters',
+            'history': '/history',
+            'sharing profiles': '/sharingProfiles'
+        }
+        if option not in options:
+            raise ValueError(f"Invalid option '{option}'")
+
+        return self.api_request('GET', f"/connections/{identifier}{options[option]}")
+
+    def detail_connection_group_connections(self,
+                                            identifier: str) -> str | object:
+        """
+        Details the connection tree below a connection group.
+        """
+        return self.api_request('GET', f"/connectionGroups/{identifier}/tree")
+
+    def detail_user_permissions(self,
+                                username: str) -> str | object:
+        """
+        Details the permissions of a user.
+        """
+        return self.api_request('GET', f"/users/{username}/permissions")
+
+    def detail_usergroup_permissions(self,
+                                     groupname: str) -> str | object:
+        """
+        Details the permissions of a user group.
+        """
+        return self.api_request('GET', f"/userGroups/{groupname}/permissions")
+
+    def create_connection_group(self,
+                                group_name: str,
+                                group_type: str = 'ORGANIZATIONAL',
+                                parent_identifier: str = 'ROOT',
+                                attributes: dict | None = None) -> str | object:
+        """
+        Creates a connection group.
+        """
+        if group_type not in ['ORGANIZATIONAL', 'BALANCING']:
+            raise ValueError(
+                f"Invalid option '{group_type}'. Use 'ORGANIZATIONAL' or 'BALANCING'.")
+
+        return self.api_request('POST',
+                                '/connectionGroups',
+                                json={
+                                    'parentIdentifier': parent_identifier,
+                                    'name': group_name,
+                                    'type': group_type,
+                                    'attributes': attributes or {}
+                                })
+
+    def update_connection_group(self,
+                                identifier: str,
+                                group_name: str,
+                                group_type: str = 'ORGANIZATIONAL',
+                                parent_identifier: str = 'ROOT',
+                                attributes: dict | None = None) -> str | object:
+        """
+        Updates a connection group.
+        """
+        return self.api_request('PUT',
+                                f"/connectionGroups/{identifier}",
+                                json={
+                                    'parentIdentifier': parent_identifier,
+                                    'identifier': identifier,
+                                    'name': group_name,
+                                    'type': group_type,
+                                    'attributes': attributes or {}
+                                })
+
+    def delete_connection_group(self,
+                                identifier: str) -> str | object:
+        """
+        Deletes a connection group and everything below it.
+        """
+        return self.api_request('DELETE', f"/connectionGroups/{identifier}")
+
+    def manage_connection(self,
+                          protocol: str,
+                          name: str,
+                          parent_identifier: str = 'ROOT',
+                          identifier: str | None = None,
+                          parameters: dict | None = None,
+                          attributes: dict | None = None) -> str | object:
+        """
+        Creates a connection, or updates it when an identifier is given.
+
+        The parameters and attributes are sent as given, as in a batch
+        request, see create_conns_bulk.
+        """
+        if protocol not in ['vnc', 'ssh', 'rdp', 'sftp', 'telnet', 'kubernetes']:
+            raise ValueError(
+                f"Invalid protocol '{protocol}'. Use 'vnc', 'ssh', 'rdp', 'telnet', or 'kubernetes'"
+            )
+
+        conn = {
+            'parentIdentifier': parent_identifier,
+            'name': name,
+            'protocol': protocol,
+            'parameters': parameters or {},
+            'attributes': attributes or {}
+        }
+        if identifier:
+            return self.api_request('PUT',
+                                    f"/connections/{identifier}",
+                                    json={**conn,
+                                          'identifier': identifier,
+                                          'activeConnections': 0})
+
+        return self.api_request('POST',
+                                '/connections',
+                                json=conn)
+
+    def delete_connection(self,
+                          identifier: str) -> str | object:
+        """
+        Deletes a connection and its sharing profiles.
+        """
+        return self.api_request('DELETE', f"/connections/{identifier}")
+
+    def create_sharing_profile(self,
+                               primary_identifier: str,
+                               name: str,
+                               parameters: dict | None = None) -> str | object:
+        """
+        Creates a sharing profile.
+        """
+        return self.api_request('POST',
+                                '/sharingProfiles',
+                                json={
+                                    'primaryConnectionIdentifier': primary_identifier,
+                                    'name': name,
+                                    'parameters': parameters or {},
+                                    'attributes': {}
+                                })
+
+    def update_sharing_profile(self,
+                               primary_identifier: str,
+                               name: str,
+                               identifier: str,
+                               parameters: dict | None = None) -> str | object:
+        """
+        Updates a sharing profile.
+        """
+        return self.api_request('POST',
+                                f"/sharingProfiles/{identifier}",
+                                json={
+                                    'primaryConnectionIdentifier': primary_identifier,
+                                    'identifier': identifier,
+                                    'name': name,
+                                    'parameters': parameters or {},
+                                    'attributes': {}
+                                })
+
+    def delete_sharing_profile(self,
+                               identifier: str) -> str | object:
+        """
+        Deletes a sharing profile.
+        """
+        return self.api_request('DELETE', f"/sharingProfiles/{identifier}")
+
+    def create_user(self,
+                    username: str,
+                    password: str,
+                    attributes: dict | None = None) -> str | object:
+        """
+        Creates a user.
+        """
+        return self.api_request('POST',
+                                '/users',
+                                json={
+                                    'username': username,
+                                    'password': password,
+                                    'attributes': attributes or {}
+                                })
+
+    def update_user(self,
+                    username: str,
+                    attributes: dict | None = None) -> str | object:
+        """
+        Updates the attributes of a user.
+        """
+        return self.api_request('PUT',
+                                f"/users/{username}",
+                                json={
+                                    'username': username,
+                                    'attributes': attributes or {}
+                                })
+
+    def delete_user(self,
+                    username: str) -> str | object:
+        """
+        Deletes a user.
+        """
+        return self.api_request('DELETE', f"/users/{username}")
+
+    def update_connection_permissions(self,
+                                      username: str,
+                                      identifiers: str | list,
+                                      operation: str = 'add',
+                                      permission: str = 'connection') -> str | object:
+        """
+        Grants or revokes a user's READ permissions on connection objects.
+        """
+        return self.api_request('PATCH',
+                                f"/users/{username}/permissions",
+                                json=get_permission_patches(identifiers,
+                                                            operation,
+                                                            permission))
+
+    def update_user_permissions(self,
+                                username: str,
+                                permissions: list | str,
+                                operation: str = 'add') -> str | object:
+        """
+        Grants or revokes a user's system permissions, or the permission
+        to UPDATE the user itself.
+        """
+        if operation not in ['add', 'remove']:
+            raise ValueError(
+                f"Invalid operation '{operation}'. Use 'add' or 'remove'")
+
+        valid_perms = [
+            'ADMINISTER',
+            'CREATE_USER',
+            'CREATE_USER_GROUP',
+            'CREATE_CONNECTION',
+            'CREATE_CONNECTION_GROUP',
+            'CREATE_SHARING_PROFILE',
+        ]
+        patches = []
+        for perm in [permissions] if isinstance(permissions, str) else permissions:
+            if perm == 'UPDATE':
+                patches.append({'op': operation,
+                                'path': f"/userPermissions/{username}",
+                                'value': 'UPDATE'})
+            elif perm in valid_perms:
+                patches.append({'op': operation,
+                                'path': '/systemPermissions',
+                                'value': perm})
+            else:
+                raise ValueError(
+                    f"Invalid permission '{perm}'. Use {valid_perms}")
+
+        return self.api_request('PATCH',
+                                f"/users/{username}/permissions",
+                                json=patches)
+
+    def create_usergroup(self,
+                         groupname: str,
+                         attributes: dict | None = None) -> str | object:
+        """
+        Creates a user group.
+        """
+        return self.api_request('POST',
+                                '/userGroups',
+                                json={
+                                    'identifier': groupname,
+                                    'attributes': attributes or {}
+                                })
+
+    def delete_usergroup(self,
+                         user_group: str) -> str | object:
+        """
+        Deletes a user group.
+        """
+        return self.api_request('DELETE', f"/userGroups/{user_group}")
+
+    def update_usergroup_connections(self,
+                                     groupname: str,
+                                     identifiers: str | list,
+                                     operation: str = 'add',
+                                     permision: str = 'connection') -> str | object:
+        """
+        Grants or revokes a user group's READ permissions on connection objects.
+        """
+        return self.api_request('PATCH',
+                                f"/userGroups/{groupname}/permissions",
+                                json=get_permission_patches(identifiers,
+                                                            operation,
+                                                            permision))
+
+    def update_usergroup_member(self,
+                                usernames: str | list,
+                                groupname: str,
+                                operation: str = 'add') -> str | object:
+        """
+        Adds or removes members of a user group.
+        """
+        if operation not in ['add', 'remove']:
+            raise ValueError(
+                f"Invalid operation '{operation}'. Use 'add' or 'remove'")
+
+        return self.api_request('PATCH',
+                                f"/userGroups/{groupname}/memberUsers",
+                                json=[
+                                    {'op': operation, 'path': '/', 'value': username}
+                                    for username in ([usernames] if isinstance(usernames, str)
+                                                     else usernames)
+                                ])
+
+
+def get_permission_patches(identifiers: str | list,
+                           operation: str = 'add',
+                           permission: str = 'connection') -> list:
+    """
+    Builds the PATCH operations granting or revoking READ permissions on
+    connection objects.
+
+    Args:
+        identifiers (str | list): The identifiers of the connection objects.
+        operation (str, optional): 'add' or 'remove'.
+        permission (str, optional): 'connection', 'group', 'sharing profile'
+            or 'active connection'.
+
+    Returns:
+        list: The PATCH operations.
+    """
+    if operation not in ['add', 'remove']:
+        raise ValueError(
+            f"Invalid operation '{operation}'. Use 'add' or 'remove'")
+
+    paths = {
+        'connection': '/connectionPermissions',
+        'group': '/connectionGroupPermissions',
+        'sharing profile': '/sharingProfilePermissions',
+        'active connection': '/activeConnectionPermissions'
+    }
+    if permission not in paths:
+        raise ValueError(f"Invalid permission type '{permission}'")
+
+    return [
+        {
+            'op': operation,
+            'path': f"{paths[permission]}/{identifier}",
+            'value': 'READ'
+        }
+        for identifier in ([identifiers] if isinstance(identifiers, str) else identifiers)
+    ]
+
+
+class CachedSession(PooledSession):
+    """
+    A Guacamole session that reuses its authentication token across runs.
+
+    Tokens are kept in a JSON file only readable by the current user, keyed
+    by host, data source and username. A cached token is validated with one
+    request and is only replaced when it has expired or is denied.
+
+    Args:
+        host (str): The hostname of the Guacamole server.
+        data_source (str): The name of the data source.
+        username (str): The username of the Guacamole user.
+        password (str): The password of the Guacamole user.
+        cache_path (str): The path of the token cache file.
+        pool_size (int): The maximum number of pooled connections.
+    """
+
+    def __init__(self,
+                 host: str,
+                 data_source: str,
+                 username: str,
+                 password: str,
+                 cache_path: str = TOKEN_CACHE_PATH,
+                 pool_size: int = 1):
+        self.cache_path = cache_path
+        self.cache_key = hashlib.sha256(
+            f"{host}|{data_source}|{username}".encode('utf-8')
+        ).hexdigest()
+        self.token_cached = False
+        super().__init__(host,
+                         data_source,
+                         username,
+                         password,
+                         pool_size)
+        self.transport.refresh = self.refresh_token
+
+    def generate_token(self) -> str | object:
+        """
+        Returns a valid cached token, or generates and caches a new one.
+        """
+        token = read_token_cache(self.cache_path).get(self.cache_key, {})
+
+        if (token.get('token') and
+                time.time() - token.get('used', 0) < TOKEN_CACHE_TTL and
+                self.transport.get(f"{self.session_url}/self",
+                                   params={'token': token['token']},
+                                   verify=False,
+                                   timeout=12).status_code == 200):
+            self.token_cached = True
+            write_token_cache(self.cache_path,
+                              self.cache_key,
+                              token['token'])
+            return token['token']
+
+        self.token_cached = False
+        token = super().generate_token()
+        if isinstance(token, str) and token:
+            write_token_cache(self.cache_path,
+                              self.cache_key,
+                              token)
+
+        return token
+
+    def refresh_token(self) -> bool:
+        """
+        Replaces a cached token that was denied by the server.
+
+        Returns:
+            bool: Whether the token was replaced.
+        """
+        if not self.token_cached:
+            return False
+
+        self.token_cached = False
+        token = super().generate_token()
+        if not isinstance(token, str) or not token:
+            return False
+
+        write_token_cache(self.cache_path,
+                          self.cache_key,
+                          token)
+        # Update the parameters in place, the pending request shares them
+        self.token = token
+        self.params['token'] = token
+
+        return True
+
+
+def read_token_cache(cache_path: str) -> dict:
+    """
+    Reads a token cache.
+
+    The cache is ignored if it can be read by other users.
+
+    Args:
+        cache_path (str): The path of the token cache file.
+
+    Returns:
+        dict: The cached tokens, keyed by connection.
+    """
+
+    try:
+        if os.stat(cache_path).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+            return {}
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            tokens = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    return tokens if isinstance(tokens, dict) else {}
+
+
+def write_token_cache(cache_path: str,
+                      cache_key: str,
+                      token: str | dict) -> None:
+    """
+    Stores a token in the token cache, readable only by its owner.
+
+    Args:
+        cache_path (str): The path of the token cache file.
+        cache_key (str): The key of the connection.
+        token (str | dict): The authentication token, or the entry to store.
+
+    Returns:
+        None
+    """
+
+    tokens = read_token_cache(cache_path)
+    tokens[cache_key] = token if isinstance(token, dict) else {
+        'token': token,
+        'used': time.time()
+    }
+
+    try:
+        os.makedirs(os.path.dirname(cache_path) or '.', mode=0o700, exist_ok=True)
+        descriptor = os.open(cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(cache_path, 0o600)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            json.dump(tokens, file)
+    except OSError as error:
+        error_msg(f"Could not write the token cache. {error}",
+                  'Connections')
+
+
 def guacamole_connection(cloud,
                          guacamole_clouds,
-                         debug):
+                         debug,
+                         workers: int = 1,
+                         token_cache: bool | str = False):
     """
     A function to establish a connection with the Guacamole service.
 
+    Every call of the connection object goes through a keep-alive
+    connection pool sized to the number of concurrent requests.
+
     Args:
         guacamole_clouds (dict): A dictionary containing the information needed
         to connect to the Guacamole service.
         debug (bool): A flag indicating whether debug logging should be enabled.
+        workers (int, optional): The maximum number of concurrent requests.
+        token_cache (bool | str, optional): Whether to reuse the authentication
+            token across runs, or the path of the token cache file.
 
     Returns:
         object: The connection object if successful, otherwise None.
@@ -74,10 +929,20 @@ def guacamole_connection(cloud,
     # Connect to Guacamole
     general_msg(f"Connecting to Guacamole cloud '{cloud}'...",
                 endpoint)
-    guacamole_connect = session(guacamole_clouds['host'],
-                                guacamole_clouds['data_source'],
-                                guacamole_clouds['username'],
-                                guacamole_clouds['password'])
+    if token_cache:
+        guacamole_connect = CachedSession(guacamole_clouds['host'],
+                                          guacamole_clouds['data_source'],
+                                          guacamole_clouds['username'],
+                                          guacamole_clouds['password'],
+                                          token_cache if isinstance(token_cache, str)
+                                          else TOKEN_CACHE_PATH,
+                                          workers)
+    else:
+        guacamole_connect = PooledSession(guacamole_clouds['host'],
+                                          guacamole_clouds['data_source'],
+                                          guacamole_clouds['username'],
+                                          guacamole_clouds['password'],
+                                          workers)
     if guacamole_connect:
         info_msg(f"Endpoint: {guacamole_clouds['host']}",
                     endpoint,
@@ -89,3 +954,107 @@ def guacamole_connection(cloud,
                   endpoint)
 
     return guacamole_connect
+
+
+def guacamole_request(gconn: object,
+                      method: str,
+                      path: str,
+                      **kwargs) -> str | object:
+    """
+    Sends a request to a Guacamole data source endpoint that the session
+    object doesn't wrap.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        method (str): The HTTP method of the request.
+        path (str): The path of the endpoint relative to the data source.
+        **kwargs: Additional arguments for the request, e.g. json.
+
+    Returns:
+        str | object: The request response JSON string or object
+    """
+
+    transport = getattr(gconn, 'transport', requests)
+    response = transport.request(method,
+                                 f"{gconn.session_url}{path}",
+                                 params=gconn.params,
+                                 verify=False,
+                                 timeout=12,
+                                 **kwargs).text
+
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError:
+        return response
+
+
+def guacamole_items(gconn: object,
+                    path: str,
+                    list_func: callable) -> Iterator[tuple[str, dict]] | str | object:
+    """
+    Lists a Guacamole data source directory one object at a time.
+
+    With a connection pool the listing is parsed while it is downloaded,
+    so callers that filter the objects never hold the whole directory.
+    Otherwise the listing function of the session object is used.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        path (str): The path of the directory relative to the data source.
+        list_func (callable): The session function listing the directory.
+
+    Returns:
+        Iterator[tuple[str, dict]] | str | object: The identifiers and objects
+            of the directory, or the error response.
+    """
+
+    transport = getattr(gconn, 'transport', None)
+    if not isinstance(transport, PooledTransport):
+        listing = list_func()
+        return iter(listing.items()) if isinstance(listing, dict) else listing
+
+    response = transport.request('GET',
+                                 f"{gconn.session_url}{path}",
+                                 params=gconn.params,
+                                 verify=False,
+                                 timeout=12,
+                                 stream=True)
+
+    if response.status_code != 200:
+        try:
+            return json.loads(response.text)
+        except json.JSONDecodeError:
+            return response.text
+
+    return iter_json_items(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+
+def guacamole_transport_stats(gconn: object,
+                              debug: bool = False) -> dict:
+    """
+    Reports how well the Guacamole connection pool reused its connections.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+        debug (bool): A flag indicating whether debug logging should be enabled.
+
+    Returns:
+        dict: The number of requests, connections and the reuse ratio.
+    """
+
+    endpoint = 'Connections'
+
+    transport = getattr(gconn, 'transport', None)
+    if not isinstance(transport, PooledTransport):
+        return {}
+
+    stats = transport.stats()
+    general_msg(f"Guacamole sent {stats['requests']} requests over "
+                f"{stats['connections']} connections "
+                f"({stats['reuse_ratio']:.1%} reused)",
+                endpoint)
+    info_msg(stats,
+             endpoint,
+             debug)
+
+    return stats
@@ -1,10 +1,20 @@
 """
 Handles the logic for generating Heat and Guacamole data
 """
+import re
 import secrets
 import string
+import sys
+from functools import lru_cache
+from typing import Iterator
+from utils.instance_index import InstanceIndex, is_pattern
+from utils.models import (Connection, ConnectionGroup, InstanceName, SharingProfile,
+                          intern_params)
 from utils.msg_format import info_msg, general_msg, error_msg
 
+# Number of parsed instance names kept, about 200 bytes each, see parse_instance_name
+PARSE_CACHE_SIZE = 2 ** 16
+
 
 def generate_password() -> str:
     """
@@ -77,9 +87,53 @@ def generate_instance_names(range_name: str,
 
 def generate_conns(params: dict,
                    guac_params: dict,
-                   debug) -> dict | None:
+                   debug) -> ConnectionGroup | None:
     """
-    Create a connection list based on given ranges
+    Create a connection tree based on given ranges
+    """
+
+    endpoint = 'Generate'
+
+    chunks = iter_range_conns(guac_params)
+
+    _, conn_tree = next(chunks)
+    groups = tuple(
+        group
+        for _, group in chunks
+    )
+    if groups:
+        conn_tree = ConnectionGroup(
+            name=conn_tree.name,
+            attributes=conn_tree.attributes,
+            groups=groups
+        )
+
+    if debug:
+        info_msg(conn_tree.to_dict(),
+                 endpoint,
+                 debug)
+
+    return conn_tree
+
+
+def iter_range_conns(guac_params: dict) -> Iterator[tuple[str, ConnectionGroup]]:
+    """
+    Create the connection tree one range at a time
+
+    The organization group is yielded first under 'ROOT', followed by the
+    group of each range under the organization. When the organization is
+    the only range, its connections are yielded with it instead. The
+    connections of a range are only built when the range is yielded.
+
+    Only a new organization is provisioned straight from this generator.
+    Update and group permission runs collect it into the whole tree with
+    generate_conns, so they still hold every range at once.
+
+    Args:
+        guac_params (dict): The Guacamole parameters.
+
+    Yields:
+        tuple[str, ConnectionGroup]: The parent name and the connection group.
     """
 
     endpoint = 'Generate'
@@ -103,102 +157,121 @@ def generate_conns(params: dict,
     general_msg("Generating connection data",
                 endpoint)
 
-    guacd_ips = {}
-
     # Filter instances by guacd
-    for instance in instances.copy():
-        if "guacd" in instance['name']:
-            guacd_org = get_group_name(instance['name'])
-            guacd_ips[guacd_org] = instance['hostname']
-            instances.remove(instance)
-
-    conn_objects = []
+    guacd_ips = {
+        get_group_name(instance['name']): instance['hostname']
+        for instance in instances
+        if "guacd" in instance['name']
+    }
+    instances = [
+        instance
+        for instance in instances
+        if "guacd" not in instance['name']
+    ]
 
-    # Process each instance
+    parameters = intern_params({
+        'username': guac_params['username'],
+        'password': guac_params['password'],
+        "domain": guac_params['domain_name'],
+        "port": "3389" if guac_params['protocol'] == "rdp" else "22",
+        "security": "any" if guac_params['protocol'] == "rdp" else "",
+        "ignore-cert": "true" if guac_params['protocol'] == "rdp" else "",
+        "enable-wallpaper": "true" if guac_params['protocol'] == "rdp" else "",
+        "enable-theming": "true" if guac_params['protocol'] == "rdp" else "",
+        "create-recording-path": "true" if recording else "",
+        "recording-name": "${GUAC_USERNAME}-${GUAC_DATE}-${GUAC_TIME}" if recording else "",
+        "recording-path": "${HISTORY_PATH}/${HISTORY_UUID}" if recording else "",
+    })
+    sharing_parameters = intern_params({
+        "read-only": 'true'
+    } if sharing == 'read' else {})
+    group_attributes = intern_params({
+        'max-connections': '50',
+        'max-connections-per-user': '10'
+    })
+
+    # Bucket the instances of each range, duplicates are dropped by hashing
+    group_map = {}
     for instance in instances:
-        group = get_group_name(instance['name'])
-        conn_objects.append({
-            'name': instance['name'],
-            'protocol': guac_params['protocol'],
-            'attributes': {
-                'max-connections': '1',
-                'max-connections-per-user': '1',
-                'guacd-hostname': guacd_ips.get(group, '')
-            },
-            'sharingProfiles': {
-                'attributes': {},
-                'name': f"{instance['name']}.{sharing}",
-                'parameters': {
-                    "read-only": 'true'
-                } if sharing == 'read' else {}
-            } if sharing else {},
-            'parameters': {
-                'hostname': instance['hostname'],
-                'username': guac_params['username'],
-                'password': guac_params['password'],
-                "domain": guac_params['domain_name'],
-                "port": "3389" if guac_params['protocol'] == "rdp" else "22",
-                "security": "any" if guac_params['protocol'] == "rdp" else "",
-                "ignore-cert": "true" if guac_params['protocol'] == "rdp" else "",
-                "enable-wallpaper": "true" if guac_params['protocol'] == "rdp" else "",
-                "enable-theming": "true" if guac_params['protocol'] == "rdp" else "",
-                "create-recording-path": "true" if recording else "",
-                "recording-name": "${GUAC_USERNAME}-${GUAC_DATE}-${GUAC_TIME}" if recording else "",
-                "recording-path": "${HISTORY_PATH}/${HISTORY_UUID}" if recording else "",
-            }
-        })
+        group_map.setdefault(
+            get_group_name(instance['name']), []
+        ).append(instance)
 
     # Generate the create data
     if org_name == new_groups[0]:
-        conn_dict = {
-        'name': org_name,
-        'type': 'ORGANIZATIONAL',
-        'childConnections': conn_objects,
-        'attributes': {
-            'max-connections': '50',
-            'max-connections-per-user': '10'
-        }
-    }
-    else:
-        group_map = {}
-        for conn in conn_objects:
-            conns = group_map.setdefault(
-                get_group_name(conn['name']), []
-            )
-            if conn not in conns:
-                conns.append(conn)
-
-        conn_dict = {
-            'name': org_name,
-            'type': 'ORGANIZATIONAL',
-            'childConnectionGroups': [
-                {
-                    'name': group,
-                    'type': 'ORGANIZATIONAL',
-                    'childConnections': conns,
-                    'attributes': {
-                        'max-connections': '50',
-                        'max-connections-per-user': '10'
-                    }
-                }
-                for group, conns in group_map.items()
-            ],
-            'attributes': {
-                'max-connections': '50',
-                'max-connections-per-user': '10'
-            }
-        }
+        yield 'ROOT', ConnectionGroup(
+            name=org_name,
+            attributes=group_attributes,
+            connections=generate_range(instances,
+                                       guac_params,
+                                       guacd_ips,
+                                       parameters,
+                                       sharing_parameters)
+        )
+        return
+
+    yield 'ROOT', ConnectionGroup(
+        name=org_name,
+        attributes=group_attributes
+    )
+
+    for group, range_instances in group_map.items():
+        yield org_name, ConnectionGroup(
+            name=group,
+            attributes=group_attributes,
+            connections=generate_range(range_instances,
+                                       guac_params,
+                                       guacd_ips,
+                                       parameters,
+                                       sharing_parameters)
+        )
 
-    info_msg(conn_dict,
-             endpoint,
-             debug)
 
-    return conn_dict
+def generate_range(instances: list,
+                   guac_params: dict,
+                   guacd_ips: dict,
+                   parameters: tuple,
+                   sharing_parameters: tuple) -> tuple:
+    """
+    Create the connections to the instances of a range
+
+    Args:
+        instances (list): The instance names and hostnames.
+        guac_params (dict): The Guacamole parameters.
+        guacd_ips (dict): The hostname of the guacd of each range.
+        parameters (tuple): The interned connection parameters.
+        sharing_parameters (tuple): The interned sharing profile parameters.
+
+    Returns:
+        tuple: The unique connections, in instance order.
+    """
+
+    sharing = guac_params['sharing']
+
+    return tuple(dict.fromkeys(
+        Connection(
+            name=instance['name'],
+            protocol=guac_params['protocol'],
+            hostname=instance['hostname'],
+            attributes=intern_params({
+                'max-connections': '1',
+                'max-connections-per-user': '1',
+                'guacd-hostname': guacd_ips.get(get_group_name(instance['name']), '')
+            }),
+            parameters=parameters,
+            sharing_profile=SharingProfile(
+                name=f"{instance['name']}.{sharing}",
+                parameters=sharing_parameters
+            ) if sharing else None
+        )
+        for instance in instances
+    ))
 
 
 def generate_users(params: dict,
                    guac_params: dict,
-                   debug: bool = False) -> dict | None:
+                   debug: bool = False,
+                   instance_names: InstanceIndex | None = None) -> dict | None:
     """Create a user list based on given ranges"""
 
     endpoint = 'Generate'
@@ -212,10 +285,8 @@ def generate_users(params: dict,
     general_msg(f"Generating user data for {range_name}",
                 endpoint)
 
-    instance_names = [
-        instance_name['name']
-        for instance_name in guac_params['instances']
-    ]
+    if instance_names is None:
+        instance_names = index_instances(guac_params['instances'])
 
     users_list = []
 
@@ -268,9 +339,9 @@ def generate_users(params: dict,
             get_connection_name(user['username'])
         ])
 
-        expand_instances(instances,
-                         instance_names,
-                         debug)
+        instances = expand_instances(instances,
+                                     instance_names,
+                                     debug)
 
         groups = [
             get_group_name(instance)
@@ -356,12 +427,15 @@ def format_groups(user_params: dict,
 
 def format_users(user_params: dict,
                  guac_params: dict,
-                 debug=False) -> dict:
+                 debug=False,
+                 instance_names: InstanceIndex | None = None) -> dict:
     """
     Format the users.yaml data into a dictionary of user objects.
 
     Parameters:
         user_params (dict): The usrs.yaml dictionary.
+        instance_names (InstanceIndex, optional): The index of the heat
+            instance names, built from guac_params when not given.
 
     Returns:
         dict: The formated users dictionary.
@@ -369,10 +443,8 @@ def format_users(user_params: dict,
 
     endpoint = 'Generate'
     org_name = guac_params['org_name']
-    instance_names = [
-        instance_name['name']
-        for instance_name in guac_params['instances']
-    ]
+    if instance_names is None:
+        instance_names = index_instances(guac_params['instances'])
     users = {}
 
     for username, data in user_params.items():
@@ -389,11 +461,9 @@ def format_users(user_params: dict,
             )
             sharing = None
 
-        instances = data.get('instances', [])
-
-        expand_instances(instances,
-                         instance_names,
-                         debug)
+        instances = expand_instances(data.get('instances', []),
+                                     instance_names,
+                                     debug)
 
         user = {
             username: {
@@ -401,14 +471,14 @@ def format_users(user_params: dict,
                 'password': data['password'],
                 'attributes': {'guac-organization': org_name},
                 'permissions': {
-                    'connectionPermissions': data.get('instances', []),
+                    'connectionPermissions': instances,
                     'connectionGroupPermissions': set(
                         get_group_name(instance)
-                        for instance in [org_name] + data.get('instances')
+                        for instance in [org_name] + instances
                     ),
                     'sharingProfilePermissions': [
                         f"{instance}.{sharing}"
-                        for instance in data.get('instances')
+                        for instance in instances
                     ] if sharing else [],
                     'userPermissions': {
                         username: ['READ']
@@ -429,62 +499,121 @@ def format_users(user_params: dict,
     return users
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_instance_name(name: str) -> InstanceName:
+    """
+    Parse an instance name into its range and user parts, once per name.
+
+    The range index is the second part of the name and the user index the
+    last part, when they are numbers. The parts are interned, so names of
+    one range or user share them.
+
+    Args:
+        name (str): The instance name.
+
+    Returns:
+        InstanceName: The parts of the name.
+    """
+
+    range_name, separator, rest = name.partition('.')
+    if not separator:
+        name = sys.intern(name)
+        return InstanceName(name, None, name, None)
+
+    range_index = rest.partition('.')[0]
+    prefix, _, user = name.rpartition('.')
+    user_index = None
+    if user.isdigit():
+        user, user_index = prefix.rpartition('.')[2], user
+
+    return InstanceName(sys.intern(range_name),
+                        sys.intern(range_index) if range_index.isdigit() else None,
+                        sys.intern(user),
+                        sys.intern(user_index) if user_index else None)
+
+
 def get_group_name(name: str) -> str:
     """
     Generate a group name based on the given name.
     """
 
-    parts = name.split('.')
-    if len(parts) == 1:
-        return parts[0]
-
-    if parts[1].isdigit():
-        return f"{parts[0]}.{parts[1]}"
+    return parse_instance_name(name).group_name
 
-    return parts[0]
 
 def get_connection_name(name: str) -> str:
     """
     Generate a connection name based on the given name.
     """
 
-    parts = name.split('.')
-    if len(parts) == 1:
-        return parts[0]
+    return parse_instance_name(name).connection_name
+
+
+def index_instances(instances: list) -> InstanceIndex:
+    """
+    Index the heat instance names for expanding the instance mappings.
+
+    Args:
+        instances (list): The heat instances.
+
+    Returns:
+        InstanceIndex: The index of the instance names.
+    """
 
-    if parts[-1].isdigit():
-        return f"{parts[-2]}.{parts[-1]}"
+    return InstanceIndex([
+        instance['name']
+        for instance in instances
+    ])
 
-    return parts[-1]
 
 def expand_instances(instances: list,
-                     instance_names: dict,
+                     instance_names: list | InstanceIndex,
                      debug: bool = False) -> list:
     """
     Expand the instances list based on the heat instances list.
+
+    Patterns are expanded in place of their entry and instances that
+    do not exist are dropped, without modifying the given list.
+
+    Args:
+        instances (list): The instance names and patterns of a user.
+        instance_names (list | InstanceIndex): The heat instance names.
+        debug (bool): A flag indicating whether to enable debug mode.
+
+    Returns:
+        list: The unique instance names, in mapping order.
     """
 
     endpoint = 'Generate'
 
+    if not isinstance(instance_names, InstanceIndex):
+        instance_names = InstanceIndex(instance_names)
+
+    expanded = {}
+
     # If a user has an instance not in the heat_instances list, pattern match
     for instance in instances:
-        if instance.endswith('*'):
-            instance_pattern = instance.removesuffix('*')
-            heat_instances = [
-                heat_instance
-                for heat_instance in instance_names
-                if instance_pattern in heat_instance
-            ]
+        if is_pattern(instance):
+            try:
+                heat_instances = instance_names.match(instance)
+            except re.error as error:
+                error_msg(
+                    f"The instance pattern '{instance}' is invalid: {error}",
+                    endpoint
+                )
+                continue
             info_msg(
+                lambda instance=instance, heat_instances=heat_instances:
                 f"Turned '{instance}' into {heat_instances}",
                 endpoint,
                 debug
             )
-            instances.remove(instance)
-            instances.extend(heat_instances)
-        elif instance not in instance_names:
+            expanded.update(dict.fromkeys(heat_instances))
+        elif instance in instance_names:
+            expanded[instance] = None
+        else:
             error_msg(
                 f"The instance '{instance}' does not exist",
                 endpoint
             )
-            instances.remove(instance)
+
+    return list(expanded)
@@ -0,0 +1,137 @@
+"""
+Contains the index used to expand instance name patterns
+"""
+
+import fnmatch
+import re
+from bisect import bisect_left
+
+# Characters that make an instance mapping a glob pattern
+GLOB_CHARS = '*?['
+
+# Prefix of an instance mapping that is a regular expression
+REGEX_PREFIX = 're:'
+
+
+def is_pattern(instance: str) -> bool:
+    """
+    Checks whether an instance mapping is a pattern instead of a name.
+
+    Args:
+        instance (str): The instance mapping.
+
+    Returns:
+        bool: Whether the mapping is a pattern.
+    """
+
+    return (instance.startswith(REGEX_PREFIX) or
+            any(char in instance for char in GLOB_CHARS))
+
+
+class InstanceIndex:
+    """
+    A sorted index of instance names for matching mapping patterns.
+
+    Prefixes and glob patterns are looked up by bisecting the sorted names,
+    substrings and regular expressions are matched by scanning the names.
+    Matches are always returned in the order of the indexed names.
+
+    Supported patterns:
+        'Name*': Every instance containing 'Name'.
+        'Range.*.Name.?': Every instance matching the glob, as in fnmatch.
+        're:Range\\.[0-9]+\\.Name': Every instance fully matching the regex.
+
+    Args:
+        names (list): The instance names.
+    """
+
+    def __init__(self,
+                 names: list):
+        self.names = list(dict.fromkeys(names))
+        self.positions = {
+            name: position
+            for position, name in enumerate(self.names)
+        }
+        self.sorted_names = sorted(self.names)
+
+    def __contains__(self,
+                     name: str) -> bool:
+        return name in self.positions
+
+    def _ordered(self,
+                 names) -> list:
+        return sorted(names, key=self.positions.__getitem__)
+
+    def containing(self,
+                   text: str) -> list:
+        """
+        Returns the names containing a text.
+        """
+        return [
+            name
+            for name in self.names
+            if text in name
+        ]
+
+    def prefixed(self,
+                 text: str) -> list:
+        """
+        Returns the names starting with a text.
+        """
+        start = bisect_left(self.sorted_names, text)
+        end = bisect_left(self.sorted_names, text + '\U0010ffff', lo=start)
+
+        return self._ordered(self.sorted_names[start:end])
+
+    def glob(self,
+             pattern: str) -> list:
+        """
+        Returns the names matching a glob pattern.
+        """
+        regex = re.compile(fnmatch.translate(pattern))
+        literal = re.split(r'[*?\[]', pattern, maxsplit=1)[0]
+
+        return [
+            name
+            for name in (self.prefixed(literal) if literal else self.names)
+            if regex.match(name)
+        ]
+
+    def regex(self,
+              pattern: str) -> list:
+        """
+        Returns the names fully matching a regular expression.
+
+        Raises:
+            re.error: If the pattern is not a valid regular expression.
+        """
+        regex = re.compile(pattern)
+
+        return [
+            name
+            for name in self.names
+            if regex.fullmatch(name)
+        ]
+
+    def match(self,
+              pattern: str) -> list:
+        """
+        Returns the names matching an instance mapping.
+
+        A name followed by a single '*' keeps its documented meaning of
+        every instance containing the name.
+
+        Raises:
+            re.error: If a regex pattern is not a valid regular expression.
+        """
+        if pattern.startswith(REGEX_PREFIX):
+            return self.regex(pattern.removeprefix(REGEX_PREFIX))
+
+        text = pattern.removesuffix('*')
+        if pattern.endswith('*') and not any(char in text for char in GLOB_CHARS):
+            return self.containing(text)
+
+        if is_pattern(pattern):
+            return self.glob(pattern)
+
+        return [pattern] if pattern in self else []
@@ -0,0 +1,138 @@
+"""
+Contains an incremental parser for large JSON API listings
+"""
+
+import codecs
+import json
+from typing import Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_items(chunks: Iterable[bytes | str]) -> Iterator[tuple[str, object]]:
+    """
+    Yields the members of a top level JSON object while it is being read.
+
+    Only the member being parsed and the unread part of the current chunk
+    are held in memory, so the memory use doesn't grow with the listing.
+
+    Args:
+        chunks (Iterable[bytes | str]): The chunks of the JSON document,
+            e.g. from response.iter_content().
+
+    Yields:
+        tuple[str, object]: The key and the decoded value of each member.
+
+    Raises:
+        json.JSONDecodeError: If the document isn't a valid JSON object.
+    """
+
+    reader = _StreamReader(chunks)
+    reader.expect('{')
+
+    if reader.peek() == '}':
+        reader.pos += 1
+        reader.expect_end()
+        return
+
+    while True:
+        key = reader.decode()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes",
+                                       reader.buffer, reader.pos)
+        reader.expect(':')
+        value = reader.decode()
+        yield key, value
+
+        if reader.expect(',}') == '}':
+            reader.expect_end()
+            return
+
+
+class _StreamReader:
+    """
+    Buffers the chunks of a JSON document as they are needed.
+    """
+
+    def __init__(self,
+                 chunks: Iterable[bytes | str]):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.done = False
+
+    def read(self) -> bool:
+        """
+        Appends the next chunk to the buffer, dropping what was parsed.
+
+        Returns:
+            bool: Whether there was another chunk.
+        """
+        if self.done:
+            return False
+
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.done = True
+            text = self.utf8.decode(b'', final=True)
+        elif isinstance(chunk, bytes):
+            text = self.utf8.decode(chunk)
+        else:
+            text = chunk
+
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Returns the next non whitespace character, or '' at the end.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read():
+                return ''
+
+    def expect(self,
+               chars: str) -> str:
+        """
+        Consumes the next non whitespace character if it is one of chars.
+        """
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}",
+                                       self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def expect_end(self) -> None:
+        """
+        Checks that only whitespace is left in the document.
+        """
+        if self.peek():
+            raise json.JSONDecodeError("Extra data",
+                                       self.buffer, self.pos)
+
+    def decode(self) -> object:
+        """
+        Decodes the next value, reading chunks until it is complete.
+
+        A value is only accepted once the character after it was read,
+        so numbers and literals split across chunks aren't cut short.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.read():
+                    raise
+                continue
+            if end < len(self.buffer) or not self.read():
+                self.pos = end
+                return value
@@ -1,7 +1,22 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
 from munch import Munch
-from yaml import safe_load
+from yaml import load
+# Parse with libyaml when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 from utils.msg_format import error_msg, info_msg, general_msg, success_msg
 
+# Directory of the template parse caches, see parse_template
+TEMPLATE_CACHE_DIR = os.path.join(os.path.expanduser('~'),
+                                  '.cache',
+                                  'range-provisioner',
+                                  'templates')
+
 
 def load_template(template,
                   debug=False):
@@ -22,7 +37,8 @@ def load_template(template,
 
     try:
         with open(template, 'r', encoding='utf-8') as file:
-            parameters = Munch(safe_load(file))
+            parameters = Munch(parse_template(template,
+                                              file.read()))
 
     except FileNotFoundError:
         info_msg(f"Cannot find {template}",
@@ -38,6 +54,60 @@ def load_template(template,
     return parameters
 
 
+def parse_template(template,
+                   text):
+    """
+    Parse the text of a template, reusing the result of an earlier run.
+
+    The parsed data is pickled in the user's TEMPLATE_CACHE_DIR, one file
+    per template path keyed by the hash of its text, so unchanged
+    templates are not parsed again. A cache that isn't owned by the
+    current user, or that others can write, is ignored.
+
+    Args:
+        template (str): The path to the template file.
+        text (str): The text of the template file.
+
+    Returns:
+        object: The parsed template.
+    """
+
+    text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    path_hash = hashlib.sha256(os.path.abspath(template).encode('utf-8')).hexdigest()
+    cache_path = os.path.join(TEMPLATE_CACHE_DIR, f"{path_hash}.cache")
+
+    try:
+        stat = os.stat(cache_path)
+        if (stat.st_uid == getattr(os, 'getuid', lambda: stat.st_uid)() and
+                not stat.st_mode & 0o022):
+            cached_hash, data = pickle.loads(Path(cache_path).read_bytes())
+            if cached_hash == text_hash:
+                return data
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        pass
+
+    data = load(text,
+                Loader=SafeLoader)
+
+    # Write a private copy and swap it in, so readers never see half a cache
+    partial_path = f"{cache_path}.{os.getpid()}"
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, mode=0o700, exist_ok=True)
+        descriptor = os.open(partial_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump((text_hash, data),
+                        file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial_path, cache_path)
+    except (OSError, pickle.PicklingError):
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+
+    return data
+
+
 def load_global(debug=False):
     """
     Load the global variables from the "globals.yaml" template file.
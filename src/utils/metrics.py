@@ -0,0 +1,251 @@
+"""
+Contains the run metrics: wall time per phase and API calls per endpoint
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from urllib.parse import urlsplit
+from utils import profiling
+from utils.msg_format import general_msg, success_msg, error_msg
+
+# Wall time of each phase, in the order the phases started
+_phases = {}
+# Nesting depth of each phase, for indenting the summary
+_depths = {}
+# Names of the phases currently running
+_running = []
+# Calls, bytes sent and bytes received of each endpoint
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def reset() -> None:
+    """
+    Clears all recorded metrics.
+    """
+    _phases.clear()
+    _depths.clear()
+    _running.clear()
+    with _calls_lock:
+        _calls.clear()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Records the wall time of a phase of the run.
+
+    Phases started while another phase runs are nested below it, and
+    phases with the same name add up. Top level phases are profiled
+    when utils.profiling is enabled.
+
+    Args:
+        name (str): The name of the phase.
+
+    Yields:
+        None
+    """
+
+    profiled = not _running and profiling.is_enabled()
+    _depths.setdefault(name, len(_running))
+    _phases.setdefault(name, 0.0)
+    _running.append(name)
+    if profiled:
+        profiling.start(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] += time.perf_counter() - start
+        _running.pop()
+        if profiled:
+            profiling.stop(name)
+
+
+def record_call(endpoint: str,
+                sent: int = 0,
+                received: int = 0) -> None:
+    """
+    Records an API call to an endpoint.
+
+    Args:
+        endpoint (str): The name of the service endpoint.
+        sent (int): The number of request body bytes.
+        received (int): The number of response body bytes.
+    """
+
+    with _calls_lock:
+        counts = _calls.setdefault(endpoint, [0, 0, 0])
+        counts[0] += 1
+        counts[1] += sent
+        counts[2] += received
+
+
+def url_endpoint(url: str) -> str:
+    """
+    Returns the endpoint of a URL, its host and first path segment.
+
+    Args:
+        url (str): The request URL.
+
+    Returns:
+        str: The endpoint, e.g. 'cloud.example.com:8004/v1'.
+    """
+
+    parts = urlsplit(url)
+    segment = parts.path.lstrip('/').split('/', 1)[0]
+
+    return f"{parts.netloc}/{segment}" if segment else parts.netloc
+
+
+def record_response(response: object,
+                    endpoint: str | None = None,
+                    **kwargs) -> object:
+    """
+    Records a call from a requests response hook.
+
+    The body of a streamed response is only counted from its
+    Content-Length header, so the stream isn't read early.
+
+    Args:
+        response (object): The requests response.
+        endpoint (str | None): The endpoint name, by default the URL endpoint.
+        **kwargs: The arguments of the request, e.g. stream.
+
+    Returns:
+        object: The unchanged response.
+    """
+
+    body = response.request.body or b''
+    if kwargs.get('stream'):
+        received = int(response.headers.get('Content-Length', 0) or 0)
+    else:
+        received = len(response.content or b'')
+
+    record_call(endpoint or url_endpoint(response.request.url),
+                len(body),
+                received)
+
+    return response
+
+
+def rename_endpoints(names: dict) -> None:
+    """
+    Merges URL endpoints into named service endpoints.
+
+    Args:
+        names (dict): The service name of each endpoint URL, e.g. from the
+            service catalog. A URL endpoint is merged when it is the
+            url_endpoint of one of the URLs.
+    """
+
+    endpoints = {
+        url_endpoint(url): name
+        for url, name in names.items()
+    }
+    with _calls_lock:
+        for endpoint in list(_calls):
+            name = endpoints.get(endpoint)
+            if not name or name == endpoint:
+                continue
+            calls, sent, received = _calls.pop(endpoint)
+            record = _calls.setdefault(name, [0, 0, 0])
+            record[0] += calls
+            record[1] += sent
+            record[2] += received
+
+
+def get_metrics(total: float | None = None) -> dict:
+    """
+    Returns the recorded metrics.
+
+    Args:
+        total (float | None): The total wall time of the run in seconds.
+
+    Returns:
+        dict: The phases, endpoints and total time.
+    """
+
+    with _calls_lock:
+        endpoints = {
+            endpoint: {
+                'calls': calls,
+                'sent_bytes': sent,
+                'received_bytes': received
+            }
+            for endpoint, (calls, sent, received) in sorted(_calls.items())
+        }
+
+    return {
+        'total_seconds': total,
+        'phases': [
+            {
+                'name': name,
+                'depth': _depths[name],
+                'seconds': seconds
+            }
+            for name, seconds in _phases.items()
+        ],
+        'endpoints': endpoints
+    }
+
+
+def format_bytes(size: int) -> str:
+    """
+    Formats a number of bytes for the summary table.
+    """
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+    return f"{size:.1f} GiB"
+
+
+def summary(total: float | None = None,
+            path: str | None = None) -> dict:
+    """
+    Prints the phase and endpoint tables and optionally writes them as JSON.
+
+    Args:
+        total (float | None): The total wall time of the run in seconds.
+        path (str | None): The JSON file to write the metrics to.
+
+    Returns:
+        dict: The recorded metrics.
+    """
+
+    endpoint = 'Metrics'
+
+    metrics = get_metrics(total)
+
+    lines = [f"{'Phase':<40}{'Seconds':>10}{'Share':>8}"]
+    for record in metrics['phases']:
+        name = '  ' * record['depth'] + record['name']
+        share = f"{record['seconds'] / total:.0%}" if total else ''
+        lines.append(f"{name:<40}{record['seconds']:>10.2f}{share:>8}")
+
+    lines.append('')
+    lines.append(f"{'Endpoint':<40}{'Calls':>10}{'Sent':>12}{'Received':>12}")
+    for name, record in metrics['endpoints'].items():
+        lines.append(f"{name:<40}{record['calls']:>10}"
+                     f"{format_bytes(record['sent_bytes']):>12}"
+                     f"{format_bytes(record['received_bytes']):>12}")
+
+    general_msg('\n' + '\n'.join(lines),
+                endpoint)
+
+    if path:
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(metrics, file, indent=4)
+            success_msg(f"Wrote the metrics to '{path}'",
+                        endpoint)
+        except OSError as error:
+            error_msg(f"Could not write the metrics to '{path}': {error}",
+                      endpoint)
+
+    return metrics
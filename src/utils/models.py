@@ -0,0 +1,187 @@
+"""
+Contains the compact data model of the generated Guacamole connections
+and instance names
+"""
+
+from dataclasses import dataclass
+
+# Shared copies of the parameter sets, see intern_params
+_params = {}
+
+
+def intern_params(params: dict) -> tuple:
+    """
+    Returns a shared, immutable copy of a parameter mapping.
+
+    Connections generated for one range repeat the same attributes and
+    parameters, so equal mappings are stored once for the whole run.
+
+    Args:
+        params (dict): The parameters.
+
+    Returns:
+        tuple: The (key, value) pairs of the parameters.
+    """
+
+    items = tuple(params.items())
+
+    return _params.setdefault(items, items)
+
+
+@dataclass(frozen=True, slots=True)
+class InstanceName:
+    """
+    The parts of an instance name 'range[.range_index].user[.user_index]',
+    see parse_instance_name.
+    """
+    range: str
+    range_index: str | None
+    user: str
+    user_index: str | None
+
+    @property
+    def group_name(self) -> str:
+        """
+        The name of the range connection group, e.g. 'Range.2'.
+        """
+        if self.range_index is None:
+            return self.range
+        return f"{self.range}.{self.range_index}"
+
+    @property
+    def connection_name(self) -> str:
+        """
+        The name of the user connection, e.g. 'User.3'.
+        """
+        if self.user_index is None:
+            return self.user
+        return f"{self.user}.{self.user_index}"
+
+
+@dataclass(frozen=True, slots=True)
+class SharingProfile:
+    """
+    A sharing profile of a connection.
+    """
+    name: str
+    parameters: tuple = ()
+
+    def to_dict(self) -> dict:
+        """
+        Serializes the sharing profile to the Guacamole REST format.
+        """
+        return {
+            'attributes': {},
+            'name': self.name,
+            'parameters': dict(self.parameters)
+        }
+
+    def flatten(self,
+                parent: str) -> list:
+        """
+        Returns the sharing profile in the format of extract_connections.
+        """
+        conn = self.to_dict()
+        conn['parent'] = parent
+        return [conn]
+
+
+@dataclass(frozen=True, slots=True)
+class Connection:
+    """
+    A connection to an instance.
+
+    The hostname is the only parameter that differs between the
+    connections of a range, the other parameters are interned.
+    """
+    name: str
+    protocol: str
+    hostname: str
+    attributes: tuple
+    parameters: tuple
+    sharing_profile: SharingProfile | None = None
+
+    def to_dict(self) -> dict:
+        """
+        Serializes the connection to the Guacamole REST format.
+        """
+        return {
+            'name': self.name,
+            'protocol': self.protocol,
+            'attributes': dict(self.attributes),
+            'sharingProfiles': self.sharing_profile.to_dict() if self.sharing_profile else {},
+            'parameters': {
+                'hostname': self.hostname,
+                **dict(self.parameters)
+            }
+        }
+
+    def flatten(self,
+                parent: str) -> list:
+        """
+        Returns the connection and its sharing profile in the format
+        of extract_connections.
+        """
+        conn = self.to_dict()
+        conn['parent'] = parent
+        if not self.sharing_profile:
+            return [conn]
+
+        del conn['sharingProfiles']
+        return [conn] + self.sharing_profile.flatten(self.name)
+
+
+@dataclass(frozen=True, slots=True)
+class ConnectionGroup:
+    """
+    An organizational connection group holding either connection
+    groups or connections.
+    """
+    name: str
+    attributes: tuple
+    groups: tuple = ()
+    connections: tuple = ()
+    type: str = 'ORGANIZATIONAL'
+
+    def to_dict(self) -> dict:
+        """
+        Serializes the connection group tree to the Guacamole REST format.
+        """
+        conn = {
+            'name': self.name,
+            'type': self.type
+        }
+        if self.groups:
+            conn['childConnectionGroups'] = [
+                group.to_dict()
+                for group in self.groups
+            ]
+        else:
+            conn['childConnections'] = [
+                child.to_dict()
+                for child in self.connections
+            ]
+        conn['attributes'] = dict(self.attributes)
+
+        return conn
+
+    def flatten(self,
+                parent: str = 'ROOT') -> list:
+        """
+        Returns the connection group and everything below it in the format
+        of extract_connections, without building the nested tree.
+        """
+        conn = {
+            'name': self.name,
+            'type': self.type,
+            'attributes': dict(self.attributes),
+            'parent': parent
+        }
+        if not self.groups and not self.connections:
+            conn['childConnections'] = []
+
+        conns = [conn]
+        for child in self.groups or self.connections:
+            conns.extend(child.flatten(self.name))
+
+        return conns
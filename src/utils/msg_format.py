@@ -2,9 +2,95 @@
 Contains all the main functions for message formatting
 """
 
-from pprint import pprint
+import json
+import sys
+import threading
+import time
+from pprint import pformat
 from colorama import Fore
 
+# Output settings of the messages, see configure
+_output = {
+    'format': 'text',
+    'stream': None
+}
+
+# Serializes the writes of concurrent workers, see write_msg
+_write_lock = threading.Lock()
+
+
+def configure(log_format: str = 'text',
+              stream: object = None) -> None:
+    """
+    Sets how the messages are written.
+
+    Parameters:
+    - log_format (str): 'text' for colored console output or 'json' for
+      one JSON object per line.
+    - stream (object): The file object to write to, sys.stdout when None.
+
+    Returns:
+        None
+    """
+
+    if log_format not in ('text', 'json'):
+        raise ValueError(f"Invalid log format '{log_format}', expected 'text' or 'json'")
+
+    _output['format'] = log_format
+    _output['stream'] = stream
+
+
+def write_msg(text: str | list | dict,
+              endpoint: str,
+              level: str,
+              color: str) -> None:
+    """
+    Formats a message and writes it to the output stream.
+
+    Callable messages are only evaluated here, so a message that isn't
+    written is never formatted. The whole message is formatted first and
+    written in a single call under a lock, so messages of concurrent
+    workers never interleave.
+
+    Parameters:
+    - text (str | list | dict | callable): The message, or a callable
+      returning it.
+    - endpoint (str): The endpoint where the message originated.
+    - level (str): The level of the message.
+    - color (str): The color of the console header.
+
+    Returns:
+        None
+    """
+
+    if callable(text):
+        text = text()
+
+    if _output['format'] == 'json':
+        message = json.dumps({
+            'time': time.time(),
+            'level': level,
+            'endpoint': endpoint,
+            'message': text
+        }, default=str)
+    else:
+        if endpoint:
+            endpoint = endpoint.ljust(12)
+
+        header = color + endpoint + f"[{level}]".ljust(12) + Fore.RESET
+
+        if isinstance(text, str):
+            message = header + text
+        else:
+            message = header + '\n' + pformat(text,
+                                              indent=1,
+                                              sort_dicts=False)
+
+    stream = _output['stream'] or sys.stdout
+
+    with _write_lock:
+        stream.write(message + '\n')
+
 
 def error_msg(text: str | list | dict,
               endpoint='') -> None:
@@ -12,25 +98,14 @@ def error_msg(text: str | list | dict,
     Prints an error message based on the input error.
 
     Parameters:
-     - text (str | list | dict): The error message to be printed.
+     - text (str | list | dict | callable): The error message to be printed.
      - endpoint (str): The endpoint where the error occurred
 
     Returns:
         None
     """
 
-    if endpoint:
-        endpoint = endpoint.ljust(12)
-
-    print(Fore.RED + endpoint + "[ERROR]".ljust(12) + Fore.RESET, end='')
-
-    if isinstance(text, str):
-        print(text)
-    else:
-        print()
-        pprint(text,
-               indent=1,
-               sort_dicts=False)
+    write_msg(text, endpoint, 'ERROR', Fore.RED)
 
 
 def info_msg(text: str | list | dict,
@@ -39,8 +114,11 @@ def info_msg(text: str | list | dict,
     """
     Prints informational messages based on the type of input provided.
 
+    Pass a callable, e.g. lambda: json.dumps(params), for messages that are
+    costly to format, it is only called when debug is True.
+
     Parameters:
-    - text (str | list | dict): The info message(s) to be printed.
+    - text (str | list | dict | callable): The info message(s) to be printed.
     - endpoint (str): The endpoint where the message originated.
     - debug (bool): A boolean indicating whether to print the message(s) or not.
 
@@ -51,19 +129,13 @@ def info_msg(text: str | list | dict,
     if not debug:
         return
 
-    if endpoint:
-        endpoint = endpoint.ljust(12)
-
-    print(Fore.BLUE + endpoint + "[INFO]".ljust(12) + Fore.RESET, end='')
+    if callable(text):
+        text = text()
 
-    if isinstance(text, str):
-        print(text)
-    else:
+    if not isinstance(text, str):
         text = remove_none_and_empty(text)
-        print()
-        pprint(text,
-               indent=1,
-               sort_dicts=False)
+
+    write_msg(text, endpoint, 'INFO', Fore.BLUE)
 
 
 def success_msg(text: str | list | dict,
@@ -79,18 +151,7 @@ def success_msg(text: str | list | dict,
     None
     """
 
-    if endpoint:
-        endpoint = endpoint.ljust(12)
-
-    print(Fore.GREEN + endpoint + "[SUCCESS]".ljust(12) + Fore.RESET, end='')
-
-    if isinstance(text, str):
-        print(text)
-    else:
-        print()
-        pprint(text,
-               indent=1,
-               sort_dicts=False)
+    write_msg(text, endpoint, 'SUCCESS', Fore.GREEN)
 
 
 def general_msg(text: str | list | dict,
@@ -106,18 +167,7 @@ def general_msg(text: str | list | dict,
         None
     """
 
-    if endpoint:
-        endpoint = endpoint.ljust(12)
-
-    print(Fore.YELLOW + endpoint + "[INFO]".ljust(12) + Fore.RESET, end='')
-
-    if isinstance(text, str):
-        print(text)
-    else:
-        print()
-        pprint(text,
-               indent=1,
-               sort_dicts=False)
+    write_msg(text, endpoint, 'INFO', Fore.YELLOW)
 
 
 def remove_none_and_empty(obj: object) -> object:
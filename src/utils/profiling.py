@@ -0,0 +1,171 @@
+"""
+Contains the optional profiler of the provisioning phases
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import tracemalloc
+from utils.msg_format import general_msg, success_msg
+
+# Number of functions listed per phase in the report
+TOP_FUNCTIONS = 15
+
+# Profiler settings, see enable
+_settings = {
+    'directory': None,
+    'memory': False
+}
+# Running profiler and starting memory of each phase
+_running = {}
+# Statistics and memory figures of each finished phase
+_results = {}
+
+
+def enable(directory: str = 'profile',
+           memory: bool = False) -> None:
+    """
+    Profiles every top level phase recorded by utils.metrics.phase.
+
+    cProfile only follows the thread that started it, so the requests
+    sent by worker threads appear as the time spent waiting on them.
+
+    Args:
+        directory (str): The directory for the .pstats files.
+        memory (bool): Whether to trace the peak memory of each phase
+            with tracemalloc, which slows the run down.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    _settings['directory'] = directory
+    _settings['memory'] = memory
+    _results.clear()
+
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable() -> None:
+    """
+    Stops profiling and tracing memory.
+    """
+    _settings['directory'] = None
+    if _settings['memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _settings['memory'] = False
+
+
+def is_enabled() -> bool:
+    """
+    Checks whether the phases are profiled.
+    """
+    return _settings['directory'] is not None
+
+
+def start(name: str) -> None:
+    """
+    Starts profiling a phase.
+
+    Args:
+        name (str): The name of the phase.
+    """
+
+    start_memory = 0
+    if _settings['memory']:
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+
+    profiler = cProfile.Profile()
+    _running[name] = (profiler, start_memory)
+    profiler.enable()
+
+
+def stop(name: str) -> dict:
+    """
+    Stops profiling a phase and writes its statistics.
+
+    A phase that runs again adds to the statistics of its earlier runs.
+
+    Args:
+        name (str): The name of the phase.
+
+    Returns:
+        dict: The .pstats path, peak memory and memory growth of the phase.
+    """
+
+    profiler, start_memory = _running.pop(name)
+    profiler.disable()
+
+    result = _results.get(name)
+    if result:
+        result['stats'].add(profiler)
+    else:
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_').lower()
+        result = _results[name] = {
+            'stats': pstats.Stats(profiler),
+            'path': os.path.join(_settings['directory'], f"{slug}.pstats"),
+            'peak_bytes': None,
+            'growth_bytes': None
+        }
+    result['stats'].dump_stats(result['path'])
+
+    if _settings['memory']:
+        current, peak = tracemalloc.get_traced_memory()
+        result['peak_bytes'] = max(peak, result['peak_bytes'] or 0)
+        result['growth_bytes'] = (result['growth_bytes'] or 0) + current - start_memory
+
+    return result
+
+
+def top_functions(stats: pstats.Stats,
+                  count: int = TOP_FUNCTIONS) -> str:
+    """
+    Formats the functions with the most time spent in their own code.
+
+    Args:
+        stats (pstats.Stats): The profile statistics.
+        count (int): The number of functions to list.
+
+    Returns:
+        str: The table of the top functions.
+    """
+
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(pstats.SortKey.TIME, pstats.SortKey.CUMULATIVE).print_stats(count)
+
+    lines = stream.getvalue().splitlines()
+    header = next((index for index, line in enumerate(lines) if 'ncalls' in line), 0)
+
+    return '\n'.join(line for line in lines[header:] if line.strip())
+
+
+def report(count: int = TOP_FUNCTIONS) -> dict:
+    """
+    Prints the memory figures and top functions of each profiled phase.
+
+    Args:
+        count (int): The number of functions to list per phase.
+
+    Returns:
+        dict: The results of each phase.
+    """
+
+    endpoint = 'Profile'
+
+    for name, result in _results.items():
+        memory = ''
+        if result['peak_bytes'] is not None:
+            memory = (f", peak memory {result['peak_bytes'] / 2 ** 20:.1f} MiB, "
+                      f"growth {result['growth_bytes'] / 2 ** 20:+.1f} MiB")
+        general_msg(f"{name}: {result['stats'].total_tt:.2f} s profiled{memory}\n"
+                    f"{top_functions(result['stats'], count)}",
+                    endpoint)
+
+    if _results:
+        success_msg(f"Wrote the profiles to '{_settings['directory']}'",
+                    endpoint)
+
+    return _results
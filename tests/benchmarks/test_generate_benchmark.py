@@ -0,0 +1,88 @@
+"""
+Benchmark how connection generation scales from 10 to 20k instances.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+from src.utils.generate import generate_conns
+# The connections are built from the models module generate imports itself
+from utils.models import Connection
+
+SIZES = [10, 100, 1000, 5000, 20000]
+RANGES = 10
+
+
+def make_guac_params(instances: int) -> dict:
+    """
+    Create the parameters of RANGES ranges with a guacd and user instances,
+    so the connections per group grow with the instances.
+
+    Args:
+        instances (int): The number of user instances.
+
+    Returns:
+        dict: The Guacamole parameters.
+    """
+    ranges = min(RANGES, instances)
+    return {
+        'org_name': 'Test_Org',
+        'new_groups': [f"Test_Range.{r + 1}" for r in range(ranges)],
+        'instances': [
+            {
+                'name': f"Test_Range.{r + 1}.guacd",
+                'hostname': f"10.{r // 250}.{r % 250}.1"
+            }
+            for r in range(ranges)
+        ] + [
+            {
+                'name': f"Test_Range.{i % ranges + 1}.Test_Name.{i // ranges + 1}",
+                'hostname': f"10.{i // 62500}.{i // 250 % 250}.{i % 250}"
+            }
+            for i in range(instances)
+        ],
+        'recording': True,
+        'sharing': 'read',
+        'protocol': 'rdp',
+        'username': 'user',
+        'password': 'pass',
+        'domain_name': 'domain'
+    }
+
+
+@patch('src.utils.generate.general_msg', MagicMock())
+@patch('src.utils.generate.info_msg', MagicMock())
+class TestGenerateBenchmark(unittest.TestCase):
+    """
+    Measure generate_conns at growing numbers of instances.
+    """
+
+    def test_linear_scaling(self):
+        """
+        Test that connections are never compared pairwise within a group
+        as the ranges grow.
+        """
+        comparisons = 0
+        equals = Connection.__eq__
+
+        def counting_equals(self, other):
+            nonlocal comparisons
+            comparisons += 1
+            return equals(self, other)
+
+        for size in SIZES:
+            guac_params = make_guac_params(size)
+            # Each range maps its first instance twice
+            guac_params['instances'] += guac_params['instances'][RANGES:2 * RANGES]
+            comparisons = 0
+
+            with patch.object(Connection, '__eq__', counting_equals):
+                tree = generate_conns({}, guac_params, False)
+
+            self.assertEqual(sum(len(group.connections) for group in tree.groups), size)
+            # Only the duplicates are compared, a pairwise dedupe would
+            # compare every connection of a group with the earlier ones
+            self.assertLessEqual(comparisons, min(RANGES, size))
+
+
+if __name__ == '__main__':
+    unittest.main()
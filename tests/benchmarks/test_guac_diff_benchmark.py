@@ -0,0 +1,208 @@
+"""
+Benchmark the Guacamole update diff at 10k connections and users.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+from src.orchestration import guac
+from src.orchestration.guac import create_conn_data, create_user_data
+
+OBJECTS = 10000
+# Diffed sizes, each twice the previous one
+SIZES = [OBJECTS // 4, OBJECTS // 2, OBJECTS]
+
+
+class CountedFingerprint:
+    """
+    A fingerprint that counts the equality comparisons made with it.
+
+    A set lookup compares a fingerprint with the entries of equal hash
+    only, while a list lookup compares it with every entry before a match.
+    """
+    comparisons = 0
+
+    def __init__(self, value: object):
+        self.value = value
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __eq__(self, other: object) -> bool:
+        CountedFingerprint.comparisons += 1
+        return isinstance(other, CountedFingerprint) and self.value == other.value
+
+
+def count_comparisons(diff: callable,
+                      *args) -> tuple[int, tuple]:
+    """
+    Run a diff and count the comparisons between object fingerprints.
+
+    Args:
+        diff (callable): The diff function.
+        *args: The arguments of the diff function.
+
+    Returns:
+        tuple[int, tuple]: The number of comparisons and the result of the diff.
+    """
+    fingerprint = guac.fingerprint
+    depth = 0
+
+    def counted_fingerprint(obj: object) -> object:
+        nonlocal depth
+        depth += 1
+        try:
+            value = fingerprint(obj)
+        finally:
+            depth -= 1
+        # Only the fingerprints of whole objects are compared by the diff
+        return CountedFingerprint(value) if depth == 0 else value
+
+    CountedFingerprint.comparisons = 0
+    with patch('src.orchestration.guac.fingerprint', counted_fingerprint):
+        result = diff(*args)
+    return CountedFingerprint.comparisons, result
+
+
+def make_conns(count: int,
+               identifiers: bool) -> dict:
+    """
+    Create a connection tree.
+
+    Args:
+        count (int): The number of connections.
+        identifiers (bool): Whether to add server side identifiers.
+
+    Returns:
+        dict: The connection tree.
+    """
+    conns = []
+    for i in range(count):
+        conn = {
+            'name': f"Test_Range.Test_Name.{i+1}",
+            'protocol': 'rdp',
+            'attributes': {
+                'max-connections': '1',
+                'max-connections-per-user': '1',
+                'guacd-hostname': ''
+            },
+            'parameters': {
+                'hostname': f"10.0.{i // 250}.{i % 250}",
+                'username': 'user',
+                'password': 'pass',
+                'port': '3389',
+                'security': 'any'
+            }
+        }
+        if identifiers:
+            conn['identifier'] = str(i + 2)
+            conn['parentIdentifier'] = '1'
+        conns.append(conn)
+
+    tree = {
+        'name': 'Test_Org',
+        'type': 'ORGANIZATIONAL',
+        'childConnections': conns
+    }
+    if identifiers:
+        tree['identifier'] = '1'
+        tree['parentIdentifier'] = 'ROOT'
+    return tree
+
+
+def make_users(count: int) -> tuple[dict, dict]:
+    """
+    Create the connection IDs and the Guacamole parameters of unchanged users.
+
+    Args:
+        count (int): The number of users.
+
+    Returns:
+        tuple[dict, dict]: The connection IDs and the Guacamole parameters.
+    """
+    conn_ids = {f"conn.{i}": str(i) for i in range(count)}
+    new_users = {}
+    current_users = []
+    for i in range(count):
+        username = f"Test_Range.Test_Name.{i}"
+        new_users[username] = {
+            'password': 'pass',
+            'permissions': {
+                'connectionPermissions': [f"conn.{i}"],
+                'connectionGroupPermissions': [],
+                'sharingProfilePermissions': [],
+                'userPermissions': {username: ['READ']},
+                'userGroupPermissions': [],
+                'systemPermissions': []
+            }
+        }
+        current_users.append({
+            'username': username,
+            'attributes': {'guac-organization': 'Test_Org'},
+            'permissions': {
+                'connectionPermissions': {str(i): ['READ']},
+                'userPermissions': {username: ['READ']}
+            }
+        })
+    guac_params = {
+        'org_name': 'Test_Org',
+        'new_users': new_users,
+        'users': current_users
+    }
+    return conn_ids, guac_params
+
+
+@patch('src.orchestration.guac.general_msg', MagicMock())
+class TestDiffBenchmark(unittest.TestCase):
+    """
+    Benchmark create_conn_data and create_user_data with nothing to change.
+    """
+
+    def assertLinear(self, comparisons: dict):
+        """
+        Assert that every object added the same number of comparisons.
+        """
+        small, medium, large = (comparisons[size] for size in SIZES)
+        self.assertEqual(large - medium, 2 * (medium - small))
+
+    def test_conn_diff(self):
+        """
+        Test that diffing 10k unchanged connections compares each
+        connection a fixed number of times.
+        """
+        comparisons = {}
+        for count in SIZES:
+            guac_params = {
+                'parent_group_id': '1',
+                'new_groups': ['Test_Org'],
+                'new_conns': make_conns(count, False),
+                'conns': make_conns(count, True)
+            }
+            comparisons[count], (conns_to_create, conns_to_delete, _) = count_comparisons(
+                create_conn_data, guac_params, True
+            )
+
+            self.assertEqual(conns_to_create, [])
+            self.assertEqual(conns_to_delete, [])
+
+        self.assertLinear(comparisons)
+
+    def test_user_diff(self):
+        """
+        Test that diffing 10k unchanged users compares each user a fixed
+        number of times.
+        """
+        comparisons = {}
+        for count in SIZES:
+            conn_ids, guac_params = make_users(count)
+            comparisons[count], (users_to_create, users_to_delete, _) = count_comparisons(
+                create_user_data, guac_params, conn_ids, True
+            )
+
+            self.assertEqual(users_to_create, [])
+            self.assertEqual(users_to_delete, [])
+
+        self.assertLinear(comparisons)
+
+
+if __name__ == '__main__':
+    unittest.main()
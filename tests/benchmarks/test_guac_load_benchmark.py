@@ -0,0 +1,154 @@
+"""
+Load test the Guacamole orchestration against the fake Guacamole server
+with 1000 users.
+"""
+
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from tests.fakes.guacamole_server import FakeGuacamole
+from src.orchestration import guac
+from src.utils.connections import guacamole_connection
+from src.utils.generate import generate_groups, generate_users, iter_range_conns
+
+RANGES = 50
+USERS_PER_RANGE = 20
+WORKERS = 8
+# Latency of every request while deprovisioning in seconds, so the workers overlap
+LATENCY = 0.005
+# User deletes failing once with an internal error, the first user of each range
+FAILED_DELETES = r'^/users/Test_Range\.\d+\.Test_Name\.1$'
+
+# The orchestration waits between requests, which isn't under test here
+FAST_TIME = SimpleNamespace(sleep=lambda seconds: None, time=time.time)
+
+QUIET = {
+    'general_msg': MagicMock(),
+    'info_msg': MagicMock(),
+    'success_msg': MagicMock()
+}
+
+# The guac module calls the helper modules it imports itself, which are
+# patched under the names it sees them by
+BULK_MODULE = guac.create_conns_bulk.__module__
+CONCURRENCY_MODULE = guac.run_parallel.__module__
+
+
+def make_params(gconn: object) -> tuple[dict, dict]:
+    """
+    Create the globals and Guacamole parameters of RANGES ranges with
+    USERS_PER_RANGE users each, as provision/guac.py does.
+
+    Args:
+        gconn (object): The Guacamole connection object.
+
+    Returns:
+        tuple[dict, dict]: The globals and the Guacamole parameters.
+    """
+    params = {
+        'num_ranges': RANGES,
+        'num_users': USERS_PER_RANGE,
+        'range_name': 'Test_Range',
+        'user_name': 'Test_Name',
+        'org_name': 'Test_Org'
+    }
+    guac_params = {
+        'org_name': 'Test_Org',
+        'parent_group_id': guac.get_conn_id(gconn, 'Test_Org', 'ROOT', 'group'),
+        'protocol': 'rdp',
+        'username': 'user',
+        'password': 'pass',
+        'domain_name': '',
+        'mapped_only': False,
+        'recording': False,
+        'sharing': False,
+        'users': 'Test_Name',
+        'delay': 0,
+        'group_permissions': False,
+        'workers': WORKERS,
+        'fast_deprovision': True,
+        'instances': [
+            {
+                'name': f"Test_Range.{r + 1}.Test_Name.{u + 1}",
+                'hostname': f"10.{r // 250}.{r % 250}.{u + 10}"
+            }
+            for r in range(RANGES)
+            for u in range(USERS_PER_RANGE)
+        ]
+    }
+    guac_params['new_groups'] = generate_groups(params)
+    guac_params['new_users'] = generate_users(params, guac_params)
+
+    return params, guac_params
+
+
+@patch('src.orchestration.guac.time', FAST_TIME)
+@patch(f"{BULK_MODULE}.time", FAST_TIME)
+@patch(f"{CONCURRENCY_MODULE}.time", FAST_TIME)
+@patch.multiple('src.orchestration.guac', **QUIET)
+@patch.multiple(BULK_MODULE, **QUIET)
+@patch.multiple('src.utils.generate', general_msg=MagicMock(), info_msg=MagicMock())
+@patch.multiple('src.utils.connections', general_msg=MagicMock(), success_msg=MagicMock())
+class TestGuacLoadBenchmark(unittest.TestCase):
+    """
+    Provision and deprovision 1000 users through the API wrapper.
+    """
+
+    def setUp(self):
+        self.fake = FakeGuacamole().start()
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_provision_and_deprovision(self):
+        """
+        Test that every range and user is created, and deleted concurrently
+        with retries, within a bounded number of requests.
+        """
+        users = RANGES * USERS_PER_RANGE
+
+        gconn = guacamole_connection('guac', self.fake.clouds(), False, WORKERS)
+        _, guac_params = make_params(gconn)
+        guac_params['users'] = guac.get_users(gconn, 'Test_Org')
+
+        guac.provision_ranges(gconn,
+                              guac_params,
+                              iter_range_conns(guac_params))
+        provision_stats = self.fake.stats()
+
+        self.assertEqual(len(self.fake.users), users)
+        self.assertEqual(len(self.fake.connections), users)
+        self.assertEqual(len(self.fake.groups), RANGES + 1)
+        permissions = self.fake.permissions[('user', 'Test_Range.1.Test_Name.1')]
+        self.assertEqual(len(permissions['connections']), 1)
+        self.assertEqual(len(permissions['groups']), 2)
+        # Users are created one request at a time, connections in batches
+        self.assertLess(provision_stats['requests'], users * 4)
+
+        # A new run deletes everything with slow requests and failures
+        self.fake.latency = LATENCY
+        self.fake.fail('DELETE', FAILED_DELETES)
+        gconn = guacamole_connection('guac', self.fake.clouds(), False, WORKERS)
+        _, guac_params = make_params(gconn)
+
+        guac.deprovision(gconn, guac_params)
+        stats = self.fake.stats()
+        deprovision_requests = stats['requests'] - provision_stats['requests']
+
+        self.assertEqual(self.fake.users, {})
+        self.assertEqual(self.fake.connections, {})
+        self.assertEqual(len(self.fake.groups), 1)
+        self.assertEqual(stats['errors'], RANGES)
+        self.assertGreater(stats['max_concurrency'], 1)
+        self.assertLessEqual(stats['max_concurrency'], WORKERS)
+        # Every failed user delete is retried once, and the connections
+        # are deleted with their groups
+        self.assertEqual(stats['by_route']['DELETE /users/*'], users + RANGES)
+        self.assertEqual(stats['by_route']['DELETE /connectionGroups/*'], RANGES)
+        self.assertNotIn('DELETE /connections/*', stats['by_route'])
+        self.assertLess(deprovision_requests, users + 3 * RANGES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the memory of filtering a 50k user listing while it is streamed.
+"""
+
+import json
+import tracemalloc
+import unittest
+from src.utils.json_stream import iter_json_items
+
+USERS = 50000
+MATCHES = 100
+CHUNK_SIZE = 64 * 1024
+
+
+def make_listing() -> bytes:
+    """
+    Create a user listing with MATCHES users in the filtered organization.
+
+    Returns:
+        bytes: The JSON listing.
+    """
+    return json.dumps({
+        f"user{i}": {
+            'username': f"user{i}",
+            'disabled': False,
+            'attributes': {
+                'guac-full-name': f"User {i}",
+                'guac-organization': 'Test_Org' if i < MATCHES else f"Org{i % 500}",
+                'guac-email-address': f"user{i}@example.com"
+            },
+            'lastActive': 1700000000000 + i
+        }
+        for i in range(USERS)
+    }).encode('utf-8')
+
+
+def chunks(data: bytes):
+    """
+    Yield the listing in chunks like response.iter_content().
+    """
+    for i in range(0, len(data), CHUNK_SIZE):
+        yield data[i:i + CHUNK_SIZE]
+
+
+def peak_memory(func: callable, data: bytes) -> tuple[int, list]:
+    """
+    Measure the peak memory allocated while filtering the listing.
+    """
+    tracemalloc.start()
+    result = func(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, result
+
+
+class TestJsonStreamBenchmark(unittest.TestCase):
+    """
+    Compare the streamed and the fully parsed listing.
+    """
+
+    def test_flat_memory(self):
+        """
+        Test that streaming retains a small fraction of a full parse.
+        """
+        data = make_listing()
+
+        full_peak, full_users = peak_memory(
+            lambda data: [user for user in json.loads(data).values()
+                          if user['attributes']['guac-organization'] == 'Test_Org'],
+            data
+        )
+        stream_peak, stream_users = peak_memory(
+            lambda data: [user for _, user in iter_json_items(chunks(data))
+                          if user['attributes']['guac-organization'] == 'Test_Org'],
+            data
+        )
+
+        self.assertEqual(stream_users, full_users)
+        self.assertLess(stream_peak, full_peak / 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Benchmark loading a large heat template with the parse cache.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import yaml
+from src.utils.load_template import load_template
+
+RESOURCES = 2000
+
+
+def make_template() -> str:
+    """
+    Create a heat template with RESOURCES servers.
+
+    Returns:
+        str: The YAML text.
+    """
+    return yaml.safe_dump({
+        'heat_template_version': '2018-08-31',
+        'parameters': {
+            'username': {'type': 'string', 'default': 'user'},
+            'password': {'type': 'string', 'default': 'pass'}
+        },
+        'resources': {
+            f"server_{i}": {
+                'type': 'OS::Nova::Server',
+                'properties': {
+                    'name': f"Test_Range.{i // 20 + 1}.Test_Name.{i % 20 + 1}",
+                    'image': 'ubuntu',
+                    'flavor': 'm1.small',
+                    'networks': [{'network': 'private', 'fixed_ip': f"10.0.{i // 250}.{i % 250}"}],
+                    'user_data': f"#!/bin/bash\necho {i}\n"
+                }
+            }
+            for i in range(RESOURCES)
+        }
+    })
+
+
+@patch('src.utils.load_template.info_msg', MagicMock())
+class TestLoadTemplateBenchmark(unittest.TestCase):
+    """
+    Count the parses of a large heat template with the parse cache.
+    """
+
+    def test_cached_load(self):
+        """
+        Test that a repeat load of an unchanged template skips parsing.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            template = os.path.join(directory, 'main.yaml')
+            text = make_template()
+            with open(template, 'w', encoding='utf-8') as file:
+                file.write(text)
+
+            with patch('src.utils.load_template.TEMPLATE_CACHE_DIR',
+                       os.path.join(directory, 'cache')), \
+                 patch('src.utils.load_template.load',
+                       wraps=yaml.load) as mock_load:
+                first = load_template(template)
+                cached = load_template(template)
+
+        expected = yaml.safe_load(text)
+        self.assertEqual(first, expected)
+        self.assertEqual(cached, expected)
+        self.assertEqual(len(cached.resources), RESOURCES)
+        mock_load.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Benchmark the memory of the generated connection tree at 10k connections.
+"""
+
+import tracemalloc
+import unittest
+from unittest.mock import patch, MagicMock
+from src.utils.generate import generate_conns
+
+CONNECTIONS = 10000
+RANGES = 100
+
+
+def make_guac_params() -> dict:
+    """
+    Create the parameters of CONNECTIONS connections across RANGES ranges.
+
+    Returns:
+        dict: The Guacamole parameters.
+    """
+    return {
+        'org_name': 'Test_Org',
+        'new_groups': [f"Test_Range.{r + 1}" for r in range(RANGES)],
+        'instances': [
+            {
+                'name': f"Test_Range.{i % RANGES + 1}.Test_Name.{i // RANGES + 1}",
+                'hostname': f"10.{i % RANGES}.{i // 250 % 250}.{i % 250}"
+            }
+            for i in range(CONNECTIONS)
+        ],
+        'recording': True,
+        'sharing': 'read',
+        'protocol': 'rdp',
+        'username': 'user',
+        'password': 'pass',
+        'domain_name': 'domain'
+    }
+
+
+def retained_memory(func: callable) -> tuple[int, object]:
+    """
+    Measure the memory retained by the result of a function.
+    """
+    tracemalloc.start()
+    result = func()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained, result
+
+
+@patch('src.utils.generate.general_msg', MagicMock())
+@patch('src.utils.generate.info_msg', MagicMock())
+class TestModelsBenchmark(unittest.TestCase):
+    """
+    Compare the connection tree with its REST format.
+    """
+
+    def test_compact_tree(self):
+        """
+        Test that the tree retains a fraction of the nested dictionaries.
+        """
+        guac_params = make_guac_params()
+
+        model_memory, tree = retained_memory(lambda: generate_conns({}, guac_params, False))
+        dict_memory, _ = retained_memory(tree.to_dict)
+
+        self.assertEqual(sum(len(group.connections) for group in tree.groups), CONNECTIONS)
+        self.assertLess(model_memory, dict_memory / 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
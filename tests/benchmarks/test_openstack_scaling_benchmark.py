@@ -0,0 +1,189 @@
+"""
+Benchmark Heat, Swift and the resource ID lookups from 1 to 100 ranges
+against the fake OpenStack connection.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+import yaml
+from tests.fakes.openstack_cloud import FakeOpenStack
+from src.provision import heat, swift
+from src.utils import manage_ids
+# The provision modules call the orchestration modules they import themselves
+from orchestration.heat import get_ostack_instances
+
+RANGES = [1, 10, 100]
+USERS_PER_RANGE = 2
+# Delay of every API call, the build time of a stack and the time its
+# servers take to get an address, in seconds
+REQUEST_LATENCY = 0.001
+STACK_LATENCY = 0.2
+ADDRESS_DELAY = 0.05
+TEMPLATE_DIR = 'tests/templates'
+
+QUIET = {
+    'general_msg': MagicMock(),
+    'info_msg': MagicMock(),
+    'success_msg': MagicMock(),
+    'error_msg': MagicMock()
+}
+
+
+def load_parameters(template: str) -> dict:
+    """
+    Load the parameters of a Heat template, as load_template does.
+
+    Args:
+        template (str): The name of the template in TEMPLATE_DIR.
+
+    Returns:
+        dict: The template parameters.
+    """
+    with open(f"{TEMPLATE_DIR}/{template}", 'r', encoding='utf-8') as file:
+        return yaml.safe_load(file)['parameters']
+
+
+def make_globals(ranges: int,
+                 create: bool) -> dict:
+    """
+    Create the globals of a run over a number of ranges.
+
+    Args:
+        ranges (int): The number of ranges.
+        create (bool): Whether to provision or deprovision.
+
+    Returns:
+        dict: The globals.
+    """
+    return {
+        'provision': create,
+        'range_name': 'Test_Range',
+        'user_name': 'Test_Name',
+        'num_ranges': ranges,
+        'num_users': USERS_PER_RANGE
+    }
+
+
+@patch.multiple('orchestration.heat', **QUIET)
+@patch.multiple('orchestration.swift', **QUIET)
+@patch.multiple('src.provision.heat', general_msg=MagicMock(), info_msg=MagicMock())
+@patch.multiple('src.provision.swift', info_msg=MagicMock())
+@patch.multiple('src.utils.manage_ids', **QUIET)
+class TestOpenStackScalingBenchmark(unittest.TestCase):
+    """
+    Provision and deprovision 1, 10 and 100 ranges with cloud latencies.
+    """
+
+    def assertLinear(self,
+                     counts: list) -> None:
+        """
+        Assert that counts taken at RANGES grow linearly with the ranges.
+        """
+        small, medium, large = counts
+        self.assertEqual((large - medium) * (RANGES[1] - RANGES[0]),
+                         (medium - small) * (RANGES[2] - RANGES[1]))
+
+    def test_heat_scaling(self):
+        """
+        Test that stacks build concurrently, so that a run waits on the
+        security group stack and the last stack only, and that API calls
+        grow linearly with the ranges.
+        """
+        heat_globals = {
+            'provision': True,
+            'update': False,
+            'template_dir': TEMPLATE_DIR,
+            'pause': 0
+        }
+        provision_counts = []
+        deprovision_counts = []
+
+        for ranges in RANGES:
+            conn = FakeOpenStack(request_latency=REQUEST_LATENCY,
+                                 stack_latency=STACK_LATENCY,
+                                 address_delay=ADDRESS_DELAY)
+            last_stack = 'Test_Range' if ranges == 1 else f"Test_Range.{ranges}"
+
+            heat.provision(conn,
+                           make_globals(ranges, True),
+                           heat_globals,
+                           load_parameters('main.yaml'),
+                           load_parameters('sec.yaml'))
+            stats = conn.stats()
+            provision_counts.append(stats['requests'])
+            self.assertEqual(stats['waits'], {'sec_group': 1, last_stack: 1})
+
+            # Servers of the last stack get their address after the delay
+            instances = get_ostack_instances(conn, ['Test_Range'])
+            deadline = time.monotonic() + 10 * ADDRESS_DELAY
+            while not all(instance['hostname'] for instance in instances):
+                if time.monotonic() > deadline:
+                    self.fail(f"The servers of {ranges} ranges got no address "
+                              f"within {10 * ADDRESS_DELAY} s")
+                time.sleep(ADDRESS_DELAY / 10)
+                instances = get_ostack_instances(conn, ['Test_Range'])
+
+            env_params, = manage_ids.update_ids(conn, [{'parameters': {}}], [], True)
+
+            requests = conn.stats()['requests']
+            heat.provision(conn,
+                           make_globals(ranges, False),
+                           heat_globals,
+                           load_parameters('main.yaml'),
+                           load_parameters('sec.yaml'))
+            stats = conn.stats()
+            deprovision_counts.append(stats['requests'] - requests)
+
+            self.assertEqual(len(instances), ranges * (USERS_PER_RANGE + 1))
+            self.assertEqual(len({instance['hostname'] for instance in instances}),
+                             len(instances))
+            self.assertIn('student.network_id', env_params['parameters'])
+            self.assertEqual(stats['by_call']['create_stack'], ranges + 1)
+            self.assertEqual(stats['by_call']['orchestration.resources'], ranges + 1)
+            # Deleting waits on the last stack only
+            self.assertEqual(stats['waits'], {'sec_group': 1, last_stack: 2})
+            # The security group stack is kept
+            self.assertEqual([stack.name for stack in conn.search_stacks()], ['sec_group'])
+            self.assertEqual(conn.list_servers(False), [])
+
+        self.assertLinear(provision_counts)
+        self.assertLinear(deprovision_counts)
+
+    def test_swift_scaling(self):
+        """
+        Test that uploading and deleting assets makes one request per
+        object, as Swift uses one container per range name.
+        """
+        swift_globals = {'provision': True, 'update': False}
+        request_counts = []
+
+        for objects in RANGES:
+            conn = FakeOpenStack(request_latency=REQUEST_LATENCY)
+
+            with tempfile.TemporaryDirectory() as asset_dir:
+                for i in range(objects):
+                    with open(os.path.join(asset_dir, f"asset.{i}.txt"), 'w',
+                              encoding='utf-8') as file:
+                        file.write(f"Asset {i}\n")
+                swift_globals['asset_dir'] = asset_dir
+
+                swift.provision(conn, make_globals(1, True), swift_globals)
+                uploaded = len(conn.list_objects('Test_Range'))
+
+                swift.provision(conn, make_globals(1, False), swift_globals)
+            stats = conn.stats()
+            request_counts.append(stats['requests'])
+
+            self.assertEqual(uploaded, objects)
+            self.assertEqual(conn.search_containers(), [])
+            self.assertEqual(stats['by_call']['create_object'], objects)
+            self.assertEqual(stats['by_call']['delete_object'], objects)
+
+        self.assertLinear(request_counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
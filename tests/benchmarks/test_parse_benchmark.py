@@ -0,0 +1,81 @@
+"""
+Benchmark the memoized instance name parsing at 50k names.
+"""
+
+import tracemalloc
+import unittest
+from src.utils.generate import get_group_name, get_connection_name, parse_instance_name
+
+NAMES = 50000
+# Lookups of each name after the first, e.g. by generate_range, generate_users
+# and format_groups after the instances were bucketed by range
+REPEATS = 4
+# Bytes the parse cache may hold per name, the two name caches it replaced held 313
+MAX_BYTES_PER_NAME = 200
+
+
+def split_names(name: str) -> tuple[str, str]:
+    """
+    Parse the group and connection names by splitting on every call.
+    """
+    range_name, separator, rest = name.partition('.')
+    if not separator:
+        return name, name
+
+    range_index = rest.partition('.')[0]
+    group_name = f"{range_name}.{range_index}" if range_index.isdigit() else range_name
+    prefix, _, user = name.rpartition('.')
+    if user.isdigit():
+        return group_name, f"{prefix.rpartition('.')[2]}.{user}"
+
+    return group_name, user
+
+
+class TestParseBenchmark(unittest.TestCase):
+    """
+    Compare the cached instance name parsing with splitting on every call.
+    """
+
+    def setUp(self):
+        self.names = [
+            f"Test_Range.{i % 500 + 1}.Test_Name.{i // 500 + 1}"
+            for i in range(NAMES)
+        ]
+        parse_instance_name.cache_clear()
+
+    def test_cached_parsing(self):
+        """
+        Test that both accessors share one parse of each name, where
+        splitting parses it on every lookup, with the same results.
+        """
+        lookups = 0
+        for _ in range(REPEATS + 1):
+            names = [
+                (get_group_name(name), get_connection_name(name))
+                for name in self.names
+            ]
+            lookups += 2 * NAMES
+
+        self.assertEqual(names, [split_names(name) for name in self.names])
+        cache_info = parse_instance_name.cache_info()
+        self.assertEqual(cache_info.misses, NAMES)
+        self.assertEqual(cache_info.misses + cache_info.hits, lookups)
+
+    def test_cache_memory(self):
+        """
+        Test that the parse cache holds at most MAX_BYTES_PER_NAME per name,
+        as the parts shared by names of one range or user are stored once.
+        """
+        tracemalloc.start()
+        try:
+            for name in self.names:
+                parse_instance_name(name)
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(size / NAMES, MAX_BYTES_PER_NAME)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Benchmark the startup of the provisioner with python -X importtime.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+SOURCE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+PROVISIONER = os.path.join(SOURCE_PATH, 'provisioner.py')
+
+# Import time budget of the provisioner module in seconds, only checked
+# when set, as timings vary with the machine and coverage tracing
+IMPORT_BUDGET = float(os.environ.get('PROVISIONER_IMPORT_BUDGET', 0))
+ROUNDS = 3
+
+# Packages only needed once a subcommand runs
+SDK_MODULES = ['openstack', 'guacamole', 'keystoneauth1', 'requests']
+
+
+def import_times(*args: str) -> dict:
+    """
+    Run python -X importtime and collect the cumulative import times.
+
+    Args:
+        *args (str): The arguments after python -X importtime.
+
+    Returns:
+        dict: The cumulative import time of each module in seconds.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                            cwd=SOURCE_PATH,
+                            capture_output=True,
+                            text=True,
+                            check=False)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.removeprefix('import time:').split('|')
+        times[name.strip()] = int(cumulative) / 1e6
+
+    return times
+
+
+class TestStartupBenchmark(unittest.TestCase):
+    """
+    Check that the SDKs are only imported by the subcommands using them.
+    """
+
+    @unittest.skipUnless(IMPORT_BUDGET, "PROVISIONER_IMPORT_BUDGET is not set")
+    def test_import_budget(self):
+        """
+        Test that importing the provisioner stays within IMPORT_BUDGET.
+        """
+        import_time = min(
+            import_times('-c', 'import provisioner')['provisioner']
+            for _ in range(ROUNDS)
+        )
+        self.assertLess(import_time, IMPORT_BUDGET)
+
+    def test_invalid_subcommand(self):
+        """
+        Test that an invalid subcommand doesn't import any SDK.
+        """
+        times = import_times(PROVISIONER, 'typo')
+        self.assertIn('utils.load_template', times)
+        for module in SDK_MODULES:
+            self.assertNotIn(module, times)
+
+
+if __name__ == '__main__':
+    unittest.main()
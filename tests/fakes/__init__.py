@@ -0,0 +1,3 @@
+"""
+Local stand-ins of the services the provisioner talks to
+"""
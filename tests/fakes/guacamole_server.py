@@ -0,0 +1,877 @@
+"""
+An in-process fake of the Guacamole REST API for load and scaling tests.
+
+The fake keeps the data source in memory and answers the endpoints used by
+the Guacamole API wrapper and orchestration/guac.py: tokens, connection
+groups, connections, sharing profiles, users, user groups and the JSON
+patch endpoints of permissions, memberships and batch creation.
+"""
+
+import itertools
+import json
+import random
+import re
+import secrets
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# The attributes Guacamole returns for every user
+USER_ATTRIBUTES = [
+    'guac-email-address', 'guac-organizational-role', 'guac-full-name',
+    'expired', 'timezone', 'access-window-start', 'guac-organization',
+    'access-window-end', 'disabled', 'valid-until', 'valid-from'
+]
+
+# The permission sets of a user or user group and the path of each set
+PERMISSION_SETS = {
+    'connectionPermissions': 'connections',
+    'connectionGroupPermissions': 'groups',
+    'sharingProfilePermissions': 'profiles',
+    'activeConnectionPermissions': None,
+    'userPermissions': None,
+    'userGroupPermissions': None
+}
+
+# The directories of connection objects and the type of their objects
+DIRECTORIES = {
+    'connectionGroups': 'groups',
+    'connections': 'connections',
+    'sharingProfiles': 'profiles'
+}
+
+
+class GuacamoleError(Exception):
+    """
+    An error answered in the Guacamole error format.
+    """
+
+    def __init__(self,
+                 status: int,
+                 error_type: str,
+                 message: str):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+        self.message = message
+
+    def to_dict(self) -> dict:
+        """
+        Returns the error response body.
+        """
+        return {
+            'message': self.message,
+            'translatableMessage': {'key': 'APP.TEXT_UNTRANSLATED',
+                                    'variables': {'MESSAGE': self.message}},
+            'statusCode': None,
+            'expected': None,
+            'patches': None,
+            'type': self.error_type
+        }
+
+
+class FakeGuacamole:
+    """
+    A Guacamole server running in a background thread.
+
+    Args:
+        username (str): The administrator username.
+        password (str): The administrator password.
+        data_source (str): The name of the data source.
+        latency (float | tuple): The delay of every request in seconds, or
+            the (minimum, maximum) range of a random delay.
+        error_rate (float): The share of data source requests that fail with
+            an injected error.
+        error_status (int): The HTTP status of injected errors, 500 answers
+            an INTERNAL_ERROR that the orchestration retries.
+        seed (int): The seed of the latency and error injection.
+    """
+
+    def __init__(self,
+                 username: str = 'guacadmin',
+                 password: str = 'guacadmin',
+                 data_source: str = 'postgresql',
+                 latency: float | tuple = 0.0,
+                 error_rate: float = 0.0,
+                 error_status: int = 500,
+                 seed: int = 0):
+        self.username = username
+        self.password = password
+        self.data_source = data_source
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.tokens = set()
+        self.groups = {}
+        self.connections = {}
+        self.profiles = {}
+        self.parameters = {}
+        self.users = {}
+        self.passwords = {}
+        self.user_groups = {}
+        self.members = {}
+        self.permissions = {}
+        self.failures = []
+
+        self.requests = Counter()
+        self.errors = Counter()
+        self.active = 0
+        self.max_active = 0
+
+        self.server = None
+        self.thread = None
+
+    # Server lifecycle
+
+    def start(self) -> 'FakeGuacamole':
+        """
+        Starts answering requests on a free local port.
+        """
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={'poll_interval': 0.05},
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self) -> 'FakeGuacamole':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL of the server, the host of the Guacamole session.
+        """
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def clouds(self) -> dict:
+        """
+        Returns the clouds.yaml entry of the server for guacamole_connection.
+        """
+        return {
+            'host': self.url,
+            'data_source': self.data_source,
+            'username': self.username,
+            'password': self.password
+        }
+
+    # Test helpers
+
+    def fail(self,
+             method: str,
+             pattern: str,
+             count: int = 1,
+             status: int = 500) -> None:
+        """
+        Makes the first requests to each path matching a pattern fail.
+
+        Args:
+            method (str): The HTTP method, e.g. 'DELETE'.
+            pattern (str): A regular expression searched in the path below
+                the data source, e.g. '^/users/'.
+            count (int): The number of requests to fail per path, so that
+                a retried request succeeds after count retries.
+            status (int): The HTTP status of the failures.
+        """
+        with self.lock:
+            self.failures.append((method, re.compile(pattern), count, status, Counter()))
+
+    def stats(self) -> dict:
+        """
+        Returns the request counts and the highest request concurrency.
+        """
+        with self.lock:
+            return {
+                'requests': sum(self.requests.values()),
+                'by_route': dict(self.requests),
+                'errors': sum(self.errors.values()),
+                'max_concurrency': self.max_active
+            }
+
+    # Request handling
+
+    def dispatch(self,
+                 method: str,
+                 path: str,
+                 query: dict,
+                 body: bytes) -> tuple[int, object]:
+        """
+        Answers a request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the URL.
+            query (dict): The query parameters.
+            body (bytes): The request body.
+
+        Returns:
+            tuple[int, object]: The HTTP status and the JSON body, or None
+                for no content.
+        """
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            delay = (self.random.uniform(*self.latency)
+                     if isinstance(self.latency, tuple) else self.latency)
+        try:
+            if delay:
+                time.sleep(delay)
+            return self.route(method, path, query, body)
+        except GuacamoleError as error:
+            with self.lock:
+                self.errors[error.error_type] += 1
+            return error.status, error.to_dict()
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def route(self,
+              method: str,
+              path: str,
+              query: dict,
+              body: bytes) -> tuple[int, object]:
+        """
+        Routes a request to the token or data source endpoints.
+        """
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if parts[:1] != ['api']:
+            raise GuacamoleError(404, 'NOT_FOUND', f"No such path: {path}")
+
+        if parts[1:2] == ['tokens']:
+            self.count(method, '/tokens')
+            return self.token_request(method, parts[2:], body)
+
+        if parts[1:4] != ['session', 'data', self.data_source]:
+            raise GuacamoleError(404, 'NOT_FOUND', f"No such data source: {path}")
+
+        resource = parts[4:]
+        route = '/' + '/'.join(
+            '*' if index % 2 else part
+            for index, part in enumerate(resource)
+        )
+        self.count(method, route)
+
+        with self.lock:
+            token_valid = query.get('token', [None])[0] in self.tokens
+        if not token_valid:
+            raise GuacamoleError(403, 'PERMISSION_DENIED', "Permission Denied.")
+
+        self.inject_error(method, '/' + '/'.join(resource))
+
+        data = json.loads(body) if body else None
+        with self.lock:
+            return self.data_request(method, resource, data)
+
+    def count(self,
+              method: str,
+              route: str) -> None:
+        """
+        Counts a request by its method and route.
+        """
+        with self.lock:
+            self.requests[f"{method} {route}"] += 1
+
+    def inject_error(self,
+                     method: str,
+                     path: str) -> None:
+        """
+        Fails a request with a queued or a random injected error.
+        """
+        with self.lock:
+            for failure_method, pattern, count, failure_status, failed in self.failures:
+                if (failure_method == method and pattern.search(path) and
+                        failed[path] < count):
+                    failed[path] += 1
+                    status = failure_status
+                    break
+            else:
+                if not self.error_rate or self.random.random() >= self.error_rate:
+                    return
+                status = self.error_status
+
+        if status >= 500:
+            raise GuacamoleError(status, 'INTERNAL_ERROR', "Unexpected internal error.")
+        raise GuacamoleError(status, 'BAD_REQUEST', "Injected error.")
+
+    def token_request(self,
+                      method: str,
+                      parts: list,
+                      body: bytes) -> tuple[int, object]:
+        """
+        Issues and revokes authentication tokens.
+        """
+        if method == 'POST' and not parts:
+            form = parse_qs(body.decode('utf-8'))
+            if (form.get('username', [None])[0] != self.username or
+                    form.get('password', [None])[0] != self.password):
+                raise GuacamoleError(403, 'INVALID_CREDENTIALS', "Invalid login.")
+            token = secrets.token_hex(32).upper()
+            with self.lock:
+                self.tokens.add(token)
+            return 200, {
+                'authToken': token,
+                'username': self.username,
+                'dataSource': self.data_source,
+                'availableDataSources': [self.data_source]
+            }
+
+        if method == 'DELETE' and len(parts) == 1:
+            with self.lock:
+                self.tokens.discard(parts[0])
+            return 204, None
+
+        raise GuacamoleError(404, 'NOT_FOUND', "No such token endpoint.")
+
+    def data_request(self,
+                     method: str,
+                     resource: list,
+                     data: object) -> tuple[int, object]:
+        """
+        Answers a data source request, called with the lock held.
+        """
+        name = resource[0] if resource else ''
+
+        if name == 'self' and method == 'GET':
+            return 200, self.users.get(self.username, {'username': self.username,
+                                                       'attributes': {}})
+
+        if name in DIRECTORIES:
+            return self.directory_request(method, name, resource[1:], data)
+
+        if name == 'users':
+            return self.user_request(method, resource[1:], data)
+
+        if name == 'userGroups':
+            return self.user_group_request(method, resource[1:], data)
+
+        raise GuacamoleError(404, 'NOT_FOUND', f"No such resource: {'/'.join(resource)}")
+
+    # Connection groups, connections and sharing profiles
+
+    def store(self,
+              kind: str) -> dict:
+        """
+        Returns the objects of a connection object type.
+        """
+        return getattr(self, kind)
+
+    def directory_request(self,
+                          method: str,
+                          directory: str,
+                          parts: list,
+                          data: object) -> tuple[int, object]:
+        """
+        Answers the connection group, connection and sharing profile endpoints.
+        """
+        kind = DIRECTORIES[directory]
+        objects = self.store(kind)
+
+        if not parts:
+            if method == 'GET':
+                return 200, dict(objects)
+            if method == 'POST':
+                return 200, self.create_object(kind, data)
+            if method == 'PATCH':
+                return 200, self.patch_directory(kind, data)
+            raise GuacamoleError(405, 'BAD_REQUEST', f"{method} isn't supported")
+
+        identifier = parts[0]
+        if identifier not in objects:
+            raise GuacamoleError(404, 'NOT_FOUND', f"No such object: \"{identifier}\"")
+
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, objects[identifier]
+            if method in ('PUT', 'POST'):
+                self.update_object(kind, identifier, data)
+                return 204, None
+            if method == 'DELETE':
+                self.delete_object(kind, identifier)
+                return 204, None
+
+        if method == 'GET' and parts[1:] == ['parameters'] and kind != 'groups':
+            return 200, dict(self.parameters.get(identifier, {}))
+
+        if method == 'GET' and parts[1:] == ['tree'] and kind == 'groups':
+            return 200, self.tree(identifier)
+
+        if method == 'GET' and parts[1:] == ['sharingProfiles'] and kind == 'connections':
+            return 200, {
+                profile_id: profile
+                for profile_id, profile in self.profiles.items()
+                if profile['primaryConnectionIdentifier'] == identifier
+            }
+
+        raise GuacamoleError(404, 'NOT_FOUND', f"No such resource: {'/'.join(parts)}")
+
+    def parent_of(self,
+                  kind: str,
+                  data: dict) -> str:
+        """
+        Returns the parent of a new connection object, checking it exists.
+        """
+        if kind == 'profiles':
+            parent = data.get('primaryConnectionIdentifier')
+            if parent not in self.connections:
+                raise GuacamoleError(400, 'BAD_REQUEST', f"No such connection: \"{parent}\"")
+            return parent
+
+        parent = data.get('parentIdentifier') or 'ROOT'
+        if parent != 'ROOT' and parent not in self.groups:
+            raise GuacamoleError(400, 'BAD_REQUEST', f"No such connection group: \"{parent}\"")
+        return parent
+
+    def check_name(self,
+                   kind: str,
+                   parent: str,
+                   name: str,
+                   identifier: str | None = None) -> None:
+        """
+        Rejects a name that is taken by a sibling, as Guacamole does.
+        """
+        if not name:
+            raise GuacamoleError(400, 'BAD_REQUEST', "The name is required.")
+
+        parent_key = 'primaryConnectionIdentifier' if kind == 'profiles' else 'parentIdentifier'
+        for other_id, other in self.store(kind).items():
+            if other_id != identifier and other[parent_key] == parent and other['name'] == name:
+                raise GuacamoleError(400, 'BAD_REQUEST', f"The object \"{name}\" already exists.")
+
+    def create_object(self,
+                      kind: str,
+                      data: dict) -> dict:
+        """
+        Creates a connection group, connection or sharing profile.
+        """
+        if not isinstance(data, dict):
+            raise GuacamoleError(400, 'BAD_REQUEST', "A JSON object is required.")
+
+        parent = self.parent_of(kind, data)
+        self.check_name(kind, parent, data.get('name'))
+
+        identifier = str(next(self.ids))
+        if kind == 'groups':
+            obj = {
+                'name': data['name'],
+                'identifier': identifier,
+                'parentIdentifier': parent,
+                'type': data.get('type', 'ORGANIZATIONAL'),
+                'activeConnections': 0,
+                'attributes': dict(data.get('attributes') or {})
+            }
+        elif kind == 'connections':
+            obj = {
+                'name': data['name'],
+                'identifier': identifier,
+                'parentIdentifier': parent,
+                'protocol': data.get('protocol'),
+                'attributes': dict(data.get('attributes') or {}),
+                'activeConnections': 0
+            }
+        else:
+            obj = {
+                'name': data['name'],
+                'identifier': identifier,
+                'primaryConnectionIdentifier': parent,
+                'attributes': dict(data.get('attributes') or {})
+            }
+
+        if kind != 'groups':
+            self.parameters[identifier] = dict(data.get('parameters') or {})
+        self.store(kind)[identifier] = obj
+
+        return obj
+
+    def update_object(self,
+                      kind: str,
+                      identifier: str,
+                      data: dict) -> None:
+        """
+        Updates a connection group, connection or sharing profile.
+        """
+        obj = self.store(kind)[identifier]
+        parent = self.parent_of(kind, data)
+        self.check_name(kind, parent, data.get('name'), identifier)
+
+        obj['name'] = data['name']
+        obj['attributes'] = dict(data.get('attributes') or {})
+        if kind == 'profiles':
+            obj['primaryConnectionIdentifier'] = parent
+        else:
+            obj['parentIdentifier'] = parent
+        if kind == 'groups':
+            obj['type'] = data.get('type', obj['type'])
+        if kind == 'connections':
+            obj['protocol'] = data.get('protocol', obj['protocol'])
+        if kind != 'groups' and 'parameters' in data:
+            self.parameters[identifier] = dict(data.get('parameters') or {})
+
+    def delete_object(self,
+                      kind: str,
+                      identifier: str) -> None:
+        """
+        Deletes a connection object and everything below it.
+        """
+        if kind == 'groups':
+            for child_id in [child_id for child_id, child in self.groups.items()
+                             if child['parentIdentifier'] == identifier]:
+                self.delete_object('groups', child_id)
+            for child_id in [child_id for child_id, child in self.connections.items()
+                             if child['parentIdentifier'] == identifier]:
+                self.delete_object('connections', child_id)
+        elif kind == 'connections':
+            for child_id in [child_id for child_id, child in self.profiles.items()
+                             if child['primaryConnectionIdentifier'] == identifier]:
+                self.delete_object('profiles', child_id)
+
+        del self.store(kind)[identifier]
+        self.parameters.pop(identifier, None)
+        for permissions in self.permissions.values():
+            permissions[kind].pop(identifier, None)
+
+    def patch_directory(self,
+                        kind: str,
+                        patches: list) -> dict:
+        """
+        Applies a batch of JSON patches to a directory.
+
+        As in Guacamole, the batch is atomic: if any patch fails, the
+        objects created by the batch are removed again.
+        """
+        if not isinstance(patches, list):
+            raise GuacamoleError(400, 'BAD_REQUEST', "A JSON patch list is required.")
+
+        created = []
+        results = []
+        try:
+            for patch in patches:
+                if patch.get('op') == 'add' and patch.get('path') == '/':
+                    obj = self.create_object(kind,
+                                             patch.get('value'))
+                    created.append(obj['identifier'])
+                    results.append({'op': 'add', 'path': '/', 'identifier': obj['identifier']})
+                elif patch.get('op') == 'remove' and str(patch.get('path', '')).startswith('/'):
+                    identifier = patch['path'][1:]
+                    if identifier not in self.store(kind):
+                        raise GuacamoleError(400, 'BAD_REQUEST',
+                                             f"No such object: \"{identifier}\"")
+                    self.delete_object(kind, identifier)
+                    results.append({'op': 'remove',
+                                    'path': patch['path'],
+                                    'identifier': identifier})
+                else:
+                    raise GuacamoleError(400, 'BAD_REQUEST', f"Unsupported patch: {patch}")
+        except GuacamoleError:
+            for identifier in reversed(created):
+                if identifier in self.store(kind):
+                    self.delete_object(kind, identifier)
+            raise
+
+        return {'patches': results}
+
+    def tree(self,
+             identifier: str) -> dict:
+        """
+        Returns a connection group with its descendants, as the tree endpoint.
+        """
+        group = dict(self.groups[identifier])
+        groups = [
+            self.tree(child_id)
+            for child_id, child in self.groups.items()
+            if child['parentIdentifier'] == identifier
+        ]
+        connections = []
+        for conn_id, conn in self.connections.items():
+            if conn['parentIdentifier'] != identifier:
+                continue
+            conn = dict(conn)
+            profiles = [
+                profile
+                for profile in self.profiles.values()
+                if profile['primaryConnectionIdentifier'] == conn_id
+            ]
+            if profiles:
+                conn['sharingProfiles'] = profiles
+            connections.append(conn)
+
+        if groups:
+            group['childConnectionGroups'] = groups
+        if connections:
+            group['childConnections'] = connections
+
+        return group
+
+    # Users and user groups
+
+    def user_request(self,
+                     method: str,
+                     parts: list,
+                     data: object) -> tuple[int, object]:
+        """
+        Answers the user endpoints.
+        """
+        if not parts:
+            if method == 'GET':
+                return 200, dict(self.users)
+            if method == 'POST':
+                return 200, self.create_user(data)
+            raise GuacamoleError(405, 'BAD_REQUEST', f"{method} isn't supported")
+
+        username = parts[0]
+        if username not in self.users:
+            raise GuacamoleError(404, 'NOT_FOUND', f"No such user: \"{username}\"")
+
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, self.users[username]
+            if method == 'PUT':
+                self.users[username]['attributes'].update(
+                    (data or {}).get('attributes') or {}
+                )
+                return 204, None
+            if method == 'DELETE':
+                del self.users[username]
+                self.passwords.pop(username, None)
+                self.permissions.pop(('user', username), None)
+                for members in self.members.values():
+                    members.discard(username)
+                return 204, None
+
+        if parts[1:] == ['permissions']:
+            return self.permission_request(method, ('user', username), data)
+
+        if parts[1:] == ['userGroups'] and method == 'PATCH':
+            for patch in data or []:
+                members = self.members.setdefault(patch.get('value'), set())
+                if patch.get('op') == 'add':
+                    members.add(username)
+                else:
+                    members.discard(username)
+            return 204, None
+
+        raise GuacamoleError(404, 'NOT_FOUND', f"No such resource: {'/'.join(parts)}")
+
+    def create_user(self,
+                    data: dict) -> dict:
+        """
+        Creates a user.
+        """
+        username = (data or {}).get('username')
+        if not username:
+            raise GuacamoleError(400, 'BAD_REQUEST', "The username is required.")
+        if username in self.users:
+            raise GuacamoleError(400, 'BAD_REQUEST', f"User \"{username}\" already exists.")
+
+        attributes = dict.fromkeys(USER_ATTRIBUTES)
+        attributes.update({
+            key: value or None
+            for key, value in (data.get('attributes') or {}).items()
+        })
+        user = {
+            'username': username,
+            'attributes': attributes,
+            'lastActive': None
+        }
+        self.users[username] = user
+        self.passwords[username] = data.get('password')
+        self.permissions[('user', username)] = self.empty_permissions()
+
+        return user
+
+    def user_group_request(self,
+                           method: str,
+                           parts: list,
+                           data: object) -> tuple[int, object]:
+        """
+        Answers the user group endpoints.
+        """
+        if not parts:
+            if method == 'GET':
+                return 200, dict(self.user_groups)
+            if method == 'POST':
+                identifier = (data or {}).get('identifier')
+                if not identifier or identifier in self.user_groups:
+                    raise GuacamoleError(400, 'BAD_REQUEST',
+                                         f"The group \"{identifier}\" already exists.")
+                self.user_groups[identifier] = {
+                    'identifier': identifier,
+                    'attributes': dict(data.get('attributes') or {})
+                }
+                self.members.setdefault(identifier, set())
+                self.permissions[('group', identifier)] = self.empty_permissions()
+                return 200, self.user_groups[identifier]
+            raise GuacamoleError(405, 'BAD_REQUEST', f"{method} isn't supported")
+
+        identifier = parts[0]
+        if identifier not in self.user_groups:
+            raise GuacamoleError(404, 'NOT_FOUND', f"No such user group: \"{identifier}\"")
+
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, self.user_groups[identifier]
+            if method == 'PUT':
+                self.user_groups[identifier]['attributes'] = dict(
+                    (data or {}).get('attributes') or {}
+                )
+                return 204, None
+            if method == 'DELETE':
+                del self.user_groups[identifier]
+                self.members.pop(identifier, None)
+                self.permissions.pop(('group', identifier), None)
+                return 204, None
+
+        if parts[1:] == ['permissions']:
+            return self.permission_request(method, ('group', identifier), data)
+
+        if parts[1:] == ['memberUsers']:
+            members = self.members.setdefault(identifier, set())
+            if method == 'GET':
+                return 200, sorted(members)
+            if method == 'PATCH':
+                for patch in data or []:
+                    if patch.get('op') == 'add':
+                        members.add(patch.get('value'))
+                    else:
+                        members.discard(patch.get('value'))
+                return 204, None
+
+        raise GuacamoleError(404, 'NOT_FOUND', f"No such resource: {'/'.join(parts)}")
+
+    # Permissions
+
+    @staticmethod
+    def empty_permissions() -> dict:
+        """
+        Returns the permissions of a new user or user group.
+        """
+        return {
+            'connections': {},
+            'groups': {},
+            'profiles': {},
+            'active': {},
+            'users': {},
+            'user_groups': {},
+            'system': set()
+        }
+
+    def permission_request(self,
+                           method: str,
+                           owner: tuple,
+                           data: object) -> tuple[int, object]:
+        """
+        Reads or patches the permissions of a user or user group.
+        """
+        permissions = self.permissions[owner]
+        stores = {
+            'connectionPermissions': permissions['connections'],
+            'connectionGroupPermissions': permissions['groups'],
+            'sharingProfilePermissions': permissions['profiles'],
+            'activeConnectionPermissions': permissions['active'],
+            'userPermissions': permissions['users'],
+            'userGroupPermissions': permissions['user_groups']
+        }
+
+        if method == 'GET':
+            return 200, {
+                **{
+                    name: {
+                        identifier: sorted(values)
+                        for identifier, values in store.items()
+                    }
+                    for name, store in stores.items()
+                },
+                'systemPermissions': sorted(permissions['system'])
+            }
+
+        if method != 'PATCH' or not isinstance(data, list):
+            raise GuacamoleError(400, 'BAD_REQUEST', "A JSON patch list is required.")
+
+        for patch in data:
+            path = str(patch.get('path', ''))
+            value = patch.get('value')
+            add = patch.get('op') == 'add'
+            if path == '/systemPermissions':
+                if add:
+                    permissions['system'].add(value)
+                else:
+                    permissions['system'].discard(value)
+                continue
+
+            set_name, _, identifier = path.strip('/').partition('/')
+            if set_name not in stores or not identifier:
+                raise GuacamoleError(400, 'BAD_REQUEST', f"Unsupported permission path: {path}")
+            kind = PERMISSION_SETS[set_name]
+            if add and kind and identifier not in self.store(kind):
+                raise GuacamoleError(400, 'BAD_REQUEST', f"No such object: \"{identifier}\"")
+            values = stores[set_name].setdefault(identifier, set())
+            if add:
+                values.add(value)
+            else:
+                values.discard(value)
+                if not values:
+                    del stores[set_name][identifier]
+
+        return 204, None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Passes the requests to the FakeGuacamole of the server.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Keep idle connections open like Tomcat. The API wrapper sets a 0.5 s
+    # default socket timeout, which the accepted sockets would inherit.
+    timeout = 20
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately, don't wait on delayed ACKs
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def handle_request(self):
+        """
+        Reads the request, dispatches it and writes the JSON response.
+        """
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        url = urlsplit(self.path)
+
+        status, payload = self.server.fake.dispatch(self.command,
+                                                    url.path,
+                                                    parse_qs(url.query),
+                                                    body)
+
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        if data:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
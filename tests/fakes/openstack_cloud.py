@@ -0,0 +1,577 @@
+"""
+An in-memory fake of the OpenStack connection for scaling tests.
+
+The fake answers the openstacksdk calls made by orchestration/heat.py,
+orchestration/swift.py and utils/manage_ids.py: stacks and their resources,
+servers, networks, subnets, and object store containers and objects.
+
+Stacks render the networks, subnets and servers of their Heat template and
+build in the background, like Heat does. A stack is complete once its
+creation latency has passed and its servers get an address after a
+further addressing delay, so a run only waits on the stacks it waits for.
+"""
+
+import ipaddress
+import itertools
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Iterator
+import yaml
+from openstack import exceptions
+
+# The first address handed out to servers
+FIRST_ADDRESS = ipaddress.ip_address('10.0.0.10')
+
+# The read ACLs of the container access levels
+CONTAINER_ACLS = {
+    'public': '.r:*,.rlistings',
+    'private': ''
+}
+
+
+class Resource(dict):
+    """
+    A resource whose fields can be read as items or attributes, like the
+    openstacksdk resources.
+    """
+
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError as error:
+            raise AttributeError(name) from error
+
+
+@lru_cache(maxsize=None)
+def load_template(template_file: str) -> dict:
+    """
+    Loads a Heat template once per path.
+
+    Args:
+        template_file (str): The path of the Heat template.
+
+    Returns:
+        dict: The template.
+    """
+    with open(template_file, 'r', encoding='utf-8') as file:
+        return yaml.safe_load(file) or {}
+
+
+def render(value: object,
+           stack_name: str,
+           parameters: dict,
+           index: int | None = None) -> object:
+    """
+    Resolves the get_param and list_join functions of a template value.
+
+    Args:
+        value (object): The template value.
+        stack_name (str): The name of the stack, the OS::stack_name parameter.
+        parameters (dict): The stack parameters.
+        index (int | None): The index of a resource group member, which
+            replaces %index%.
+
+    Returns:
+        object: The resolved value, None for other functions.
+    """
+    if isinstance(value, dict):
+        if 'get_param' in value:
+            if value['get_param'] == 'OS::stack_name':
+                return stack_name
+            return parameters.get(value['get_param'])
+        if 'list_join' in value:
+            separator, items = value['list_join']
+            return separator.join(str(render(item, stack_name, parameters, index))
+                                  for item in items)
+        return None
+    if isinstance(value, str) and index is not None:
+        return value.replace('%index%', str(index))
+    return value
+
+
+class FakeOpenStack:
+    """
+    An OpenStack connection keeping the cloud in memory.
+
+    Args:
+        request_latency (float | tuple): The delay of every API call in
+            seconds, or the (minimum, maximum) range of a random delay.
+        stack_latency (float | tuple): The time a stack takes to be created,
+            updated or deleted.
+        address_delay (float | tuple): The time servers take to get an
+            address once their stack is complete.
+        project_id (str): The ID of the current project.
+        seed (int): The seed of the random latencies and resource IDs.
+    """
+
+    def __init__(self,
+                 request_latency: float | tuple = 0.0,
+                 stack_latency: float | tuple = 0.0,
+                 address_delay: float | tuple = 0.0,
+                 project_id: str = 'db413974768f4743a1689072f27da5d2',
+                 seed: int = 0):
+        self.request_latency = request_latency
+        self.stack_latency = stack_latency
+        self.address_delay = address_delay
+        self.current_project_id = project_id
+        self.random = random.Random(seed)
+
+        self.addresses = itertools.count()
+        self.stacks = {}
+        self.servers = {}
+        self.networks = {}
+        self.subnets = {}
+        self.containers = {}
+        self.objects = {}
+        self.requests = Counter()
+        self.waits = Counter()
+
+        self.orchestration = SimpleNamespace(stacks=self.orchestration_stacks,
+                                             find_stack=self.find_stack,
+                                             resources=self.stack_resources)
+        self.network = SimpleNamespace(find_network=self.find_network,
+                                       find_subnet=self.find_subnet)
+        self.object_store = SimpleNamespace(create_container=self.create_container,
+                                            delete_container=self.delete_container)
+
+    # Test helpers
+
+    def stats(self) -> dict:
+        """
+        Returns the number of API calls, in total and by call, and the
+        number of waits by stack name.
+        """
+        return {
+            'requests': sum(self.requests.values()),
+            'by_call': dict(self.requests),
+            'waits': dict(self.waits)
+        }
+
+    def delay(self,
+              latency: float | tuple) -> float:
+        """
+        Returns a delay drawn from a latency.
+        """
+        if isinstance(latency, tuple):
+            return self.random.uniform(*latency)
+        return latency
+
+    def call(self,
+             name: str) -> None:
+        """
+        Counts an API call and waits for its latency.
+        """
+        self.requests[name] += 1
+        latency = self.delay(self.request_latency)
+        if latency:
+            time.sleep(latency)
+
+    def wait(self,
+             stack: Resource) -> None:
+        """
+        Waits until a stack is no longer in progress.
+        """
+        self.waits[stack['name']] += 1
+        remaining = stack['ready_at'] - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Completes the stacks whose latency has passed and addresses their
+        servers.
+        """
+        now = time.monotonic()
+        for stack in list(self.stacks.values()):
+            if not stack['stack_status'].endswith('_IN_PROGRESS') or now < stack['ready_at']:
+                continue
+            if stack['stack_status'] == 'DELETE_IN_PROGRESS':
+                self.remove_resources(stack)
+                del self.stacks[stack['id']]
+                continue
+            stack['stack_status'] = stack['stack_status'].replace('_IN_PROGRESS', '_COMPLETE')
+            for server_id in stack['servers']:
+                self.servers[server_id]['status'] = 'ACTIVE'
+
+        for server in self.servers.values():
+            if not server['private_v4'] and now >= server['addressed_at']:
+                address = FIRST_ADDRESS + next(self.addresses)
+                server['private_v4'] = str(address)
+                server['addresses'] = {
+                    'network': [{'addr': str(address), 'version': 4}]
+                }
+
+    def new_id(self) -> str:
+        """
+        Returns a reproducible resource ID.
+        """
+        return str(uuid.UUID(int=self.random.getrandbits(128)))
+
+    # Heat
+
+    def get_stack(self,
+                  name_or_id: str) -> Resource | None:
+        """
+        Returns the stack with a name or ID.
+        """
+        self.refresh()
+        if name_or_id in self.stacks:
+            return self.stacks[name_or_id]
+        return next((stack for stack in self.stacks.values()
+                     if stack['name'] == name_or_id), None)
+
+    def build_resources(self,
+                        stack: Resource,
+                        template_file: str) -> None:
+        """
+        Creates the networks, subnets and servers of a stack's template.
+        """
+        template = load_template(template_file)
+        parameters = {
+            name: definition.get('default')
+            for name, definition in (template.get('parameters') or {}).items()
+        }
+        parameters.update(stack['parameters'])
+        addressed_at = stack['ready_at'] + self.delay(self.address_delay)
+
+        def add_server(name: str) -> str:
+            server = Resource(id=self.new_id(),
+                              name=name,
+                              status='BUILD',
+                              public_v4='',
+                              private_v4='',
+                              addresses={},
+                              addressed_at=addressed_at)
+            self.servers[server['id']] = server
+            stack['servers'].append(server['id'])
+            return server['id']
+
+        for logical_id, definition in (template.get('resources') or {}).items():
+            resource_type = definition.get('type')
+            properties = definition.get('properties') or {}
+            name = render(properties.get('name'), stack['name'], parameters)
+            physical_id = self.new_id()
+
+            if resource_type == 'OS::Nova::Server':
+                physical_id = add_server(name or f"{stack['name']}.{logical_id}")
+            elif resource_type == 'OS::Heat::ResourceGroup':
+                member = properties.get('resource_def') or {}
+                count = int(render(properties.get('count', 1), stack['name'], parameters))
+                if member.get('type') == 'OS::Nova::Server':
+                    for index in range(count):
+                        member_name = render((member.get('properties') or {}).get('name'),
+                                             stack['name'],
+                                             parameters,
+                                             index)
+                        add_server(member_name or f"{stack['name']}.{logical_id}.{index}")
+            elif resource_type in ['OS::Neutron::Net', 'OS::Neutron::Subnet']:
+                directory = self.networks if resource_type == 'OS::Neutron::Net' else self.subnets
+                directory[physical_id] = Resource(id=physical_id,
+                                                  name=name or f"{stack['name']}-{logical_id}")
+
+            stack['resources'].append(Resource(logical_resource_id=logical_id,
+                                               physical_resource_id=physical_id,
+                                               resource_type=resource_type,
+                                               resource_status='CREATE_COMPLETE'))
+
+    def remove_resources(self,
+                         stack: Resource) -> None:
+        """
+        Deletes the servers, networks and subnets of a stack.
+        """
+        for server_id in stack['servers']:
+            self.servers.pop(server_id, None)
+        for resource in stack['resources']:
+            self.networks.pop(resource['physical_resource_id'], None)
+            self.subnets.pop(resource['physical_resource_id'], None)
+        stack['servers'] = []
+        stack['resources'] = []
+
+    def search_stacks(self,
+                      name_or_id: str | None = None,
+                      filters: dict | None = None) -> list:
+        """
+        Lists the stacks, or those with a name or ID.
+        """
+        self.call('search_stacks')
+        self.refresh()
+        return [
+            stack for stack in self.stacks.values()
+            if name_or_id in [None, stack['id'], stack['name']]
+        ]
+
+    def create_stack(self,
+                     name: str,
+                     template_file: str | None = None,
+                     rollback: bool = True,
+                     wait: bool = False,
+                     timeout: int = 3600,
+                     **parameters) -> Resource:
+        """
+        Starts creating a stack, and waits for it if asked to.
+        """
+        self.call('create_stack')
+        if self.get_stack(name):
+            raise exceptions.ConflictException(
+                message=f"The Stack ({name}) already exists.")
+
+        stack = Resource(id=self.new_id(),
+                         name=name,
+                         stack_status='CREATE_IN_PROGRESS',
+                         project_id=self.current_project_id,
+                         parameters=parameters,
+                         ready_at=time.monotonic() + self.delay(self.stack_latency),
+                         resources=[],
+                         servers=[])
+        self.stacks[stack['id']] = stack
+        self.build_resources(stack, template_file)
+        if wait:
+            self.wait(stack)
+        return stack
+
+    def update_stack(self,
+                     name_or_id: str,
+                     template_file: str | None = None,
+                     rollback: bool = True,
+                     wait: bool = False,
+                     timeout: int = 3600,
+                     **parameters) -> Resource:
+        """
+        Starts updating a stack, which replaces its resources.
+        """
+        self.call('update_stack')
+        stack = self.get_stack(name_or_id)
+        if not stack:
+            raise exceptions.NotFoundException(
+                message=f"The Stack ({name_or_id}) could not be found.")
+
+        self.remove_resources(stack)
+        stack['parameters'] = parameters
+        stack['stack_status'] = 'UPDATE_IN_PROGRESS'
+        stack['ready_at'] = time.monotonic() + self.delay(self.stack_latency)
+        self.build_resources(stack, template_file)
+        if wait:
+            self.wait(stack)
+        return stack
+
+    def delete_stack(self,
+                     name_or_id: str,
+                     wait: bool = False) -> bool:
+        """
+        Starts deleting a stack, and waits for it if asked to.
+        """
+        self.call('delete_stack')
+        stack = self.get_stack(name_or_id)
+        if not stack:
+            return False
+
+        stack['stack_status'] = 'DELETE_IN_PROGRESS'
+        stack['ready_at'] = time.monotonic() + self.delay(self.stack_latency)
+        if wait:
+            self.wait(stack)
+        return True
+
+    def orchestration_stacks(self,
+                             **query) -> Iterator[Resource]:
+        """
+        Yields the stacks of the project.
+        """
+        self.call('orchestration.stacks')
+        self.refresh()
+        yield from list(self.stacks.values())
+
+    def find_stack(self,
+                   name_or_id: str,
+                   ignore_missing: bool = True) -> Resource | None:
+        """
+        Returns the stack with a name or ID.
+        """
+        self.call('orchestration.find_stack')
+        stack = self.get_stack(name_or_id)
+        if not stack and not ignore_missing:
+            raise exceptions.NotFoundException(
+                message=f"No Stack found for {name_or_id}")
+        return stack
+
+    def stack_resources(self,
+                        stack: str | Resource,
+                        **query) -> Iterator[Resource]:
+        """
+        Yields the resources of a stack.
+        """
+        self.call('orchestration.resources')
+        name_or_id = stack['id'] if isinstance(stack, Resource) else stack
+        found = self.get_stack(name_or_id)
+        if not found:
+            raise exceptions.NotFoundException(
+                message=f"The Stack ({name_or_id}) could not be found.")
+        yield from list(found['resources'])
+
+    # Nova and Neutron
+
+    def list_servers(self,
+                     detailed: bool = False,
+                     all_projects: bool = False,
+                     bare: bool = False,
+                     filters: dict | None = None) -> list:
+        """
+        Lists the servers, which have no address until they are addressed.
+        """
+        self.call('list_servers')
+        self.refresh()
+        return [Resource(server) for server in self.servers.values()]
+
+    def find_network(self,
+                     name_or_id: str,
+                     ignore_missing: bool = True) -> Resource | None:
+        """
+        Returns the network with a name or ID.
+        """
+        self.call('network.find_network')
+        return self.networks.get(name_or_id) or next(
+            (network for network in self.networks.values() if network['name'] == name_or_id),
+            None
+        )
+
+    def find_subnet(self,
+                    name_or_id: str,
+                    ignore_missing: bool = True) -> Resource | None:
+        """
+        Returns the subnet with a name or ID.
+        """
+        self.call('network.find_subnet')
+        return self.subnets.get(name_or_id) or next(
+            (subnet for subnet in self.subnets.values() if subnet['name'] == name_or_id),
+            None
+        )
+
+    # Swift
+
+    def get_objects(self,
+                    container: str | Resource) -> dict:
+        """
+        Returns the objects of a container, given by name or resource.
+        """
+        name = container['name'] if isinstance(container, Resource) else container
+        if name not in self.containers:
+            raise exceptions.NotFoundException(
+                message=f"Container {name} not found")
+        return self.objects[name]
+
+    def search_containers(self,
+                          name: str | None = None,
+                          filters: dict | None = None) -> list:
+        """
+        Lists the containers, or the container with a name.
+        """
+        self.call('search_containers')
+        return [
+            container for container in self.containers.values()
+            if name in [None, container['name']]
+        ]
+
+    def create_container(self,
+                         name: str,
+                         **attrs) -> Resource:
+        """
+        Creates a container, or returns the existing one.
+        """
+        self.call('object_store.create_container')
+        if name not in self.containers:
+            self.containers[name] = Resource(name=name, read_ACL='')
+            self.objects[name] = {}
+        return self.containers[name]
+
+    def delete_container(self,
+                         container: str | Resource,
+                         ignore_missing: bool = True) -> None:
+        """
+        Deletes an empty container.
+        """
+        self.call('object_store.delete_container')
+        try:
+            objects = self.get_objects(container)
+        except exceptions.NotFoundException:
+            if ignore_missing:
+                return
+            raise
+        if objects:
+            raise exceptions.ConflictException(
+                message=f"Container {container} is not empty")
+        name = container['name'] if isinstance(container, Resource) else container
+        del self.containers[name]
+        del self.objects[name]
+
+    def set_container_access(self,
+                             name: str | Resource,
+                             access: str,
+                             refresh: bool = False) -> Resource:
+        """
+        Sets the read ACL of a container.
+        """
+        self.call('set_container_access')
+        if access not in CONTAINER_ACLS:
+            raise exceptions.SDKException(
+                f"Invalid container access specified: {access}")
+        self.get_objects(name)
+        container = self.containers[name['name'] if isinstance(name, Resource) else name]
+        container['read_ACL'] = CONTAINER_ACLS[access]
+        return container
+
+    def create_directory_marker_object(self,
+                                       container: str,
+                                       name: str,
+                                       **headers) -> Resource:
+        """
+        Creates an empty directory marker object.
+        """
+        self.call('create_directory_marker_object')
+        obj = Resource(name=name, bytes=0, content_type='application/directory')
+        self.get_objects(container)[name] = obj
+        return obj
+
+    def create_object(self,
+                      container: str,
+                      name: str,
+                      filename: str | None = None,
+                      data: str | bytes | None = None,
+                      **headers) -> Resource:
+        """
+        Uploads an object from a file or data.
+        """
+        self.call('create_object')
+        objects = self.get_objects(container)
+        size = os.path.getsize(filename) if filename else len(data or b'')
+        obj = Resource(name=name, bytes=size, content_type='application/octet-stream')
+        objects[name] = obj
+        return obj
+
+    def list_objects(self,
+                     container: str,
+                     full_listing: bool = True,
+                     prefix: str | None = None) -> list:
+        """
+        Lists the objects of a container by name.
+        """
+        self.call('list_objects')
+        objects = self.get_objects(container)
+        return [
+            objects[name] for name in sorted(objects)
+            if not prefix or name.startswith(prefix)
+        ]
+
+    def delete_object(self,
+                      container: str,
+                      name: str,
+                      meta: dict | None = None) -> bool:
+        """
+        Deletes an object.
+        """
+        self.call('delete_object')
+        return self.get_objects(container).pop(name, None) is not None
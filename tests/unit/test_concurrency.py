@@ -0,0 +1,90 @@
+"""
+Tests for the concurrency helpers.
+"""
+
+import threading
+import unittest
+from unittest.mock import patch
+from src.utils.concurrency import run_parallel, TransientError
+
+
+@patch('src.utils.concurrency.time.sleep')
+class TestRunParallel(unittest.TestCase):
+    """
+    Test the run_parallel function.
+    """
+
+    def test_results_in_order(self, mock_sleep):
+        """
+        Test that results keep the order of the items with several workers.
+        """
+        results = run_parallel(lambda item: item * 2, list(range(20)), 4)
+
+        self.assertEqual(results, [item * 2 for item in range(20)])
+        mock_sleep.assert_not_called()
+
+    def test_bounded_concurrency(self, mock_sleep):
+        """
+        Test that no more than the number of workers run at once.
+        """
+        lock = threading.Lock()
+        active = [0, 0]
+        barrier = threading.Barrier(3, timeout=5)
+
+        def work(item):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            barrier.wait()
+            with lock:
+                active[0] -= 1
+            return item
+
+        run_parallel(work, list(range(9)), 3)
+
+        self.assertEqual(active[1], 3)
+
+    def test_retry_transient(self, mock_sleep):
+        """
+        Test that transient errors are retried with backoff.
+        """
+        calls = []
+
+        def flaky(item):
+            calls.append(item)
+            if len(calls) < 3:
+                raise TransientError('Deadlock')
+            return True
+
+        self.assertEqual(run_parallel(flaky, ['a'], retries=2), [True])
+        self.assertEqual(len(calls), 3)
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [1.0, 2.0])
+
+    def test_retries_exhausted(self, mock_sleep):
+        """
+        Test that an item still failing after its retries returns the error.
+        """
+        def failing(item):
+            if item == 'b':
+                raise TransientError('Deadlock')
+            return True
+
+        results = run_parallel(failing, ['a', 'b', 'c'], 2, retries=1)
+
+        self.assertTrue(results[0])
+        self.assertIsInstance(results[1], TransientError)
+        self.assertTrue(results[2])
+
+    def test_no_retries(self, mock_sleep):
+        """
+        Test that transient errors are raised when retries are disabled.
+        """
+        def failing(item):
+            raise TransientError('Deadlock')
+
+        with self.assertRaises(TransientError):
+            run_parallel(failing, ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
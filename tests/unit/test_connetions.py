@@ -2,9 +2,26 @@
 
 """
 
+import json
+import os
+import re
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch, MagicMock
-from src.utils.connections import openstack_connection, guacamole_connection
+import guacamole.main
+import requests
+from guacamole import session
+from keystoneauth1 import session as ks_session
+from keystoneauth1.identity import v3
+from src.utils.connections import (openstack_connection, guacamole_connection,
+                                   PooledTransport, PooledSession, CachedSession,
+                                   load_openstack_cache, save_openstack_cache,
+                                   guacamole_items)
+from tests.fakes.guacamole_server import FakeGuacamole
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'src')
 
 class TestConnections(unittest.TestCase):
     """
@@ -96,7 +113,7 @@ class TestConnections(unittest.TestCase):
         mock_success_msg.assert_not_called()
         mock_info_msg.assert_not_called()
 
-    @patch('src.utils.connections.session')
+    @patch('src.utils.connections.PooledSession')
     @patch('src.utils.connections.general_msg')
     @patch('src.utils.connections.info_msg')
     @patch('src.utils.connections.success_msg')
@@ -140,7 +157,7 @@ class TestConnections(unittest.TestCase):
         mock_error_msg.assert_not_called()
         mock_info_msg.assert_called_once()
 
-    @patch('src.utils.connections.session')
+    @patch('src.utils.connections.PooledSession')
     @patch('src.utils.connections.general_msg')
     @patch('src.utils.connections.info_msg')
     @patch('src.utils.connections.success_msg')
@@ -184,5 +201,430 @@ class TestConnections(unittest.TestCase):
         mock_success_msg.assert_not_called()
         mock_info_msg.assert_not_called()
 
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """
+    Answers every GET with an empty JSON object over HTTP/1.1 keep-alive.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPooledTransport(unittest.TestCase):
+    """
+    Tests the keep-alive connection pool used for Guacamole.
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reuse(self):
+        """
+        Test that sequential requests reuse a single connection.
+        """
+        transport = PooledTransport(4)
+
+        for _ in range(10):
+            self.assertEqual(transport.get(self.url, timeout=5).json(), {})
+
+        stats = transport.stats()
+        self.assertEqual(stats['requests'], 10)
+        self.assertEqual(stats['connections'], 1)
+        self.assertAlmostEqual(stats['reuse_ratio'], 0.9)
+
+    def test_requests_attributes(self):
+        """
+        Test that other requests attributes are still available to the wrapper.
+        """
+        transport = PooledTransport()
+
+        self.assertTrue(issubclass(transport.exceptions.Timeout, Exception))
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+    """
+    Answers with a chunked user listing, or an error without a token.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if 'token=valid' not in self.path:
+            data = b'{"message": "Permission Denied.", "type": "PERMISSION_DENIED"}'
+            self.send_response(403)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        users = json.dumps({
+            f"user{i}": {'username': f"user{i}"}
+            for i in range(1000)
+        }).encode('utf-8')
+        for i in range(0, len(users), 1000):
+            chunk = users[i:i + 1000]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGuacamoleItems(unittest.TestCase):
+    """
+    Tests streaming Guacamole directory listings.
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ListingHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.gconn = MagicMock(session_url=f"http://127.0.0.1:{self.server.server_address[1]}",
+                               params={'token': 'valid'},
+                               transport=PooledTransport())
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_streamed_listing(self):
+        """
+        Test that a pooled connection streams the listing.
+        """
+        items = guacamole_items(self.gconn, '/users', self.gconn.list_users)
+
+        self.assertEqual(next(items), ('user0', {'username': 'user0'}))
+        self.assertEqual(len(list(items)), 999)
+        self.gconn.list_users.assert_not_called()
+
+    def test_error_response(self):
+        """
+        Test that an error response is returned instead of an iterator.
+        """
+        self.gconn.params = {'token': 'expired'}
+
+        self.assertEqual(guacamole_items(self.gconn, '/users', self.gconn.list_users),
+                         {'message': 'Permission Denied.', 'type': 'PERMISSION_DENIED'})
+
+    def test_session_listing(self):
+        """
+        Test that the session listing is used without a connection pool.
+        """
+        gconn = MagicMock(transport=None)
+        gconn.list_users.return_value = {'a': {'username': 'a'}}
+
+        self.assertEqual(list(guacamole_items(gconn, '/users', gconn.list_users)),
+                         [('a', {'username': 'a'})])
+
+
+class TokenHandler(BaseHTTPRequestHandler):
+    """
+    Issues Guacamole tokens and only answers requests with a live token.
+    """
+    protocol_version = 'HTTP/1.1'
+    tokens = set()
+    issued = 0
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        TokenHandler.issued += 1
+        token = f"token-{TokenHandler.issued}"
+        TokenHandler.tokens.add(token)
+        self.send_json(200, {'authToken': token})
+
+    def do_GET(self):
+        if self.path.split('token=')[-1] in TokenHandler.tokens:
+            self.send_json(200, {})
+        else:
+            self.send_json(403, {'type': 'PERMISSION_DENIED'})
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTokenCache(unittest.TestCase):
+    """
+    Tests reusing Guacamole tokens across connections.
+    """
+
+    def setUp(self):
+        TokenHandler.tokens = set()
+        TokenHandler.issued = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), TokenHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.clouds = {
+            'host': f"http://127.0.0.1:{self.server.server_address[1]}",
+            'data_source': 'mysql',
+            'username': 'guacadmin',
+            'password': 'guacadmin'
+        }
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, 'cache', 'tokens.json')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    @patch('src.utils.connections.general_msg')
+    @patch('src.utils.connections.info_msg')
+    @patch('src.utils.connections.success_msg')
+    def connect(self, *mocks, token_cache=None):
+        return guacamole_connection('guacamole',
+                                    self.clouds,
+                                    False,
+                                    1,
+                                    self.cache_path if token_cache is None else token_cache)
+
+    def test_pooled_session(self):
+        """
+        Test that each session sends its calls through its own pool and
+        leaves the wrapper module alone.
+        """
+        first = self.connect(token_cache=False)
+        second = self.connect(token_cache=False)
+
+        self.assertIsInstance(first, PooledSession)
+        self.assertIs(guacamole.main.requests, requests)
+        self.assertEqual(first.list_users(), {})
+        self.assertIsNot(first.transport, second.transport)
+        self.assertEqual(first.transport.stats()['requests'], 2)
+        self.assertEqual(second.transport.stats()['requests'], 1)
+
+    def test_token_reused(self):
+        """
+        Test that a second connection reuses the cached token.
+        """
+        first = self.connect()
+        second = self.connect()
+
+        self.assertIsInstance(second, CachedSession)
+        self.assertTrue(second.token_cached)
+        self.assertEqual(first.token, second.token)
+        self.assertEqual(TokenHandler.issued, 1)
+        self.assertEqual(os.stat(self.cache_path).st_mode & 0o777, 0o600)
+
+    def test_readable_cache_ignored(self):
+        """
+        Test that a cache readable by other users is not trusted.
+        """
+        self.connect()
+        os.chmod(self.cache_path, 0o644)
+        gconn = self.connect()
+
+        self.assertFalse(gconn.token_cached)
+        self.assertEqual(TokenHandler.issued, 2)
+        self.assertEqual(os.stat(self.cache_path).st_mode & 0o777, 0o600)
+
+    def test_denied_token_refreshed(self):
+        """
+        Test that a cached token denied mid-run is replaced and retried once.
+        """
+        self.connect()
+        gconn = self.connect()
+        TokenHandler.tokens.clear()
+
+        response = gconn.transport.get(f"{gconn.session_url}/self",
+                                       params=gconn.params,
+                                       timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(gconn.token, 'token-2')
+        self.assertEqual(gconn.params['token'], 'token-2')
+        self.assertIsNone(gconn.transport.refresh)
+
+
+class TestPooledSession(unittest.TestCase):
+    """
+    Tests that the pooled session sends every call through its own transport.
+    """
+
+    def setUp(self):
+        self.fake = FakeGuacamole().start()
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_wrapper_calls_overridden(self):
+        """
+        Test that every wrapper method the orchestration calls is overridden.
+        """
+        called = set()
+        for root, _, files in os.walk(SRC_DIR):
+            for name in files:
+                if name.endswith('.py'):
+                    with open(os.path.join(root, name), encoding='utf-8') as file:
+                        called.update(re.findall(r'gconn\.(\w+)\(', file.read()))
+        wrapper_calls = {name for name in called if callable(getattr(session, name, None))}
+
+        self.assertIn('manage_connection', wrapper_calls)
+        self.assertEqual(sorted(name for name in wrapper_calls
+                                if name not in vars(PooledSession)), [])
+
+    @patch('guacamole.main.requests')
+    def test_wrapper_module_unused(self, mock_requests):
+        """
+        Test that the overridden calls reach the server without the wrapper's
+        requests module.
+        """
+        mock_requests.side_effect = AssertionError
+        for method in ('get', 'post', 'put', 'patch', 'delete'):
+            getattr(mock_requests, method).side_effect = AssertionError(method)
+        gconn = PooledSession(self.fake.url, 'postgresql', 'guacadmin', 'guacadmin')
+
+        self.assertIn(gconn.token, self.fake.tokens)
+        org = gconn.create_connection_group('Test_Org')
+        gconn.update_connection_group(org['identifier'], 'Test_Org', attributes={'a': '1'})
+        conn = gconn.manage_connection('rdp',
+                                       'Test_Range.1.Test_Name.1',
+                                       org['identifier'],
+                                       parameters={'hostname': '10.0.0.1', 'port': '3389'})
+        gconn.manage_connection('rdp',
+                                'Test_Range.1.Test_Name.1',
+                                org['identifier'],
+                                conn['identifier'],
+                                parameters={'hostname': '10.0.0.2'})
+        profile = gconn.create_sharing_profile(conn['identifier'],
+                                               'Test_Range.1.Test_Name.1.read',
+                                               {'read-only': 'true'})
+        gconn.update_sharing_profile(conn['identifier'],
+                                     'Test_Range.1.Test_Name.1.view',
+                                     profile['identifier'],
+                                     {'read-only': 'true'})
+        gconn.create_user('test.user', 'secret', {'guac-full-name': 'Test User'})
+        gconn.update_user('test.user', {'guac-email-address': 'test@example.com'})
+        gconn.create_usergroup('Test_Group')
+        gconn.update_usergroup_member(['test.user'], 'Test_Group')
+        gconn.update_connection_permissions('test.user', conn['identifier'])
+        gconn.update_connection_permissions('test.user', org['identifier'], permission='group')
+        gconn.update_user_permissions('test.user', ['UPDATE', 'CREATE_USER'])
+        gconn.update_usergroup_connections('Test_Group', [conn['identifier']])
+
+        self.assertEqual(gconn.detail_connection(conn['identifier'], 'parameters'),
+                         {'hostname': '10.0.0.2'})
+        self.assertEqual(gconn.detail_connection(conn['identifier'])['name'],
+                         'Test_Range.1.Test_Name.1')
+        self.assertEqual(
+            gconn.detail_connection_group_connections(org['identifier'])
+            ['childConnections'][0]['sharingProfiles'][0]['name'],
+            'Test_Range.1.Test_Name.1.view'
+        )
+        self.assertEqual(list(gconn.list_connection_groups()), [org['identifier']])
+        self.assertEqual(list(gconn.list_connections()), [conn['identifier']])
+        self.assertEqual(list(gconn.list_sharing_profiles()), [profile['identifier']])
+        self.assertEqual(list(gconn.list_users()), ['test.user'])
+        self.assertEqual(list(gconn.list_usergroups()), ['Test_Group'])
+        permissions = gconn.detail_user_permissions('test.user')
+        self.assertEqual(permissions['connectionPermissions'], {conn['identifier']: ['READ']})
+        self.assertEqual(permissions['connectionGroupPermissions'], {org['identifier']: ['READ']})
+        self.assertEqual(permissions['systemPermissions'], ['CREATE_USER'])
+        self.assertEqual(permissions['userPermissions'], {'test.user': ['UPDATE']})
+        self.assertEqual(gconn.detail_usergroup_permissions('Test_Group')
+                         ['connectionPermissions'], {conn['identifier']: ['READ']})
+
+        gconn.delete_sharing_profile(profile['identifier'])
+        gconn.delete_connection(conn['identifier'])
+        gconn.delete_connection_group(org['identifier'])
+        gconn.delete_usergroup('Test_Group')
+        gconn.delete_user('test.user')
+        self.assertEqual(gconn.list_connection_groups(), {})
+        self.assertEqual(gconn.list_users(), {})
+
+        mock_requests.get.assert_not_called()
+        mock_requests.post.assert_not_called()
+        self.assertEqual(gconn.transport.stats()['requests'], self.fake.stats()['requests'])
+
+
+class TestOpenStackCache(unittest.TestCase):
+    """
+    Tests reusing Keystone tokens across connections.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, 'openstack_tokens.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def openstack_connect(self):
+        auth = v3.Password(auth_url='http://keystone.example.com/v3',
+                           username='admin',
+                           password='secret',
+                           project_name='admin',
+                           user_domain_id='default',
+                           project_domain_id='default')
+        return MagicMock(session=ks_session.Session(auth=auth))
+
+    def authenticated_connect(self, expires):
+        token = {
+            'token': {
+                'expires_at': expires,
+                'user': {'id': 'user', 'name': 'admin'},
+                'project': {'id': 'project', 'name': 'admin'},
+                'catalog': []
+            }
+        }
+        first = self.openstack_connect()
+        first.session.auth.set_auth_state(json.dumps({'auth_token': 'cached',
+                                                      'body': token}))
+        return first
+
+    def test_token_restored(self):
+        """
+        Test that a live token is restored.
+        """
+        save_openstack_cache(self.authenticated_connect('2999-01-01T00:00:00Z'),
+                             self.cache_path,
+                             'cloud')
+        second = self.openstack_connect()
+
+        self.assertTrue(load_openstack_cache(second, self.cache_path, 'cloud'))
+        self.assertEqual(second.session.auth.get_token(second.session), 'cached')
+        self.assertEqual(second.session.auth.auth_ref.project_id, 'project')
+        self.assertEqual(os.stat(self.cache_path).st_mode & 0o777, 0o600)
+
+    def test_expired_token_ignored(self):
+        """
+        Test that a token about to expire is not restored.
+        """
+        save_openstack_cache(self.authenticated_connect('2000-01-01T00:00:00Z'),
+                             self.cache_path,
+                             'cloud')
+        second = self.openstack_connect()
+
+        self.assertFalse(load_openstack_cache(second, self.cache_path, 'cloud'))
+        self.assertIsNone(second.session.auth.auth_ref)
+        self.assertFalse(load_openstack_cache(second, self.cache_path, 'other'))
+
+
 if __name__ == '__main__':
     unittest.main()
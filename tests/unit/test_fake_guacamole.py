@@ -0,0 +1,116 @@
+"""
+Tests for the fake Guacamole server used by the load tests.
+"""
+
+import unittest
+from guacamole import session
+from tests.fakes.guacamole_server import FakeGuacamole
+
+
+class TestFakeGuacamole(unittest.TestCase):
+    """
+    Test the fake Guacamole server through the Guacamole API wrapper.
+    """
+
+    def setUp(self):
+        self.fake = FakeGuacamole().start()
+        self.gconn = session(self.fake.url, 'postgresql', 'guacadmin', 'guacadmin')
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def test_token(self):
+        """
+        Test that requests need a live token.
+        """
+        self.assertEqual(len(self.fake.tokens), 1)
+        self.assertEqual(self.gconn.list_users(), {})
+
+        self.gconn.delete_token()
+        self.assertEqual(self.gconn.list_users()['type'], 'PERMISSION_DENIED')
+
+        # The wrapper can't read a token from the error
+        with self.assertRaises(KeyError):
+            session(self.fake.url, 'postgresql', 'guacadmin', 'wrong')
+        self.assertEqual(self.fake.stats()['by_route']['POST /tokens'], 2)
+
+    def test_connection_tree(self):
+        """
+        Test that created objects are listed, nested in the tree and
+        deleted with their parent.
+        """
+        org = self.gconn.create_connection_group('Test_Org')
+        conn = self.gconn.manage_connection('rdp',
+                                            'Test_Range.1.Test_Name.1',
+                                            org['identifier'],
+                                            parameters={'hostname': '10.0.0.1'})
+        profile = self.gconn.create_sharing_profile(conn['identifier'],
+                                                    'Test_Range.1.Test_Name.1.read',
+                                                    {'read-only': 'true'})
+
+        duplicate = self.gconn.create_connection_group('Test_Org')
+        self.assertEqual(duplicate['type'], 'BAD_REQUEST')
+
+        tree = self.gconn.detail_connection_group_connections(org['identifier'])
+        self.assertEqual(tree['childConnections'][0]['name'], 'Test_Range.1.Test_Name.1')
+        self.assertEqual(tree['childConnections'][0]['sharingProfiles'][0]['identifier'],
+                         profile['identifier'])
+        self.assertEqual(self.gconn.detail_connection(conn['identifier'], 'parameters')['hostname'],
+                         '10.0.0.1')
+
+        self.gconn.delete_connection_group(org['identifier'])
+        self.assertEqual(self.gconn.list_connections(), {})
+        self.assertEqual(self.gconn.list_sharing_profiles(), {})
+
+    def test_batch_atomic(self):
+        """
+        Test that a batch with a failing patch creates nothing.
+        """
+        response = self.fake.dispatch('PATCH', '/api/session/data/postgresql/connectionGroups',
+                                      {'token': list(self.fake.tokens)}, b'''[
+            {"op": "add", "path": "/", "value": {"name": "A", "parentIdentifier": "ROOT"}},
+            {"op": "add", "path": "/", "value": {"name": "A", "parentIdentifier": "ROOT"}}
+        ]''')
+
+        self.assertEqual(response[0], 400)
+        self.assertEqual(self.gconn.list_connection_groups(), {})
+
+    def test_permissions(self):
+        """
+        Test that permission patches are applied to the user.
+        """
+        org = self.gconn.create_connection_group('Test_Org')
+        self.gconn.create_user('Test_Name.1', 'pass', {'guac-organization': 'Test_Org'})
+        self.gconn.update_connection_permissions('Test_Name.1', [org['identifier']], 'add', 'group')
+        self.gconn.update_user_permissions('Test_Name.1', ['CREATE_USER'], 'add')
+
+        permissions = self.gconn.detail_user_permissions('Test_Name.1')
+        self.assertEqual(permissions['connectionGroupPermissions'], {org['identifier']: ['READ']})
+        self.assertEqual(permissions['systemPermissions'], ['CREATE_USER'])
+        self.assertEqual(self.gconn.list_users()['Test_Name.1']['attributes']['guac-organization'],
+                         'Test_Org')
+
+        self.gconn.update_connection_permissions('Test_Name.1', [org['identifier']], 'remove', 'group')
+        self.assertEqual(self.gconn.detail_user_permissions('Test_Name.1')['connectionGroupPermissions'],
+                         {})
+
+    def test_error_injection(self):
+        """
+        Test that queued and random errors fail requests and are counted.
+        """
+        self.fake.fail('GET', '^/users$', count=2)
+        self.assertEqual(self.gconn.list_users()['type'], 'INTERNAL_ERROR')
+        self.assertEqual(self.gconn.list_users()['type'], 'INTERNAL_ERROR')
+        self.assertEqual(self.gconn.list_users(), {})
+
+        self.fake.error_rate = 1.0
+        self.fake.error_status = 400
+        self.assertEqual(self.gconn.list_users()['type'], 'BAD_REQUEST')
+
+        stats = self.fake.stats()
+        self.assertEqual(stats['errors'], 3)
+        self.assertEqual(stats['by_route']['GET /users'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
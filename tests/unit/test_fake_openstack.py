@@ -0,0 +1,112 @@
+"""
+Tests for the fake OpenStack connection used by the scaling tests.
+"""
+
+import time
+import unittest
+from openstack import exceptions
+from tests.fakes.openstack_cloud import FakeOpenStack
+
+TEMPLATE = 'tests/templates/main.yaml'
+
+
+class TestFakeOpenStack(unittest.TestCase):
+    """
+    Test the stacks, servers, networks and object store of the fake.
+    """
+
+    def test_stack_latency(self):
+        """
+        Test that stacks build in the background and servers are addressed
+        after the addressing delay.
+        """
+        conn = FakeOpenStack(stack_latency=0.05, address_delay=0.05)
+        conn.create_stack('Test_Range.1', TEMPLATE, count=2)
+
+        self.assertEqual(conn.search_stacks('Test_Range.1')[0].stack_status,
+                         'CREATE_IN_PROGRESS')
+        servers = conn.list_servers(False)
+        self.assertEqual(sorted(server['name'] for server in servers),
+                         ['Test_Range.1.analyst.0',
+                          'Test_Range.1.analyst.1',
+                          'Test_Range.1.guacd.server'])
+        self.assertEqual({server['status'] for server in servers}, {'BUILD'})
+
+        # Waiting on a later stack completes the earlier one too
+        conn.create_stack('Test_Range.2', TEMPLATE, wait=True, count=2)
+        self.assertEqual([stack.stack_status for stack in conn.search_stacks()],
+                         ['CREATE_COMPLETE', 'CREATE_COMPLETE'])
+        self.assertEqual(conn.stats()['waits'], {'Test_Range.2': 1})
+        self.assertEqual({server['status'] for server in conn.list_servers(False)},
+                         {'ACTIVE'})
+        self.assertEqual(conn.list_servers(False)[0]['private_v4'], '')
+
+        time.sleep(0.05)
+        addresses = [server['private_v4'] for server in conn.list_servers(False)]
+        self.assertEqual(len(set(addresses)), 6)
+        self.assertNotIn('', addresses)
+
+        with self.assertRaises(exceptions.ConflictException):
+            conn.create_stack('Test_Range.1', TEMPLATE)
+
+    def test_resources(self):
+        """
+        Test that stack resources point to their networks and are deleted
+        with their stack.
+        """
+        conn = FakeOpenStack()
+        conn.create_stack('Test_Range.1', TEMPLATE)
+        stack = conn.orchestration.find_stack('Test_Range.1')
+
+        resources = {
+            resource.logical_resource_id: resource.physical_resource_id
+            for resource in conn.orchestration.resources('Test_Range.1')
+        }
+        self.assertEqual(conn.network.find_network(resources['student.network']).name,
+                         'Test_Range.1-student.network')
+        self.assertEqual(conn.network.find_subnet(resources['student.subnet']).name,
+                         'Test_Range.1-student.subnet')
+        self.assertIsNone(conn.network.find_network(resources['student.subnet']))
+        self.assertEqual([found.name for found in conn.orchestration.stacks()],
+                         ['Test_Range.1'])
+
+        self.assertTrue(conn.delete_stack(stack.id, wait=True))
+        self.assertFalse(conn.delete_stack('Test_Range.1'))
+        self.assertEqual(conn.list_servers(False), [])
+        self.assertIsNone(conn.network.find_network(resources['student.network']))
+        with self.assertRaises(exceptions.NotFoundException):
+            list(conn.orchestration.resources('Test_Range.1'))
+
+    def test_object_store(self):
+        """
+        Test that containers hold their objects and only empty containers
+        are deleted.
+        """
+        conn = FakeOpenStack(request_latency=0.001)
+        conn.object_store.create_container(name='Test_Range')
+        self.assertEqual(conn.set_container_access('Test_Range', 'public').read_ACL,
+                         '.r:*,.rlistings')
+        conn.create_directory_marker_object('Test_Range', 'tests/assets/empty')
+        conn.create_object('Test_Range',
+                           'tests/assets/asset.txt',
+                           filename='tests/assets/asset.txt')
+
+        objects = conn.list_objects('Test_Range')
+        self.assertEqual([obj.name for obj in objects],
+                         ['tests/assets/asset.txt', 'tests/assets/empty'])
+        self.assertGreater(objects[0].bytes, 0)
+
+        with self.assertRaises(exceptions.ConflictException):
+            conn.object_store.delete_container('Test_Range')
+        for obj in objects:
+            self.assertTrue(conn.delete_object('Test_Range', obj.name))
+        conn.object_store.delete_container('Test_Range')
+        self.assertEqual(conn.search_containers(name='Test_Range'), [])
+
+        stats = conn.stats()
+        self.assertEqual(stats['requests'], 10)
+        self.assertEqual(stats['by_call']['delete_object'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,9 @@ from unittest.mock import patch, MagicMock
 from pprint import pprint
 from src.utils.generate import (generate_password, generate_names, generate_instance_names,
                          generate_conns, generate_users, generate_groups,
-                         format_groups, format_users)
+                         format_groups, format_users, expand_instances,
+                         index_instances, get_group_name, get_connection_name,
+                         parse_instance_name)
 
 class TestGenerate(unittest.TestCase):
     """
@@ -123,6 +125,93 @@ class TestGenerate(unittest.TestCase):
         result = generate_conns(params, guac_params, True)
         self.assertIsNot({}, result)
 
+    @patch('src.utils.generate.error_msg')
+    @patch('src.utils.generate.info_msg')
+    def test_expand_instances(self, mock_info_msg, mock_error_msg):
+        """
+        Test that patterns are expanded in order into a new list
+        and that missing instances are dropped.
+        """
+        instance_names = ['range.1.a', 'range.1.b', 'range.2.a', 'range.2.b']
+        instances = ['range.2.a', 'missing', 'range.1*', 'missing.2', '*.a', 'range.1.b']
+
+        result = expand_instances(instances, instance_names)
+
+        self.assertEqual(result, ['range.2.a', 'range.1.a', 'range.1.b'])
+        self.assertEqual(instances, ['range.2.a', 'missing', 'range.1*', 'missing.2', '*.a', 'range.1.b'])
+        self.assertEqual(mock_error_msg.call_count, 2)
+        self.assertEqual(mock_info_msg.call_count, 2)
+
+    @patch('src.utils.generate.general_msg')
+    @patch('src.utils.generate.info_msg')
+    @patch('src.utils.generate.index_instances', wraps=index_instances)
+    def test_users_share_index(self, mock_index_instances, mock_info_msg, mock_general_msg):
+        """
+        Test that generate_users and format_users expand the mappings with
+        a given instance index instead of building their own.
+        """
+        instance_names = index_instances([{'name': 'range.1.a'}, {'name': 'range.1.b'}])
+        guac_params = {
+            'org_name': 'org',
+            'users': {'user': {'instances': ['range.1*']}},
+            'sharing': None,
+            'instances': []
+        }
+        params = {'num_ranges': 1, 'num_users': 1, 'range_name': 'range'}
+
+        generated = generate_users(params, guac_params, False, instance_names)
+        formatted = format_users({'user': {'password': 'pass',
+                                           'instances': ['range.1*']}},
+                                 guac_params,
+                                 False,
+                                 instance_names)
+
+        mock_index_instances.assert_not_called()
+        self.assertEqual(generated['range.user']['permissions']['connectionPermissions'],
+                         ['range.1.a', 'range.1.b'])
+        self.assertEqual(formatted['user']['permissions']['connectionPermissions'],
+                         ['range.1.a', 'range.1.b'])
+
+    def test_instance_name_parts(self):
+        """
+        Test that the group and connection names are parsed from instance names.
+        """
+        test_cases = {
+            'Range.2.User.3': ('Range.2', 'User.3'),
+            'Range.User.3': ('Range', 'User.3'),
+            'Range.2.User': ('Range.2', 'User'),
+            'Range.User': ('Range', 'User'),
+            'Range.2': ('Range.2', 'Range.2'),
+            'Range': ('Range', 'Range'),
+        }
+
+        for name, expected in test_cases.items():
+            self.assertEqual((get_group_name(name), get_connection_name(name)), expected)
+
+        parts = parse_instance_name('Range.2.User.3')
+        self.assertEqual((parts.range, parts.range_index, parts.user, parts.user_index),
+                         ('Range', '2', 'User', '3'))
+        parts = parse_instance_name('Range.User')
+        self.assertEqual((parts.range, parts.range_index, parts.user, parts.user_index),
+                         ('Range', None, 'User', None))
+
+    def test_malformed_instance_names(self):
+        """
+        Test that names with empty or missing parts are parsed without errors.
+        """
+        test_cases = {
+            '': ('', ''),
+            '.': ('', ''),
+            'Range.': ('Range', ''),
+            '.User': ('', 'User'),
+            'Range..3': ('Range', '.3'),
+            'Range.2..': ('Range.2', ''),
+            '2.3': ('2.3', '2.3'),
+            'Range.x2.User.3a': ('Range', '3a'),
+        }
+
+        for name, expected in test_cases.items():
+            self.assertEqual((get_group_name(name), get_connection_name(name)), expected)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,680 @@
+"""
+Tests for the Guacamole orchestration functions.
+"""
+
+import json
+import unittest
+from unittest.mock import patch, create_autospec, MagicMock
+from guacamole import session
+from src.orchestration.guac import (get_conn_id, create_conn, delete_conn,
+                                    create_conn_data,
+                                    create_user_data, fingerprint,
+                                    create_group_data, create_user_groups,
+                                    create_conns_bulk, extract_connections,
+                                    create_conns, get_conn_levels,
+                                    fast_delete_data, remove_children,
+                                    delete_users, provision_ranges, get_users)
+from src.utils.generate import iter_range_conns
+# The guac module calls the helper modules it imports itself
+from orchestration import guac_index
+from orchestration.guac_index import clear_conn_index
+
+
+def mock_gconn() -> MagicMock:
+    """
+    Create a mock Guacamole session with a small connection tree.
+
+    The mock is specced on the wrapper's session, so calling a method the
+    wrapper doesn't have fails the test.
+
+    Returns:
+        MagicMock: The mock Guacamole session.
+    """
+    gconn = create_autospec(session, instance=True)
+    gconn.list_connection_groups.return_value = {
+        '1': {'identifier': '1', 'parentIdentifier': 'ROOT', 'name': 'Test_Org'},
+        '2': {'identifier': '2', 'parentIdentifier': '1', 'name': 'Test_Range.1'},
+        '3': {'identifier': '3', 'parentIdentifier': 'ROOT', 'name': 'Other_Org'}
+    }
+    gconn.list_connections.return_value = {
+        '1': {'identifier': '1', 'parentIdentifier': '2', 'name': 'Test_Range.1.user'},
+        '2': {'identifier': '2', 'parentIdentifier': '3', 'name': 'Test_Range.1.user'}
+    }
+    gconn.list_sharing_profiles.return_value = {
+        '1': {'identifier': '1', 'primaryConnectionIdentifier': '1',
+              'name': 'Test_Range.1.user.read'}
+    }
+    return gconn
+
+
+@patch('src.orchestration.guac.time.sleep', MagicMock())
+@patch('src.orchestration.guac.general_msg', MagicMock())
+class TestConnIndex(unittest.TestCase):
+    """
+    Test the connection index behind get_conn_id.
+    """
+
+    def setUp(self):
+        self.gconn = mock_gconn()
+
+    def tearDown(self):
+        clear_conn_index(self.gconn)
+
+    def test_get_conn_id(self):
+        """
+        Test that lookups are resolved by type, parent and name.
+        """
+        self.assertEqual(get_conn_id(self.gconn, 'Test_Org', 'ROOT', 'group'), '1')
+        self.assertEqual(get_conn_id(self.gconn, 'Test_Range.1.user', '3'), '2')
+        self.assertEqual(
+            get_conn_id(self.gconn, 'Test_Range.1.user.read', '1', 'sharing profile'), '1'
+        )
+        self.assertIsNone(get_conn_id(self.gconn, 'Test_Org', '1', 'group'))
+        self.assertIsNone(get_conn_id(self.gconn, 'Test_Org', 'ROOT', 'connection'))
+
+    def test_listings_are_cached(self):
+        """
+        Test that repeated lookups only list the data source once.
+        """
+        for _ in range(3):
+            get_conn_id(self.gconn, 'Test_Org', 'ROOT')
+            get_conn_id(self.gconn, 'Missing', 'ROOT')
+
+        self.gconn.list_connection_groups.assert_called_once()
+        self.gconn.list_connections.assert_called_once()
+        self.gconn.list_sharing_profiles.assert_called_once()
+
+    def test_failed_listing(self):
+        """
+        Test that a failed listing is reported and not cached.
+        """
+        self.gconn.list_connections.return_value = 'Permission Denied.'
+
+        with patch('orchestration.guac_index.error_msg') as mock_error_msg:
+            self.assertIsNone(get_conn_id(self.gconn, 'Test_Org', 'ROOT'))
+            mock_error_msg.assert_called_once()
+
+        self.gconn.list_connections.return_value = {}
+        self.assertEqual(get_conn_id(self.gconn, 'Test_Org', 'ROOT'), '1')
+
+    def test_truncated_listing(self):
+        """
+        Test that a streamed listing failing midway is reported like a
+        failed listing.
+        """
+        def truncated_items(*args):
+            yield '1', {'identifier': '1', 'parentIdentifier': 'ROOT', 'name': 'Test_Org',
+                        'attributes': {'guac-organization': 'Test_Org'}}
+            raise json.JSONDecodeError("Unterminated string", '{"2": {"na', 10)
+
+        with patch('orchestration.guac_index.guacamole_items', truncated_items), \
+                patch('orchestration.guac_index.error_msg') as mock_index_error_msg, \
+                patch('src.orchestration.guac.guacamole_items', truncated_items), \
+                patch('src.orchestration.guac.error_msg') as mock_error_msg:
+            self.assertIsNone(get_conn_id(self.gconn, 'Test_Org', 'ROOT'))
+            self.assertEqual(get_users(self.gconn, 'Test_Org'), [])
+
+        mock_index_error_msg.assert_called_once()
+        mock_error_msg.assert_called_once()
+        self.assertNotIn(self.gconn, guac_index._conn_indexes)
+
+    def test_create_conn_updates_index(self):
+        """
+        Test that created connections are resolvable without a new listing.
+        """
+        get_conn_id(self.gconn, 'Test_Org', 'ROOT')
+        self.gconn.create_connection_group.return_value = {'identifier': '4'}
+
+        conn_id = create_conn(self.gconn,
+                              '1',
+                              {'name': 'Test_Range.2', 'type': 'ORGANIZATIONAL'})
+
+        self.assertEqual(conn_id, '4')
+        self.assertEqual(get_conn_id(self.gconn, 'Test_Range.2', '1', 'group'), '4')
+        self.gconn.list_connection_groups.assert_called_once()
+
+    def test_delete_conn_updates_index(self):
+        """
+        Test that deleting a group removes its whole subtree from the index.
+        """
+        get_conn_id(self.gconn, 'Test_Org', 'ROOT')
+        self.gconn.delete_connection_group.return_value = None
+
+        delete_conn(self.gconn, '1')
+
+        self.assertIsNone(get_conn_id(self.gconn, 'Test_Org', 'ROOT'))
+        self.assertIsNone(get_conn_id(self.gconn, 'Test_Range.1', '1'))
+        self.assertIsNone(get_conn_id(self.gconn, 'Test_Range.1.user', '2'))
+        self.assertIsNone(get_conn_id(self.gconn, 'Test_Range.1.user.read', '1'))
+        self.assertEqual(get_conn_id(self.gconn, 'Test_Range.1.user', '3'), '2')
+        self.assertEqual(len(guac_index._conn_indexes[self.gconn]['nodes']), 2)
+
+    def test_fast_delete_data(self):
+        """
+        Test that fast deprovisioning only selects the top-most range groups
+        and never reads connection parameters or user permissions.
+        """
+        self.gconn.list_users.return_value = {
+            'Test_Range.1.user': {'username': 'Test_Range.1.user',
+                                  'attributes': {'guac-organization': 'Test_Org'}},
+            'other': {'username': 'other',
+                      'attributes': {'guac-organization': 'Other_Org'}}
+        }
+        guac_params = {
+            'org_name': 'Test_Org',
+            'parent_group_id': '1',
+            'new_groups': ['Test_Range.1', 'Test_Range.2'],
+            'new_users': {'Test_Range.1.user': {}, 'Test_Range.2.user': {}}
+        }
+
+        with patch('src.orchestration.guac.info_msg'):
+            conns_to_delete, users_to_delete = fast_delete_data(self.gconn, guac_params)
+
+        self.assertEqual([conn['identifier'] for conn in conns_to_delete], ['2'])
+        self.assertEqual([user['username'] for user in users_to_delete],
+                         ['Test_Range.1.user'])
+        self.gconn.detail_connection.assert_not_called()
+        self.gconn.detail_user_permissions.assert_not_called()
+
+        guac_params['new_groups'] = ['Test_Org']
+        conns_to_delete, _ = fast_delete_data(self.gconn, guac_params)
+        self.assertEqual([conn['identifier'] for conn in conns_to_delete], ['1'])
+
+    def test_delete_users_summary(self):
+        """
+        Test that concurrent deletes retry internal errors and summarize the rest.
+        """
+        attempts = {}
+
+        def delete_user(username):
+            attempts[username] = attempts.get(username, 0) + 1
+            if username == 'flaky' and attempts[username] == 1:
+                return {'message': 'Deadlock', 'type': 'INTERNAL_ERROR'}
+            if username == 'missing':
+                return {'message': 'Not found', 'type': 'NOT_FOUND'}
+            return None
+
+        self.gconn.delete_user.side_effect = delete_user
+
+        with patch('src.orchestration.guac.error_msg'), \
+             patch('src.utils.concurrency.time.sleep'):
+            summary = delete_users(self.gconn,
+                                   [{'username': 'alice'}, 'flaky', 'missing'],
+                                   workers=3)
+
+        self.assertEqual(summary, {'deleted': ['alice', 'flaky'], 'failed': ['missing']})
+        self.assertEqual(attempts, {'alice': 1, 'flaky': 2, 'missing': 1})
+
+
+@patch('src.orchestration.guac.general_msg', MagicMock())
+class TestDiff(unittest.TestCase):
+    """
+    Test the fingerprint based diffing of connections and users.
+    """
+
+    def test_fingerprint(self):
+        """
+        Test that fingerprints ignore empty values and dictionary order.
+        """
+        self.assertEqual(
+            fingerprint({'name': 'a', 'parameters': {'port': '22', 'domain': ''}}),
+            fingerprint({'parameters': {'port': '22'}, 'name': 'a', 'attributes': {}})
+        )
+        self.assertNotEqual(
+            fingerprint({'name': 'a', 'parameters': {'port': '22'}}),
+            fingerprint({'name': 'a', 'parameters': {'port': '3389'}})
+        )
+        self.assertNotEqual(fingerprint({'ids': ['1', '2']}),
+                            fingerprint({'ids': ['2', '1']}))
+
+    def test_create_conn_data(self):
+        """
+        Test that only changed connections are kept for the update.
+        """
+        guac_params = {
+            'parent_group_id': '1',
+            'new_groups': ['Test_Org'],
+            'new_conns': {
+                'name': 'Test_Org',
+                'type': 'ORGANIZATIONAL',
+                'childConnections': [
+                    {'name': 'Test_Org.a', 'protocol': 'ssh',
+                     'parameters': {'port': '22', 'domain': ''}},
+                    {'name': 'Test_Org.b', 'protocol': 'ssh',
+                     'parameters': {'port': '2222'}}
+                ]
+            },
+            'conns': {
+                'name': 'Test_Org',
+                'identifier': '1',
+                'parentIdentifier': 'ROOT',
+                'type': 'ORGANIZATIONAL',
+                'childConnections': [
+                    {'name': 'Test_Org.a', 'identifier': '1', 'parentIdentifier': '1',
+                     'protocol': 'ssh', 'parameters': {'port': '22'}},
+                    {'name': 'Test_Org.b', 'identifier': '2', 'parentIdentifier': '1',
+                     'protocol': 'ssh', 'parameters': {'port': '22'}},
+                    {'name': 'Test_Org.c', 'identifier': '3', 'parentIdentifier': '1',
+                     'protocol': 'ssh', 'parameters': {'port': '22'}}
+                ]
+            }
+        }
+
+        conns_to_create, conns_to_delete, _ = create_conn_data(guac_params, True)
+
+        self.assertEqual([conn['name'] for conn in conns_to_create], ['Test_Org.b'])
+        self.assertEqual([conn['name'] for conn in conns_to_delete], ['Test_Org.c'])
+
+    def test_create_user_data(self):
+        """
+        Test that unchanged users are dropped and removed users are deleted.
+        """
+        permissions = {
+            'connectionPermissions': ['Test_Org.a'],
+            'connectionGroupPermissions': ['Test_Org'],
+            'sharingProfilePermissions': [],
+            'userPermissions': {},
+            'userGroupPermissions': [],
+            'systemPermissions': []
+        }
+        guac_params = {
+            'org_name': 'Test_Org',
+            'new_users': {
+                'alice': {'password': 'a', 'permissions': permissions},
+                'bob': {'password': 'b', 'permissions': permissions}
+            },
+            'users': [
+                {
+                    'username': 'alice',
+                    'attributes': {'guac-organization': 'Test_Org'},
+                    'permissions': {
+                        'connectionPermissions': {'1': ['READ']},
+                        'connectionGroupPermissions': {'1': ['READ']},
+                        'activeConnectionPermissions': {'7': ['READ']}
+                    }
+                },
+                {
+                    'username': 'carol',
+                    'attributes': {'guac-organization': 'Test_Org'},
+                    'permissions': {
+                        'userPermissions': {'carol': ['READ']}
+                    }
+                }
+            ]
+        }
+        conn_ids = {'Test_Org': '1', 'Test_Org.a': '1'}
+
+        users_to_create, users_to_delete, _ = create_user_data(guac_params,
+                                                               conn_ids,
+                                                               True)
+
+        self.assertEqual([user['username'] for user in users_to_create], ['bob'])
+        self.assertEqual(users_to_create[0]['password'], 'b')
+        self.assertEqual([user['username'] for user in users_to_delete], ['carol'])
+
+
+
+@patch('src.orchestration.guac.time.sleep', MagicMock())
+@patch('src.orchestration.guac.general_msg', MagicMock())
+@patch('src.orchestration.guac.success_msg', MagicMock())
+class TestGroupPermissions(unittest.TestCase):
+    """
+    Test the group permissions mode.
+    """
+
+    def setUp(self):
+        self.guac_params = {
+            'org_name': 'Test_Org',
+            'new_groups': ['Test_Range.1', 'Test_Range.2'],
+            'new_conns': {
+                'name': 'Test_Org',
+                'type': 'ORGANIZATIONAL',
+                'childConnectionGroups': [
+                    {
+                        'name': f"Test_Range.{i}",
+                        'type': 'ORGANIZATIONAL',
+                        'childConnections': [
+                            {'name': f"Test_Range.{i}.user.{u}", 'protocol': 'ssh'}
+                            for u in [1, 2]
+                        ]
+                    }
+                    for i in [1, 2]
+                ]
+            },
+            'new_users': {
+                'admin': {
+                    'permissions': {
+                        'connectionPermissions': [
+                            f"Test_Range.{i}.user.{u}"
+                            for i in [1, 2]
+                            for u in [1, 2]
+                        ],
+                        'connectionGroupPermissions': [
+                            'Test_Range.1', 'Test_Range.2', 'Test_Org'
+                        ]
+                    }
+                },
+                'Test_Range.1.user.1': {
+                    'permissions': {
+                        'connectionPermissions': ['Test_Range.1.user.1'],
+                        'connectionGroupPermissions': ['Test_Range.1', 'Test_Org']
+                    }
+                }
+            }
+        }
+
+    def test_create_group_data(self):
+        """
+        Test that only users mapped to a whole range join its user group.
+        """
+        groups = create_group_data(self.guac_params)
+
+        self.assertEqual([group['identifier'] for group in groups],
+                         ['Test_Org.Test_Range.1', 'Test_Org.Test_Range.2'])
+        self.assertEqual(groups[0]['members'], ['admin'])
+        self.assertEqual(groups[0]['connectionPermissions'],
+                         ['Test_Range.1.user.1', 'Test_Range.1.user.2'])
+
+        new_users = self.guac_params['new_users']
+        self.assertEqual(new_users['admin']['permissions']['connectionPermissions'], [])
+        self.assertEqual(new_users['admin']['permissions']['connectionGroupPermissions'], [])
+        self.assertEqual(
+            new_users['Test_Range.1.user.1']['permissions']['connectionPermissions'],
+            ['Test_Range.1.user.1']
+        )
+
+    def test_create_user_groups(self):
+        """
+        Test that a new user group gets its permissions and members in bulk.
+        """
+        gconn = MagicMock()
+        gconn.list_usergroups.return_value = {}
+        gconn.create_usergroup.return_value = None
+        gconn.update_usergroup_connections.return_value = None
+        gconn.update_usergroup_member.return_value = None
+        conn_ids = {
+            'Test_Org': '1',
+            'Test_Range.1': '2',
+            'Test_Range.1.user.1': '1',
+            'Test_Range.1.user.2': '2'
+        }
+
+        groups = create_group_data(self.guac_params)
+        create_user_groups(gconn, groups[:1], conn_ids)
+
+        gconn.create_usergroup.assert_called_once_with('Test_Org.Test_Range.1')
+        gconn.update_usergroup_connections.assert_any_call('Test_Org.Test_Range.1',
+                                                           ['2', '1'],
+                                                           'add',
+                                                           'group')
+        gconn.update_usergroup_connections.assert_any_call('Test_Org.Test_Range.1',
+                                                           ['1', '2'],
+                                                           'add',
+                                                           'connection')
+        gconn.update_usergroup_member.assert_called_once_with(['admin'],
+                                                              'Test_Org.Test_Range.1',
+                                                              'add')
+
+
+
+@patch('src.orchestration.guac.time.sleep', MagicMock())
+@patch('src.orchestration.guac.general_msg', MagicMock())
+@patch('src.orchestration.guac.success_msg', MagicMock())
+@patch.multiple('orchestration.guac_bulk', general_msg=MagicMock(), success_msg=MagicMock())
+class TestBulkCreate(unittest.TestCase):
+    """
+    Test the batch creation of a new connection tree.
+    """
+
+    def setUp(self):
+        self.conns = extract_connections({
+            'name': 'Test_Org',
+            'type': 'ORGANIZATIONAL',
+            'childConnectionGroups': [
+                {
+                    'name': f"Test_Range.{i}",
+                    'type': 'ORGANIZATIONAL',
+                    'childConnections': [
+                        {
+                            'name': f"Test_Range.{i}.user.{u}",
+                            'protocol': 'ssh',
+                            'sharingProfiles': {
+                                'name': f"Test_Range.{i}.user.{u}.read",
+                                'parameters': {'read-only': 'true'}
+                            }
+                        }
+                        for u in range(3)
+                    ]
+                }
+                for i in range(2)
+            ]
+        })
+
+    @staticmethod
+    def fake_patch(gconn, method, path, json):
+        """
+        Answer a batch PATCH request with sequential identifiers.
+        """
+        return {
+            'patches': [
+                {'op': 'add', 'path': '/', 'identifier': f"{path}/{i}"}
+                for i, _ in enumerate(json)
+            ]
+        }
+
+    def test_create_conns_bulk(self):
+        """
+        Test that each level of the tree is created with one request per type.
+        """
+        gconn = MagicMock()
+        gconn.detail_connection_group_connections.return_value = {
+            'name': 'Test_Org', 'identifier': '10', 'type': 'ORGANIZATIONAL'
+        }
+
+        with patch('orchestration.guac_bulk.guacamole_request',
+                   side_effect=self.fake_patch) as mock_request:
+            conn_ids = create_conns_bulk(gconn, self.conns)
+
+        self.assertEqual(
+            [call.args[2] for call in mock_request.call_args_list],
+            ['/connectionGroups', '/connectionGroups', '/connections', '/sharingProfiles']
+        )
+        parents = {
+            op['value']['parentIdentifier']
+            for op in mock_request.call_args_list[1].kwargs['json']
+        }
+        self.assertEqual(parents, {'/connectionGroups/0'})
+        self.assertEqual(conn_ids['Test_Org'], '10')
+        self.assertEqual(conn_ids['Test_Range.1.user.2'], '/connections/5')
+        self.assertEqual(conn_ids['Test_Range.1.user.2.read'], '/sharingProfiles/5')
+        gconn.detail_connection_group_connections.assert_called_once_with('/connectionGroups/0')
+
+    def test_create_conns_bulk_unsupported(self):
+        """
+        Test that an unsupported batch request falls back to None.
+        """
+        with patch('orchestration.guac_bulk.guacamole_request',
+                   return_value='Method Not Allowed'):
+            self.assertIsNone(create_conns_bulk(MagicMock(), self.conns))
+
+    def test_get_conn_levels(self):
+        """
+        Test that the tree is split into levels of a single type and depth.
+        """
+        levels = get_conn_levels(self.conns)
+
+        self.assertEqual([(conn_type, len(conns)) for conn_type, conns in levels],
+                         [('group', 1), ('group', 2), ('connection', 6),
+                          ('sharing profile', 6)])
+
+    def test_create_conns_parallel(self):
+        """
+        Test that concurrent creation still creates parents before children.
+        """
+        gconn = MagicMock()
+        created = []
+
+        def create(kind):
+            def side_effect(*args):
+                created.append((kind, args))
+                return {'identifier': f"{kind}/{len(created)}"}
+            return side_effect
+
+        gconn.create_connection_group.side_effect = create('group')
+        gconn.manage_connection.side_effect = create('connection')
+        gconn.create_sharing_profile.side_effect = create('sharing profile')
+
+        conn_ids = create_conns(gconn, self.conns, [], workers=4)
+
+        self.assertEqual([kind for kind, _ in created],
+                         ['group'] * 3 + ['connection'] * 6 + ['sharing profile'] * 6)
+        for name, conn_id in conn_ids.items():
+            if name.endswith('.read'):
+                self.assertTrue(conn_id.startswith('sharing profile/'))
+        # Every connection was created under the identifier of its range group
+        for kind, args in created:
+            if kind == 'connection':
+                self.assertEqual(args[2], conn_ids[args[1].rsplit('.', 2)[0]])
+
+
+
+@patch('src.orchestration.guac.time.sleep', MagicMock())
+@patch('src.orchestration.guac.general_msg', MagicMock())
+@patch('src.orchestration.guac.success_msg', MagicMock())
+@patch('src.utils.generate.general_msg', MagicMock())
+class TestProvisionRanges(unittest.TestCase):
+    """
+    Test provisioning a new organization one range at a time.
+    """
+
+    def setUp(self):
+        self.guac_params = {
+            'org_name': 'Test_Org',
+            'new_groups': ['Test_Range.1', 'Test_Range.2'],
+            'instances': [
+                {'name': f"Test_Range.{r}.user", 'hostname': f"10.0.0.{r}"}
+                for r in (1, 2)
+            ],
+            'recording': False,
+            'sharing': False,
+            'protocol': 'ssh',
+            'username': 'user',
+            'password': 'pass',
+            'domain_name': '',
+            'users': [],
+            'new_users': {
+                f"Test_Range.{r}.user": {
+                    'password': 'pass',
+                    'permissions': {
+                        'connectionPermissions': [f"Test_Range.{r}.user"],
+                        'connectionGroupPermissions': [f"Test_Range.{r}", 'Test_Org'],
+                        'sharingProfilePermissions': [],
+                        'userPermissions': {},
+                        'userGroupPermissions': [],
+                        'systemPermissions': []
+                    }
+                }
+                for r in (1, 2)
+            }
+        }
+        self.guac_params['new_users']['admin'] = {
+            'password': 'pass',
+            'permissions': {
+                'connectionPermissions': ['Test_Range.1.user', 'Test_Range.2.user'],
+                'connectionGroupPermissions': ['Test_Org'],
+                'sharingProfilePermissions': [],
+                'userPermissions': {},
+                'userGroupPermissions': [],
+                'systemPermissions': ['ADMINISTER']
+            }
+        }
+
+    def test_interleaved(self):
+        """
+        Test that each range and its users are created before the next
+        range is generated, and that users spanning ranges wait for them.
+        """
+        events = []
+
+        def range_conns():
+            for parent, group in iter_range_conns(self.guac_params):
+                events.append(('generate', group.name))
+                yield parent, group
+
+        def fake_bulk(gconn, conns, debug, parent_ids):
+            events.append(('create', conns[0]['name'], parent_ids))
+            return {
+                **parent_ids,
+                **{conn['name']: f"id-{conn['name']}" for conn in conns}
+            }
+
+        def fake_users(gconn, users, current_users, update, debug):
+            events.extend(
+                ('user', user['username'], sorted(user['permissions']['connectionPermissions']))
+                for user in users
+            )
+
+        with patch('src.orchestration.guac.create_conns_bulk', side_effect=fake_bulk), \
+             patch('src.orchestration.guac.create_users', side_effect=fake_users):
+            provision_ranges(MagicMock(), self.guac_params, range_conns())
+
+        self.assertEqual(events, [
+            ('generate', 'Test_Org'),
+            ('create', 'Test_Org', {'ROOT': 'ROOT'}),
+            ('generate', 'Test_Range.1'),
+            ('create', 'Test_Range.1', {'Test_Org': 'id-Test_Org'}),
+            ('user', 'Test_Range.1.user', ['id-Test_Range.1.user']),
+            ('generate', 'Test_Range.2'),
+            ('create', 'Test_Range.2', {'Test_Org': 'id-Test_Org'}),
+            ('user', 'Test_Range.2.user', ['id-Test_Range.2.user']),
+            ('user', 'admin', ['id-Test_Range.1.user', 'id-Test_Range.2.user'])
+        ])
+
+
+class TestRemoveChildren(unittest.TestCase):
+    """
+    Test the reduction of deletes to independent subtrees.
+    """
+
+    def setUp(self):
+        self.tree = [
+            {'identifier': '1', 'parentIdentifier': 'ROOT', 'type': 'ORGANIZATIONAL'},
+            {'identifier': '2', 'parentIdentifier': '1', 'type': 'ORGANIZATIONAL'},
+            {'identifier': '3', 'parentIdentifier': '1', 'type': 'ORGANIZATIONAL'},
+            {'identifier': '1', 'parentIdentifier': '2', 'protocol': 'ssh'},
+            {'identifier': '2', 'parentIdentifier': '3', 'protocol': 'ssh'},
+            {'identifier': '3', 'parentIdentifier': '3', 'protocol': 'ssh'},
+            {'identifier': '1', 'primaryConnectionIdentifier': '1'},
+            {'identifier': '2', 'primaryConnectionIdentifier': '3'}
+        ]
+
+    def test_multi_level(self):
+        """
+        Test that descendants of a deleted group are dropped at any depth.
+        """
+        conns = [self.tree[0], self.tree[3], self.tree[6], self.tree[7]]
+
+        self.assertEqual(remove_children(conns, self.tree), [self.tree[0]])
+
+    def test_independent_subtrees(self):
+        """
+        Test that one delete is kept per independent subtree.
+        """
+        conns = [self.tree[1], self.tree[3], self.tree[6], self.tree[5], self.tree[7]]
+
+        self.assertEqual(remove_children(conns, self.tree),
+                         [self.tree[1], self.tree[5]])
+
+    def test_typed_identifiers(self):
+        """
+        Test that groups and connections sharing an identifier are not confused.
+        """
+        conns = [self.tree[2], self.tree[4]]
+
+        self.assertEqual(remove_children(conns, self.tree), [self.tree[2]])
+        self.assertEqual(remove_children([self.tree[1], self.tree[4]], self.tree),
+                         [self.tree[1], self.tree[4]])
+
+
+if __name__ == '__main__':
+    unittest.main()
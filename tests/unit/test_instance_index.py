@@ -0,0 +1,82 @@
+"""
+Tests for the instance name index.
+"""
+
+import re
+import unittest
+from src.utils.instance_index import InstanceIndex, is_pattern
+
+NAMES = [
+    'Test_Range.2.Test_Name.1',
+    'Test_Range.1.Test_Name.1',
+    'Test_Range.1.Test_Name.2',
+    'Test_Range.1.guacd',
+    'Other_Range.Test_Name',
+    'Test_Range.10.Test_Name.1',
+]
+
+
+class TestInstanceIndex(unittest.TestCase):
+    """
+    Test the InstanceIndex class.
+    """
+
+    def setUp(self):
+        self.index = InstanceIndex(NAMES)
+
+    def test_containing(self):
+        """
+        Test that a trailing '*' matches every name containing the text,
+        in the order of the names.
+        """
+        for text in ['Test_Range.1', 'Name.1', 'Range', 'e', 'missing', 'T']:
+            self.assertEqual(self.index.match(f"{text}*"),
+                             [name for name in NAMES if text in name])
+
+        self.assertEqual(self.index.match('*'), NAMES)
+
+    def test_prefixed(self):
+        """
+        Test the prefix lookup.
+        """
+        self.assertEqual(self.index.prefixed('Test_Range.1'),
+                         ['Test_Range.1.Test_Name.1',
+                          'Test_Range.1.Test_Name.2',
+                          'Test_Range.1.guacd',
+                          'Test_Range.10.Test_Name.1'])
+        self.assertEqual(self.index.prefixed('Range'), [])
+
+    def test_glob(self):
+        """
+        Test that glob patterns match whole names.
+        """
+        self.assertEqual(self.index.match('Test_Range.?.Test_Name.1'),
+                         ['Test_Range.2.Test_Name.1', 'Test_Range.1.Test_Name.1'])
+        self.assertEqual(self.index.match('*.Test_Name.[2]'),
+                         ['Test_Range.1.Test_Name.2'])
+        self.assertEqual(self.index.match('*Test_Name'),
+                         ['Other_Range.Test_Name'])
+
+    def test_regex(self):
+        """
+        Test that regex patterns fully match names.
+        """
+        self.assertEqual(self.index.match(r're:Test_Range\.[0-9]+\.Test_Name\.1'),
+                         ['Test_Range.2.Test_Name.1',
+                          'Test_Range.1.Test_Name.1',
+                          'Test_Range.10.Test_Name.1'])
+        self.assertEqual(self.index.match('re:Test_Range'), [])
+        with self.assertRaises(re.error):
+            self.index.match('re:(')
+
+    def test_exact(self):
+        """
+        Test that plain names only match themselves.
+        """
+        self.assertFalse(is_pattern('Test_Range.1.guacd'))
+        self.assertEqual(self.index.match('Test_Range.1.guacd'), ['Test_Range.1.guacd'])
+        self.assertEqual(self.index.match('Test_Range.1'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
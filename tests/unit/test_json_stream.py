@@ -0,0 +1,73 @@
+"""
+Tests for the incremental JSON parser.
+"""
+
+import json
+import unittest
+from src.utils.json_stream import iter_json_items
+
+DOCUMENT = {
+    'guacadmin': {'username': 'guacadmin', 'attributes': {'guac-organization': None}},
+    'José': {'username': 'José', 'attributes': {'guac-organization': 'Test_Org'}},
+    'count': 12345,
+    'flag': True,
+    'nested': [1.5, {'a': [None, 'b']}, 'x,}']
+}
+
+
+def split(data: bytes, size: int) -> list[bytes]:
+    """
+    Split data into chunks of a size.
+    """
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestIterJsonItems(unittest.TestCase):
+    """
+    Test the iter_json_items function.
+    """
+
+    def test_any_chunk_size(self):
+        """
+        Test that values split at any byte, including inside UTF-8
+        characters and numbers, are decoded.
+        """
+        data = json.dumps(DOCUMENT, ensure_ascii=False, indent=2).encode('utf-8')
+
+        for size in range(1, 40):
+            self.assertEqual(list(iter_json_items(split(data, size))),
+                             list(DOCUMENT.items()))
+
+    def test_text_chunks(self):
+        """
+        Test that text chunks are accepted.
+        """
+        self.assertEqual(list(iter_json_items(['{"a":', ' 1}'])), [('a', 1)])
+
+    def test_empty_object(self):
+        """
+        Test that an empty object yields nothing.
+        """
+        self.assertEqual(list(iter_json_items([b' { ', b'} '])), [])
+
+    def test_lazy(self):
+        """
+        Test that members are yielded before the rest of the document is read.
+        """
+        def chunks():
+            yield b'{"a": {"b": 1}, '
+            raise AssertionError('read too far')
+
+        self.assertEqual(next(iter_json_items(chunks())), ('a', {'b': 1}))
+
+    def test_invalid(self):
+        """
+        Test that invalid or truncated documents raise a decode error.
+        """
+        for data in [b'[1, 2]', b'{"a": 1', b'{"a": 1,}', b'{1: 2}', b'{"a": 1} x', b'']:
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_json_items(split(data, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,14 +2,18 @@
 
 """
 
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open
-from src.utils.load_template import load_template
+from src.utils.load_template import load_template, parse_template
 
 class TestLoadTemplate(unittest.TestCase):
 
     def setUp(self):
-        pass
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = patch('src.utils.load_template.TEMPLATE_CACHE_DIR', self.directory.name)
+        self.cache_dir.start()
 
     @patch(
         'src.utils.load_template.open',
@@ -77,7 +81,96 @@ class TestLoadTemplate(unittest.TestCase):
         mock_file.assert_called_with(template_path, 'r', encoding='utf-8')
 
     def tearDown(self):
-        pass
+        self.cache_dir.stop()
+        self.directory.cleanup()
+
+
+class TestParseTemplate(unittest.TestCase):
+    """
+    Tests the parse cache kept in the user's cache directory.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+        self.template = os.path.join(self.directory.name, 'main.yaml')
+        self.patcher = patch('src.utils.load_template.TEMPLATE_CACHE_DIR', self.cache_dir)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.directory.cleanup()
+
+    @property
+    def cache(self):
+        """
+        The single cache file written to the cache directory.
+        """
+        cache_files = os.listdir(self.cache_dir)
+        self.assertEqual(len(cache_files), 1)
+        return os.path.join(self.cache_dir, cache_files[0])
+
+    def test_cached_parse(self):
+        """
+        Test that an unchanged template is only parsed once.
+        """
+        self.assertEqual(parse_template(self.template, 'name: Test'), {'name': 'Test'})
+        self.assertEqual(os.listdir(self.directory.name), ['cache'])
+        self.assertEqual(os.stat(self.cache).st_mode & 0o777, 0o600)
+
+        with patch('src.utils.load_template.load') as mock_load:
+            self.assertEqual(parse_template(self.template, 'name: Test'), {'name': 'Test'})
+        mock_load.assert_not_called()
+
+    def test_changed_template(self):
+        """
+        Test that a changed template is parsed again.
+        """
+        parse_template(self.template, 'name: Test')
+
+        self.assertEqual(parse_template(self.template, 'name: Changed'), {'name': 'Changed'})
+        self.assertEqual(parse_template(self.template, 'name: Changed'), {'name': 'Changed'})
+
+    def test_writable_cache_ignored(self):
+        """
+        Test that a cache others can write is not trusted.
+        """
+        parse_template(self.template, 'name: Test')
+        os.chmod(self.cache, 0o666)
+
+        with patch('src.utils.load_template.load', return_value={'name': 'Parsed'}) as mock_load:
+            self.assertEqual(parse_template(self.template, 'name: Test'), {'name': 'Parsed'})
+        mock_load.assert_called_once()
+
+    def test_corrupt_cache(self):
+        """
+        Test that a truncated cache is parsed again.
+        """
+        parse_template(self.template, 'name: Test')
+        with open(self.cache, 'r+b') as file:
+            file.truncate(10)
+
+        self.assertEqual(parse_template(self.template, 'name: Test'), {'name': 'Test'})
+
+    def test_failed_write(self):
+        """
+        Test that a failed cache write leaves no partial file behind.
+        """
+        with patch('src.utils.load_template.pickle.dump', side_effect=OSError('Disk full')):
+            self.assertEqual(parse_template(self.template, 'name: Test'), {'name': 'Test'})
+
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_load_template(self):
+        """
+        Test that load_template returns the cached data as a Munch.
+        """
+        with open(self.template, 'w', encoding='utf-8') as file:
+            file.write('parameters:\n  username:\n    default: test\n')
+
+        for _ in range(2):
+            result = load_template(self.template)
+            self.assertEqual(result.parameters, {'username': {'default': 'test'}})
 
 # Add more test cases for other functions in a similar manner.
 
@@ -0,0 +1,131 @@
+"""
+Tests for the run metrics.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+from src.utils import metrics
+
+
+def make_response(url: str,
+                  body: bytes | None,
+                  content: bytes,
+                  headers: dict | None = None) -> SimpleNamespace:
+    """
+    Make a stand-in for a requests response.
+    """
+    return SimpleNamespace(request=SimpleNamespace(url=url, body=body),
+                           content=content,
+                           headers=headers or {})
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test the phase timing and API call accounting.
+    """
+
+    def setUp(self):
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.reset()
+
+    def test_phases(self):
+        """
+        Test that phases nest, keep their order and add up.
+        """
+        with metrics.phase('Guacamole'):
+            with metrics.phase('Guacamole read'):
+                pass
+            with metrics.phase('Guacamole apply'):
+                pass
+            with metrics.phase('Guacamole read'):
+                pass
+
+        phases = metrics.get_metrics()['phases']
+        self.assertEqual([(record['name'], record['depth']) for record in phases],
+                         [('Guacamole', 0), ('Guacamole read', 1), ('Guacamole apply', 1)])
+        self.assertGreaterEqual(phases[0]['seconds'], phases[1]['seconds'] + phases[2]['seconds'])
+
+    def test_phase_error(self):
+        """
+        Test that a failing phase is still recorded.
+        """
+        with self.assertRaises(ValueError):
+            with metrics.phase('Heat'):
+                raise ValueError
+        with metrics.phase('Guacamole'):
+            pass
+
+        self.assertEqual([record['depth'] for record in metrics.get_metrics()['phases']],
+                         [0, 0])
+
+    def test_record_call_threads(self):
+        """
+        Test that calls recorded from many threads all count.
+        """
+        threads = [
+            threading.Thread(target=lambda: [metrics.record_call('Guacamole', 2, 3)
+                                             for _ in range(1000)])
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(metrics.get_metrics()['endpoints']['Guacamole'],
+                         {'calls': 8000, 'sent_bytes': 16000, 'received_bytes': 24000})
+
+    def test_record_response(self):
+        """
+        Test that responses are counted by URL endpoint and renamed from
+        the service catalog.
+        """
+        metrics.record_response(make_response('http://cloud:8004/v1/abc/stacks', b'{}', b'[1, 2]'))
+        metrics.record_response(make_response('http://cloud:8004/v1/abc/stacks/a', None, b''))
+        metrics.record_response(make_response('http://cloud:8080/v1/AUTH_abc/c', None, b'',
+                                              {'Content-Length': '10'}),
+                                stream=True)
+        metrics.record_response(make_response('http://guac/api/tokens', b'abc', b'{}'),
+                                endpoint='Guacamole')
+
+        metrics.rename_endpoints({'http://cloud:8004/v1/abc': 'orchestration'})
+
+        self.assertEqual(metrics.get_metrics()['endpoints'], {
+            'Guacamole': {'calls': 1, 'sent_bytes': 3, 'received_bytes': 2},
+            'cloud:8080/v1': {'calls': 1, 'sent_bytes': 0, 'received_bytes': 10},
+            'orchestration': {'calls': 2, 'sent_bytes': 2, 'received_bytes': 6}
+        })
+
+    def test_summary(self):
+        """
+        Test that the summary prints both tables and writes the JSON file.
+        """
+        with metrics.phase('Swift'):
+            pass
+        metrics.record_call('object-store', 1024, 2048)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.json')
+            with patch('sys.stdout', new_callable=StringIO) as stdout:
+                metrics.summary(1.0, path)
+            with open(path, 'r', encoding='utf-8') as file:
+                written = json.load(file)
+
+        self.assertIn('Swift', stdout.getvalue())
+        self.assertIn('object-store', stdout.getvalue())
+        self.assertIn('2.0 KiB', stdout.getvalue())
+        self.assertEqual(written['total_seconds'], 1.0)
+        self.assertEqual(written['endpoints']['object-store']['calls'], 1)
+        self.assertEqual(written['phases'][0]['name'], 'Swift')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Tests for the connection data model.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+from src.orchestration.guac import extract_connections
+from src.utils.generate import generate_conns
+from src.utils.models import intern_params
+
+GUAC_PARAMS = {
+    'org_name': 'Test_Org',
+    'new_groups': ['Test_Range.1', 'Test_Range.2'],
+    'recording': True,
+    'sharing': 'read',
+    'protocol': 'rdp',
+    'username': 'user',
+    'password': 'pass',
+    'domain_name': 'domain'
+}
+
+
+@patch('src.utils.generate.general_msg', MagicMock())
+@patch('src.utils.generate.info_msg', MagicMock())
+class TestModels(unittest.TestCase):
+    """
+    Test the generated connection tree.
+    """
+
+    def generate(self, **kwargs):
+        """
+        Generate a tree of two ranges with a guacd instance each.
+        """
+        guac_params = {
+            **GUAC_PARAMS,
+            'instances': [
+                {'name': f"Test_Range.{r}.{name}", 'hostname': f"10.0.{r}.{i}"}
+                for r in (1, 2)
+                for i, name in enumerate(['guacd', 'Test_Name.1', 'Test_Name.2'])
+            ],
+            **kwargs
+        }
+        return generate_conns({}, guac_params, False)
+
+    def test_rest_format(self):
+        """
+        Test that the tree serializes to the Guacamole REST format.
+        """
+        tree = self.generate().to_dict()
+
+        self.assertEqual([group['name'] for group in tree['childConnectionGroups']],
+                         ['Test_Range.1', 'Test_Range.2'])
+        conn = tree['childConnectionGroups'][1]['childConnections'][0]
+        self.assertEqual(conn['name'], 'Test_Range.2.Test_Name.1')
+        self.assertEqual(conn['attributes']['guacd-hostname'], '10.0.2.0')
+        self.assertEqual(conn['parameters']['hostname'], '10.0.2.1')
+        self.assertEqual(conn['parameters']['port'], '3389')
+        self.assertEqual(conn['sharingProfiles'], {
+            'attributes': {},
+            'name': 'Test_Range.2.Test_Name.1.read',
+            'parameters': {'read-only': 'true'}
+        })
+
+    def test_flatten(self):
+        """
+        Test that flattening the tree matches extracting its REST format.
+        """
+        for kwargs in [{}, {'sharing': False}, {'new_groups': ['Test_Org']}]:
+            tree = self.generate(**kwargs)
+            self.assertEqual(extract_connections(tree),
+                             extract_connections(tree.to_dict()))
+
+    def test_interned(self):
+        """
+        Test that equal parameter sets are shared.
+        """
+        tree = self.generate()
+        conns = [conn for group in tree.groups for conn in group.connections]
+
+        self.assertIs(conns[0].parameters, conns[3].parameters)
+        self.assertIs(conns[0].attributes, conns[1].attributes)
+        self.assertIsNot(conns[0].attributes, conns[2].attributes)
+        self.assertIs(intern_params({'a': '1'}), intern_params({'a': '1'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,8 @@ import unittest
 from unittest.mock import patch
 from io import StringIO
 import sys
-from src.utils.msg_format import error_msg, info_msg, success_msg, general_msg
+import json
+from src.utils.msg_format import configure, error_msg, info_msg, success_msg, general_msg
 from colorama import Fore
 
 # Your messaging module code would go here
@@ -17,25 +18,25 @@ class TestMessagingFunctions(unittest.TestCase):
         # Test msg with a dictionary
         test_endpoint = "test_endpoint"
         test_message = {"info": "Info message"}
-        with patch('src.utils.msg_format.pprint') as mock_pprint:
+        with patch('src.utils.msg_format.pformat', return_value='') as mock_pformat:
             error_msg(test_message, test_endpoint)
-            mock_pprint.assert_called_once()
-            mock_pprint.assert_called_with(test_message, indent=1, sort_dicts=False)
+            mock_pformat.assert_called_once()
+            mock_pformat.assert_called_with(test_message, indent=1, sort_dicts=False)
 
-        with patch('src.utils.msg_format.pprint') as mock_pprint:
+        with patch('src.utils.msg_format.pformat', return_value='') as mock_pformat:
             info_msg(test_message, test_endpoint, debug=True)
-            mock_pprint.assert_called_once()
-            mock_pprint.assert_called_with(test_message, indent=1, sort_dicts=False)
+            mock_pformat.assert_called_once()
+            mock_pformat.assert_called_with(test_message, indent=1, sort_dicts=False)
 
-        with patch('src.utils.msg_format.pprint') as mock_pprint:
+        with patch('src.utils.msg_format.pformat', return_value='') as mock_pformat:
             general_msg(test_message, test_endpoint)
-            mock_pprint.assert_called_once()
-            mock_pprint.assert_called_with(test_message, indent=1, sort_dicts=False)
+            mock_pformat.assert_called_once()
+            mock_pformat.assert_called_with(test_message, indent=1, sort_dicts=False)
 
-        with patch('src.utils.msg_format.pprint') as mock_pprint:
+        with patch('src.utils.msg_format.pformat', return_value='') as mock_pformat:
             success_msg(test_message, test_endpoint)
-            mock_pprint.assert_called_once()
-            mock_pprint.assert_called_with(test_message, indent=1, sort_dicts=False)
+            mock_pformat.assert_called_once()
+            mock_pformat.assert_called_with(test_message, indent=1, sort_dicts=False)
 
     def test_error_msg_with_string(self):
         # Test error_msg with a string
@@ -75,6 +76,60 @@ class TestMessagingFunctions(unittest.TestCase):
         self.assertIn(Fore.RESET, output)
         self.assertIn(test_message, output)
 
+    def test_info_msg_lazy(self):
+        """
+        Test that a callable message is only formatted when debug is True.
+        """
+        calls = []
+        info_msg(lambda: calls.append('off') or "Info message", "test_endpoint", debug=False)
+        self.assertEqual(calls, [])
+        self.assertEqual(sys.stdout.getvalue(), "")
+
+        info_msg(lambda: calls.append('on') or "Info message", "test_endpoint", debug=True)
+        self.assertEqual(calls, ['on'])
+        self.assertIn("Info message", sys.stdout.getvalue())
+
+    def test_json_lines(self):
+        """
+        Test that the json format writes one JSON object per message.
+        """
+        configure('json')
+        try:
+            error_msg("An error occurred", "test_endpoint")
+            info_msg(lambda: {"info": "Info message", "empty": None}, "test_endpoint", debug=True)
+            success_msg(["done"])
+        finally:
+            configure()
+
+        lines = [json.loads(line) for line in sys.stdout.getvalue().splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0]['level'], "ERROR")
+        self.assertEqual(lines[0]['endpoint'], "test_endpoint")
+        self.assertEqual(lines[0]['message'], "An error occurred")
+        self.assertEqual(lines[1]['message'], {"info": "Info message"})
+        self.assertEqual(lines[2]['level'], "SUCCESS")
+        self.assertNotIn(Fore.RED, sys.stdout.getvalue())
+
+    def test_single_write(self):
+        """
+        Test that a structured message is written in one call to the stream.
+        """
+        with patch.object(sys.stdout, 'write') as mock_write:
+            general_msg({"info": "Info message", "items": [1, 2]}, "test_endpoint")
+
+        mock_write.assert_called_once()
+        message = mock_write.call_args.args[0]
+        self.assertIn("[INFO]", message)
+        self.assertIn("'items': [1, 2]", message)
+        self.assertTrue(message.endswith('}\n'))
+
+    def test_invalid_format(self):
+        """
+        Test that an unknown format is rejected.
+        """
+        with self.assertRaises(ValueError):
+            configure('xml')
+
     # Add more tests for success_msg, general_msg, and remove_none_and_empty
 
     def tearDown(self):
@@ -0,0 +1,81 @@
+"""
+Tests for the profiler of the provisioning phases.
+"""
+
+import os
+import pstats
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from src.utils import metrics
+
+# The profiling module seen by metrics.phase
+profiling = metrics.profiling
+
+
+def build_rows(count: int) -> list:
+    """
+    Allocate a list of strings to profile.
+    """
+    return [f"row {i}" * 10 for i in range(count)]
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    Test the per phase profiles and memory figures.
+    """
+
+    def setUp(self):
+        metrics.reset()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        profiling.disable()
+        metrics.reset()
+        self.directory.cleanup()
+
+    def test_disabled(self):
+        """
+        Test that phases aren't profiled unless profiling is enabled.
+        """
+        with metrics.phase('Guacamole'):
+            build_rows(10)
+
+        self.assertEqual(profiling.report(), {})
+
+    def test_phases(self):
+        """
+        Test that top level phases write their statistics and peak memory,
+        and nested phases are part of their top level phase.
+        """
+        profiling.enable(self.directory.name, memory=True)
+
+        with metrics.phase('Guacamole'):
+            with metrics.phase('Guacamole diff'):
+                rows = build_rows(20000)
+        with metrics.phase('Heat stack Test_Range.1'):
+            pass
+        with metrics.phase('Guacamole'):
+            build_rows(10)
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            results = profiling.report(5)
+
+        self.assertEqual(list(results), ['Guacamole', 'Heat stack Test_Range.1'])
+        self.assertEqual(sorted(os.listdir(self.directory.name)),
+                         ['guacamole.pstats', 'heat_stack_test_range.1.pstats'])
+
+        stats = pstats.Stats(results['Guacamole']['path'])
+        calls = {
+            function[2]: counts[1]
+            for function, counts in stats.stats.items()
+        }
+        self.assertEqual(calls['build_rows'], 2)
+        self.assertGreater(results['Guacamole']['peak_bytes'], len(rows) * 50)
+        self.assertIn('build_rows', stdout.getvalue())
+        self.assertIn('peak memory', stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()